@@ -0,0 +1,80 @@
+"""
+Вывод списков API: объекты и поля DRF против строк .values().
+
+Замер страницы из --rows постов и комментариев: выборка, сериализация
+и JSON. serializer - PostSerializer(many=True) по объектам модели, как
+было раньше, values - ValuesSerializerMixin.represent_values.
+
+    python benchmarks/bench_api_list.py [--rows 1000]
+"""
+import argparse
+
+from utils import make_posts, make_users, setup_django, timeit
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=1000,
+                        help='сколько записей на странице')
+    args = parser.parse_args()
+    setup_django()
+
+    from django.db import connection
+    from django.test import RequestFactory
+    from django.test.utils import CaptureQueriesContext
+    from rest_framework.renderers import JSONRenderer
+
+    from api.serializers import CommentSerializer, PostSerializer
+    from posts.models import Comment, Group, Post
+
+    authors = make_users(50, 'author')
+    make_posts(authors, args.rows // 50 + 1)
+    # bulk_create - без сигналов, которые сбрасывают кеш лент.
+    Group.objects.bulk_create([Group(title='Группа', slug='group')])
+    group = Group.objects.get()
+    Post.objects.filter(pk__lte=args.rows // 2).update(
+        group=group, image='posts/picture.webp'
+    )
+    post = Post.objects.first()
+    Comment.objects.bulk_create(
+        Comment(post=post, author=authors[i % 50], text=f'Комментарий {i}')
+        for i in range(args.rows)
+    )
+    context = {'request': RequestFactory().get('/api/v1/posts/')}
+    renderer = JSONRenderer()
+
+    cases = (
+        ('posts', PostSerializer,
+         Post.objects.order_by('-created', '-pk')),
+        ('comments', CommentSerializer,
+         post.comments.order_by('-created', '-pk')),
+    )
+    print(f'Страница из {args.rows} записей')
+    print(f'  {"":<10} {"serializer, мс":>15} {"values, мс":>11} '
+          f'{"запросов":>9} {"ускорение":>10}')
+    for name, serializer, queryset in cases:
+        def objects():
+            return renderer.render(serializer(
+                queryset[:args.rows], many=True, context=context
+            ).data)
+
+        def values():
+            return renderer.render(serializer.represent_values(
+                serializer.values(queryset)[:args.rows], context
+            ))
+
+        assert objects() == values()
+        connection.queries_log.clear()
+        with CaptureQueriesContext(connection) as before:
+            objects()
+        connection.queries_log.clear()
+        with CaptureQueriesContext(connection) as after:
+            values()
+        objects_ms, values_ms = timeit(objects), timeit(values)
+        print(f'  {name:<10} {objects_ms:15.2f} {values_ms:11.2f} '
+              f'{len(before):>4} -> {len(after):<2} '
+              f'{objects_ms / values_ms:9.1f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+"""
+Пиковая память при разборе картинки в base64 полем Base64ImageField.
+
+Каждый вариант запускается в отдельном процессе: строка data URI уже
+в памяти (как после разбора JSON), замеряется прирост пикового RSS за
+вызов to_internal_value. Пик сбрасывается через /proc/self/clear_refs,
+поэтому честные цифры получаются только в Linux.
+
+Прежний вариант разбивал строку, декодировал ее целиком в ContentFile,
+а проверка картинки копировала байты еще раз.
+
+    python benchmarks/bench_base64_memory.py [--size 20]
+"""
+import argparse
+import base64
+import os
+import resource
+import subprocess
+import sys
+
+from utils import setup_django
+
+
+def legacy_field():
+    from django.core.files.base import ContentFile
+    from rest_framework import serializers
+
+    class LegacyBase64ImageField(serializers.ImageField):
+        def to_internal_value(self, data):
+            if isinstance(data, str) and data.startswith('data:image'):
+                format, imgstr = data.split(';base64,')
+                ext = format.split('/')[-1]
+                data = ContentFile(base64.b64decode(imgstr),
+                                   name='temp.' + ext)
+            return super().to_internal_value(data)
+
+    return LegacyBase64ImageField()
+
+
+def payload(megabytes):
+    """Картинка PNG из шума размером около megabytes МБ."""
+    from io import BytesIO
+
+    from PIL import Image
+
+    side = int((megabytes * 1024 * 1024 / 3) ** 0.5)
+    image = Image.frombytes('RGB', (side, side), os.urandom(side * side * 3))
+    buffer = BytesIO()
+    image.save(buffer, 'PNG', compress_level=0)
+    raw = buffer.getvalue()
+    return len(raw), 'data:image/png;base64,' + base64.b64encode(raw).decode()
+
+
+def reset_peak():
+    """Сбрасывает пиковый RSS процесса (только Linux)."""
+    try:
+        with open('/proc/self/clear_refs', 'w') as clear_refs:
+            clear_refs.write('5')
+    except OSError:
+        pass
+
+
+def peak_mb():
+    try:
+        with open('/proc/self/status') as status:
+            for line in status:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def measure(variant, megabytes):
+    setup_django()
+    from api.fields import Base64ImageField
+
+    size, data = payload(megabytes)
+    if variant == 'legacy':
+        field = legacy_field()
+    else:
+        field = Base64ImageField(max_size=size)
+    # Пик от подготовки картинки не относится к замеру.
+    reset_peak()
+    before = peak_mb()
+    field.to_internal_value(data)
+    print(f'{variant:<10} картинка {size / 2 ** 20:5.1f} МБ, '
+          f'прирост пикового RSS {peak_mb() - before:6.1f} МБ')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--size', type=float, default=20,
+                        help='размер картинки в МБ')
+    parser.add_argument('--variant', choices=('legacy', 'streaming'))
+    args = parser.parse_args()
+    if args.variant:
+        measure(args.variant, args.size)
+        return
+    for variant in ('legacy', 'streaming'):
+        subprocess.run(
+            [sys.executable, __file__, '--variant', variant,
+             '--size', str(args.size)],
+            check=True,
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+"""
+Пропускная способность создания постов и комментариев через API.
+
+single - по одному объекту на запрос POST /api/v1/posts/, bulk - пачки
+по --batch объектов на POST /api/v1/posts/bulk/. Запросы идут через
+тестовый клиент DRF со всеми middleware, проверкой прав и сигналами,
+но без сети и с DEBUG = False: панель отладки замедляет каждый запрос
+во много раз. Кеш лент - в памяти процесса.
+
+    python benchmarks/bench_bulk_api.py [--items 500] [--batch 100]
+"""
+import argparse
+import time
+
+from utils import make_users, setup_django
+
+
+def run(client, url, items, batch):
+    start = time.perf_counter()
+    if batch == 1:
+        for item in items:
+            client.post(url, item, format='json')
+    else:
+        for offset in range(0, len(items), batch):
+            client.post(url, items[offset:offset + batch], format='json')
+    return len(items) / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--items', type=int, default=500)
+    parser.add_argument('--batch', type=int, default=100)
+    args = parser.parse_args()
+    setup_django()
+
+    from django.test.utils import override_settings
+    from django.urls import reverse
+    from rest_framework.test import APIClient
+
+    from posts.models import Post
+
+    author, = make_users(1, 'author')
+    Post.objects.bulk_create([Post(author=author, text='Для комментариев')])
+    post = Post.objects.get()
+    client = APIClient()
+    client.force_authenticate(author)
+    cases = (
+        ('posts', reverse('api:posts-list'), reverse('api:posts-bulk')),
+        ('comments', reverse('api:comments-list', args=[post.pk]),
+         reverse('api:comments-bulk', args=[post.pk])),
+    )
+    print(f'{args.items} объектов, пачки по {args.batch}')
+    print(f'  {"":<10} {"single, об/с":>13} {"bulk, об/с":>11} '
+          f'{"ускорение":>10}')
+    with override_settings(DEBUG=False, CACHES={'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }}):
+        for name, single_url, bulk_url in cases:
+            items = [{'text': f'Объект {i}'} for i in range(args.items)]
+            single = run(client, single_url, items, 1)
+            batched = run(client, bulk_url, items, args.batch)
+            print(f'  {name:<10} {single:13.0f} {batched:11.0f} '
+                  f'{batched / single:9.1f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+"""
+Память выгрузки NDJSON (api.export) в зависимости от размера таблицы.
+
+Таблица постов растет ступенями --steps, на каждой замеряется пик
+выделенной памяти Python (tracemalloc) и время:
+
+- list: все строки .values() в список и JSON целиком, как ответ API
+  без пагинации;
+- stream: export_lines, чанки по (created, id), строки выбрасываются
+  сразу, как их отдал бы StreamingHttpResponse.
+
+Время замеряется под tracemalloc и поэтому завышено.
+
+    python benchmarks/bench_export.py [--steps 5000 20000 50000]
+"""
+import argparse
+import json
+import time
+import tracemalloc
+
+from utils import make_posts, make_users, setup_django
+
+
+def measure(func):
+    tracemalloc.start()
+    start = time.perf_counter()
+    func()
+    elapsed = (time.perf_counter() - start) * 1000
+    peak = tracemalloc.get_traced_memory()[1] / 1024 / 1024
+    tracemalloc.stop()
+    return peak, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--steps', type=int, nargs='+',
+                        default=[5000, 20000, 50000],
+                        help='сколько постов в таблице на каждом шаге')
+    args = parser.parse_args()
+    setup_django()
+
+    from api.export import export_lines
+    from api.serializers import PostSerializer
+    from posts.models import Post
+
+    authors = make_users(50, 'author')
+    context = {}
+
+    def as_list():
+        rows = PostSerializer.values(Post.objects.order_by('created', 'pk'))
+        return json.dumps(
+            PostSerializer.represent_values(rows, context),
+            ensure_ascii=False,
+        )
+
+    def as_stream():
+        for _ in export_lines(('posts',)):
+            pass
+
+    print(f'  {"постов":>7} {"list, МБ":>9} {"stream, МБ":>11} '
+          f'{"list, мс":>9} {"stream, мс":>11}')
+    for rows in sorted(args.steps):
+        missing = rows - Post.objects.count()
+        if missing > 0:
+            make_posts(authors, missing // len(authors) + 1)
+        list_mb, list_ms = measure(as_list)
+        stream_mb, stream_ms = measure(as_stream)
+        print(f'  {Post.objects.count():>7} {list_mb:9.1f} '
+              f'{stream_mb:11.1f} {list_ms:9.0f} {stream_ms:11.0f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,121 @@
+"""
+Где проходит граница между рассылкой (push) и чтением (pull) ленты.
+
+Все чтения - первая страница ленты подписок так же, как ее собирает
+follow_index: Post.objects.feed() (автор, группа, последний
+комментарий) и постраничный вывод по ключу.
+
+Запись: сколько стоит разложить один пост по лентам N подписчиков
+по сравнению с одним чтением ленты подписок через соединение.
+Чтение: сколько популярных авторов k можно подмешивать при чтении,
+пока гибридная лента быстрее чтения через соединение. Посты этих k
+авторов убираются из материализованной ленты, как в работе.
+
+    python benchmarks/bench_feed.py [--authors 200] [--posts 50]
+"""
+import argparse
+
+from utils import make_posts, make_users, setup_django, timeit
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--authors', type=int, default=200,
+                        help='сколько авторов в подписках читателя')
+    parser.add_argument('--posts', type=int, default=50,
+                        help='сколько постов у каждого автора')
+    parser.add_argument('--followers', type=int, nargs='+',
+                        default=[10, 100, 1000, 5000],
+                        help='числа подписчиков для замера рассылки')
+    args = parser.parse_args()
+    setup_django()
+
+    from django.test import RequestFactory, override_settings
+
+    from core.paginator import paginate
+    from posts import timeline
+    from posts.models import Follow, Post, TimelineEntry
+    from posts.views import POSTS_ON_PAGE
+
+    reader, = make_users(1, 'reader')
+    authors = make_users(args.authors, 'author')
+    make_posts(authors, args.posts)
+    Follow.objects.bulk_create(
+        Follow(user=reader, author=author) for author in authors
+    )
+    request = RequestFactory().get('/follow/')
+    request.user = reader
+
+    def pull():
+        with override_settings(FEED_PAGINATION='keyset'):
+            list(paginate(request, Post.objects.feed().filter(
+                author__following__user=reader
+            ), POSTS_ON_PAGE))
+
+    def push():
+        with override_settings(FOLLOW_TIMELINE=True,
+                               FEED_PAGINATION='keyset'):
+            list(timeline.get_page(request, POSTS_ON_PAGE))
+
+    with override_settings(FOLLOW_TIMELINE=True):
+        timeline.rebuild(reader.pk)
+    pull_ms = timeit(pull, repeat=15)
+    push_ms = timeit(push, repeat=15)
+    print(f'Чтение ленты: {args.authors} авторов по {args.posts} постов')
+    print(f'  pull (соединение)      {pull_ms:8.2f} мс')
+    print(f'  push (готовая лента)   {push_ms:8.2f} мс')
+
+    print('\nРассылка одного поста по лентам подписчиков')
+    print(f'  {"N":>6}  {"push, мс":>10}  {"push / pull":>11}')
+    star, = make_users(1, 'star')
+    crossover = None
+    followers = make_users(max(args.followers), 'fan')
+    for count in sorted(args.followers):
+        Follow.objects.filter(author=star).delete()
+        Follow.objects.bulk_create(
+            Follow(user=user, author=star) for user in followers[:count]
+        )
+        post = Post.objects.create(author=star, text='Новый пост')
+
+        def fan_out():
+            TimelineEntry.objects.filter(post=post).delete()
+            timeline.push_post(post)
+
+        with override_settings(FOLLOW_TIMELINE=True):
+            ms = timeit(fan_out, repeat=3)
+        ratio = ms / pull_ms
+        if crossover is None and ratio > 1:
+            crossover = count
+        print(f'  {count:>6}  {ms:10.2f}  {ratio:11.2f}')
+    print('  Рассылка дороже одного чтения через соединение с N >= '
+          f'{crossover or "> " + str(max(args.followers))}')
+
+    print('\nГибридная лента: k авторов подмешиваются при чтении')
+    print(f'  {"k":>6}  {"hybrid, мс":>10}  {"hybrid / pull":>13}')
+    crossover = None
+    for pulled in (0, 1, 2, 5, 10, 20, 50, 100):
+        if pulled > args.authors:
+            break
+        pulled_ids = [author.pk for author in authors[:pulled]]
+        TimelineEntry.objects.filter(
+            user=reader, author_id__in=pulled_ids
+        ).delete()
+
+        def hybrid():
+            paginator = timeline.HybridPaginator(reader, POSTS_ON_PAGE)
+            paginator.pulled = pulled_ids
+            list(paginator.get_keyset_page())
+
+        with override_settings(FOLLOW_TIMELINE=True,
+                               FOLLOW_TIMELINE_PUSH_LIMIT=0):
+            ms = timeit(hybrid, repeat=15)
+        ratio = ms / pull_ms
+        if crossover is None and ratio > 1:
+            crossover = pulled
+        print(f'  {pulled:>6}  {ms:10.2f}  {ratio:13.2f}')
+    print('  Гибридное чтение медленнее соединения с k >= '
+          f'{crossover if crossover is not None else "> 100"}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,136 @@
+"""
+Планы горячих запросов на больших таблицах.
+
+Заполняет таблицы, для каждого запроса лент, комментариев и подписок
+печатает EXPLAIN QUERY PLAN и время. Полный просмотр таблицы или
+сортировка во временном B-дереве считаются ошибкой: скрипт завершается
+с кодом 1, чтобы пропущенный индекс ловился сразу.
+
+Лента подписок через соединение с Follow сортируется всегда: посты
+многих авторов сливаются в один порядок. Это ожидаемо, для нее есть
+материализованная лента (FOLLOW_TIMELINE), ее план проверяется отдельно.
+
+    python benchmarks/bench_indexes.py [--users 500] [--posts 50000]
+"""
+import argparse
+import random
+import re
+import sys
+
+from utils import make_users, setup_django, timeit
+
+FULL_SCAN = re.compile(r'\bSCAN (TABLE )?\w+$|TEMP B-TREE')
+
+# Запросы, которым сортировка без индекса разрешена.
+EXPECTED_SORTS = {'follow_index'}
+
+
+def seed(args):
+    from posts import timeline
+    from posts.models import Comment, Follow, Group, Post
+
+    users = make_users(args.users)
+    groups = Group.objects.bulk_create(
+        Group(title=f'Группа {i}', slug=f'group-{i}', description='')
+        for i in range(20)
+    )
+    Post.objects.bulk_create(
+        (Post(author=random.choice(users), group=random.choice(groups),
+              text=f'Пост {i}')
+         for i in range(args.posts))
+    )
+    post_ids = list(Post.objects.values_list('pk', flat=True))
+    Comment.objects.bulk_create(
+        (Comment(post_id=random.choice(post_ids),
+                 author=random.choice(users), text=f'Комментарий {i}')
+         for i in range(args.comments))
+    )
+    follows = {
+        (random.choice(users).pk, random.choice(users).pk)
+        for _ in range(args.follows)
+    }
+    Follow.objects.bulk_create(
+        (Follow(user_id=user, author_id=author)
+         for user, author in follows if user != author)
+    )
+    timeline.rebuild()
+    return users, groups
+
+
+def hot_queries(users, groups):
+    """Запросы, которые выполняются на каждом просмотре лент."""
+    from posts import timeline
+    from posts.models import Comment, Follow, Post
+
+    reader = max(users, key=lambda user: user.follower.count())
+    author = users[0]
+    post = Post.objects.filter(comment_count__gte=0).first()
+    middle = Post.objects.order_by('-created', '-pk')[len(users)]
+    page = slice(0, 11)
+    return {
+        'index': Post.objects.order_by('-created', '-pk')[page],
+        'index after cursor': Post.objects.filter(
+            created__lt=middle.created
+        ).order_by('-created', '-pk')[page],
+        'group_list': Post.objects.filter(
+            group=groups[0]
+        ).order_by('-created', '-pk')[page],
+        'profile': Post.objects.filter(
+            author=author
+        ).order_by('-created', '-pk')[page],
+        'follow_index': Post.objects.filter(
+            author__following__user=reader
+        ).order_by('-created')[page],
+        'follow timeline': timeline.get_posts(reader)[page],
+        'post comments': Comment.objects.filter(post=post),
+        'follow probe (profile)': Follow.objects.filter(
+            author=author, user=reader
+        ),
+        'followers of author': Follow.objects.filter(author=author),
+        'follows of user': Follow.objects.filter(user=reader),
+        'api follow search': Follow.objects.filter(
+            user=reader, author__username__icontains='user1'
+        ).select_related('user', 'author'),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--users', type=int, default=500)
+    parser.add_argument('--posts', type=int, default=50000)
+    parser.add_argument('--comments', type=int, default=100000)
+    parser.add_argument('--follows', type=int, default=10000)
+    parser.add_argument('--analyze', action='store_true',
+                        help='собрать статистику ANALYZE перед замерами')
+    args = parser.parse_args()
+    setup_django()
+
+    from django.db import connection
+
+    users, groups = seed(args)
+    if args.analyze:
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+    failed = []
+    for name, queryset in hot_queries(users, groups).items():
+        plan = queryset.explain()
+        ms = timeit(lambda: list(queryset.all()))
+        scans = [line for line in plan.splitlines()
+                 if FULL_SCAN.search(line.strip())]
+        if not scans:
+            mark = 'ok'
+        elif name in EXPECTED_SORTS:
+            mark = 'сортировка (ожидаемо)'
+        else:
+            mark = 'ПОЛНЫЙ ПРОСМОТР'
+            failed.append(name)
+        print(f'{name:<24} {ms:8.2f} мс  {mark}')
+        for line in plan.splitlines():
+            print(f'    {line}')
+    if failed:
+        print(f'\nЗапросы без индекса: {", ".join(failed)}')
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
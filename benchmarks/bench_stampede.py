@@ -0,0 +1,102 @@
+"""
+Лавина пересчетов при истечении кешированного фрагмента.
+
+WORKERS процессов одновременно запрашивают один фрагмент, расчет
+которого (запросы ленты и рендер) изображает sleep на RENDER_MS.
+Кеш - общий файл SQLite (core.cache.SQLiteCache).
+
+- plain: get, при промахе расчет и set, как тег {% cache %} Django;
+- tiered: TieredCache.get_or_set, как тег из fragment_cache.
+
+Сценарии: фрагмента нет (сброс поколения ленты) и фрагмент устарел.
+
+    python benchmarks/bench_stampede.py [--workers 16]
+"""
+import argparse
+import multiprocessing
+import os
+import shutil
+import statistics
+import tempfile
+import time
+
+from utils import setup_django
+
+RENDER_MS = 100
+KEY = 'fragment'
+
+
+def render(counter):
+    counter.incr('renders')
+    time.sleep(RENDER_MS / 1000)
+    return 'x' * 10000
+
+
+def request(variant, barrier, latencies):
+    from django.core.cache import caches
+
+    shared = caches['shared']
+    barrier.wait()
+    start = time.perf_counter()
+    if variant == 'plain':
+        value = shared.get(KEY)
+        if value is None:
+            shared.set(KEY, render(shared), 60)
+    else:
+        caches['default'].get_or_set(KEY, lambda: render(shared), 60)
+    latencies.append((time.perf_counter() - start) * 1000)
+
+
+def run(variant, scenario, workers):
+    from django.core.cache import caches
+    from core.tiered_cache import Envelope
+
+    shared = caches['shared']
+    shared.clear()
+    shared.set('renders', 0)
+    # Для обычного кеша устаревшая запись - тот же промах.
+    if scenario == 'stale' and variant == 'tiered':
+        shared.set(KEY, Envelope('x' * 10000, time.time() - 1, 0.1), 120)
+    context = multiprocessing.get_context('fork')
+    barrier = context.Barrier(workers)
+    latencies = context.Manager().list()
+    processes = [
+        context.Process(target=request, args=(variant, barrier, latencies))
+        for _ in range(workers)
+    ]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+    latencies = sorted(latencies)
+    print(f'{variant:<7} {scenario:<8} расчетов {shared.get("renders"):3}, '
+          f'медиана {statistics.median(latencies):6.1f} мс, '
+          f'максимум {latencies[-1]:6.1f} мс')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--workers', type=int, default=16)
+    args = parser.parse_args()
+    setup_django()
+    from django.test.utils import override_settings
+
+    directory = tempfile.mkdtemp()
+    with override_settings(CACHES={
+        'default': {
+            'BACKEND': 'core.tiered_cache.TieredCache',
+            'OPTIONS': {'L2': 'shared'},
+        },
+        'shared': {
+            'BACKEND': 'core.cache.SQLiteCache',
+            'LOCATION': os.path.join(directory, 'cache.sqlite3'),
+        },
+    }):
+        for scenario in ('missing', 'stale'):
+            for variant in ('plain', 'tiered'):
+                run(variant, scenario, args.workers)
+    shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
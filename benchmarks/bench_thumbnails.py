@@ -0,0 +1,103 @@
+"""
+Стоимость тегов {% thumbnail %} на странице ленты.
+
+Сравнивает стандартное хранилище метаданных sorl-thumbnail (кеш и
+база) с core.kvstore.KVStore. Перед каждым показом кеш очищается:
+так выглядит ленту для процесса, который еще не видел эти миниатюры,
+или для соседнего процесса со своим LocMemCache.
+
+    python benchmarks/bench_thumbnails.py [--posts 10]
+"""
+import argparse
+import io
+import os
+import shutil
+import tempfile
+
+from utils import make_users, setup_django, timeit
+
+
+def seed(count):
+    from django.core.files.base import ContentFile
+    from django.core.files.storage import default_storage
+    from PIL import Image
+
+    from posts.models import Post
+
+    author, = make_users(1, 'author')
+    names = []
+    for i in range(count):
+        buffer = io.BytesIO()
+        Image.new('RGB', (1200, 800), (i * 20 % 256, 80, 160)).save(
+            buffer, 'JPEG'
+        )
+        names.append(default_storage.save(
+            f'posts/{i}.jpg', ContentFile(buffer.getvalue())
+        ))
+    Post.objects.bulk_create(
+        Post(author=author, text=f'Пост {i}', image=name)
+        for i, name in enumerate(names)
+    )
+    return names
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--posts', type=int, default=10)
+    args = parser.parse_args()
+    directory = tempfile.mkdtemp()
+    setup_django()
+
+    from django.conf import settings
+    from django.core.cache import cache
+    from django.db import connection
+    from django.test import Client
+    from django.test.utils import CaptureQueriesContext
+    from sorl.thumbnail import default
+    from sorl.thumbnail.kvstores.cached_db_kvstore import (
+        KVStore as CachedDBKVStore)
+
+    from core.kvstore import KVStore
+    from posts import thumbnails
+
+    # Без панели отладки, она дороже самих тегов.
+    settings.DEBUG = False
+    settings.MEDIA_ROOT = directory
+    settings.THUMBNAIL_WORKERS = 0
+    names = seed(args.posts)
+    stores = {
+        'cached_db': CachedDBKVStore(),
+        'core.kvstore': KVStore(
+            path=os.path.join(directory, 'kvstore.sqlite3')
+        ),
+    }
+    client = Client()
+
+    def render():
+        cache.clear()
+        response = client.get('/')
+        assert response.status_code == 200, response.status_code
+
+    try:
+        for name, store in stores.items():
+            default.kvstore._wrapped = store
+            thumbnails.backfill(names, workers=0)
+            if isinstance(store, KVStore):
+                store.reset()
+            render()
+            with CaptureQueriesContext(connection) as context:
+                render()
+            count = len(context.captured_queries)
+            ms = timeit(render, repeat=20)
+            print(f'{name:<14} {ms:7.2f} мс  запросов: {count}')
+            if isinstance(store, KVStore):
+                stats = store.stats()
+                print(f'{"":<14} попаданий в память: '
+                      f'{stats["hit_rate"]:.0%}, из SQLite: '
+                      f'{stats["disk_hits"]}, промахов: {stats["misses"]}')
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,55 @@
+"""Общая подготовка окружения для бенчмарков."""
+import os
+import sys
+import time
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(BASE_DIR, 'yatube'))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings')
+
+
+def setup_django():
+    """Настраивает Django и создает временную базу в памяти."""
+    import django
+    django.setup()
+    from django.db import connection
+    from django.test.utils import setup_test_environment
+    setup_test_environment()
+    connection.creation.create_test_db(verbosity=0)
+
+
+def timeit(func, repeat=5):
+    """Возвращает медианное время вызова func в миллисекундах."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    return timings[len(timings) // 2]
+
+
+def make_users(count, prefix='user'):
+    """Быстро создает пользователей без хеширования паролей."""
+    from posts.models import CustomUser
+    start = CustomUser.objects.count()
+    CustomUser.objects.bulk_create(
+        CustomUser(
+            username=f'{prefix}{start + i}',
+            email=f'{prefix}{start + i}@yatube.ru',
+            password='!',
+        )
+        for i in range(count)
+    )
+    return list(CustomUser.objects.filter(
+        username__in=[f'{prefix}{start + i}' for i in range(count)]
+    ).order_by('pk'))
+
+
+def make_posts(authors, per_author):
+    """Создает по per_author постов каждому автору без сигналов."""
+    from posts.models import Post
+    Post.objects.bulk_create(
+        (Post(author=author, text=f'Пост {i} автора {author.username}')
+         for i in range(per_author) for author in authors)
+    )
@@ -0,0 +1,24 @@
+from rest_framework.filters import BaseFilterBackend
+from rest_framework.settings import api_settings
+
+from posts import search
+
+
+class PostSearchFilter(BaseFilterBackend):
+    """Полнотекстовый поиск по постам, ответ упорядочен по релевантности."""
+    search_param = api_settings.SEARCH_PARAM
+
+    def filter_queryset(self, request, queryset, view):
+        query = request.query_params.get(self.search_param, '')
+        if not query.strip():
+            return queryset
+        return search.search_posts(query, queryset)
+
+    def get_schema_operation_parameters(self, view):
+        return [{
+            'name': self.search_param,
+            'required': False,
+            'in': 'query',
+            'description': 'Слова для поиска по тексту поста.',
+            'schema': {'type': 'string'},
+        }]
@@ -0,0 +1,56 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from api.export import CHUNK_SIZE, export_lines, parse_moment, parse_types
+
+
+class Command(BaseCommand):
+    help = (
+        'Выгружает группы, посты, комментарии и подписки в NDJSON. '
+        'Для выгрузки изменений передайте в --since значение until из '
+        'первой строки прошлой выгрузки.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--types', default='',
+            help='Типы через запятую, по умолчанию - все.'
+        )
+        parser.add_argument(
+            '--since', help='Записи, созданные не раньше (ISO 8601).'
+        )
+        parser.add_argument(
+            '--until', help='Записи, созданные раньше (ISO 8601).'
+        )
+        parser.add_argument(
+            '--output', help='Файл выгрузки, по умолчанию - stdout.'
+        )
+        parser.add_argument(
+            '--chunk', type=int, default=CHUNK_SIZE,
+            help='Сколько строк читать одним запросом.'
+        )
+
+    def handle(self, *args, **options):
+        if options['chunk'] < 1:
+            raise CommandError('--chunk должен быть больше нуля.')
+        try:
+            types = parse_types(options['types'])
+            bounds = {
+                name: parse_moment(options[name])
+                for name in ('since', 'until') if options[name]
+            }
+        except ValueError as error:
+            raise CommandError(error)
+        lines = export_lines(types, chunk_size=options['chunk'], **bounds)
+        if not options['output']:
+            for line in lines:
+                self.stdout.write(line, ending='')
+            return
+        total = 0
+        with open(options['output'], 'w', encoding='utf-8') as file:
+            for line in lines:
+                file.write(line)
+                total += 1
+        # Первая строка - заголовок с границами выгрузки.
+        self.stdout.write(self.style.SUCCESS(
+            f'Выгружено записей: {total - 1} в {options["output"]}.'
+        ))
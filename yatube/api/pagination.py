@@ -0,0 +1,115 @@
+from collections import OrderedDict
+
+from django.conf import settings
+from rest_framework.pagination import BasePagination, LimitOffsetPagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+from core.paginator import CURSOR_AFTER, CURSOR_BEFORE, KeysetPaginator
+
+
+class RankedPagination(LimitOffsetPagination):
+    """
+    Страницы по limit/offset с размером по умолчанию API_PAGE_SIZE.
+
+    Без limit размер задает page_size, как и при листании по курсору.
+    """
+    default_limit = settings.API_PAGE_SIZE
+    max_limit = 100
+    page_size_query_param = 'page_size'
+
+    def get_limit(self, request):
+        params = request.query_params
+        if (self.limit_query_param in params
+                or self.page_size_query_param not in params):
+            return super().get_limit(request)
+        try:
+            page_size = int(params[self.page_size_query_param])
+        except ValueError:
+            return self.default_limit
+        if page_size <= 0:
+            return self.default_limit
+        return min(page_size, self.max_limit)
+
+
+class KeysetPagination(BasePagination):
+    """
+    Постраничный вывод по курсору (created, id).
+
+    Курсор указывает на конкретную запись, поэтому новые записи не
+    сдвигают страницы, а глубина листания не влияет на стоимость запроса.
+    Без параметров after, before, page_size, limit и offset список
+    отдается целиком, без обертки, как до появления курсора.
+    Параметры limit/offset переключают на прежний LimitOffsetPagination.
+    Результаты поиска упорядочены по релевантности, а не по (created, id),
+    поэтому с параметром search тоже работает LimitOffsetPagination.
+    """
+    page_size = settings.API_PAGE_SIZE
+    max_page_size = 100
+    page_size_query_param = 'page_size'
+    legacy_class = LimitOffsetPagination
+    ranked_class = RankedPagination
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.legacy = None
+        params = request.query_params
+        if not any(param in params for param in self.get_page_params()):
+            return None
+        if (self.legacy_class.limit_query_param in params
+                or self.legacy_class.offset_query_param in params):
+            self.legacy = self.legacy_class()
+            return self.legacy.paginate_queryset(queryset, request, view)
+        if params.get(api_settings.SEARCH_PARAM, '').strip():
+            self.legacy = self.ranked_class()
+            return self.legacy.paginate_queryset(queryset, request, view)
+        paginator = KeysetPaginator(queryset, self.get_page_size(request))
+        self.page = paginator.get_keyset_page(
+            after=params.get(CURSOR_AFTER), before=params.get(CURSOR_BEFORE)
+        )
+        return list(self.page)
+
+    def get_page_params(self):
+        """Параметры, с которыми клиент просит ответ страницами."""
+        return (
+            CURSOR_AFTER, CURSOR_BEFORE, self.page_size_query_param,
+            self.legacy_class.limit_query_param,
+            self.legacy_class.offset_query_param,
+        )
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if page_size <= 0:
+            return self.page_size
+        return min(page_size, self.max_page_size)
+
+    def get_next_link(self):
+        cursor = self.page.next_cursor()
+        if cursor is None:
+            return None
+        url = remove_query_param(
+            self.request.build_absolute_uri(), CURSOR_BEFORE
+        )
+        return replace_query_param(url, CURSOR_AFTER, cursor)
+
+    def get_previous_link(self):
+        cursor = self.page.previous_cursor()
+        if cursor is None:
+            return None
+        url = remove_query_param(
+            self.request.build_absolute_uri(), CURSOR_AFTER
+        )
+        return replace_query_param(url, CURSOR_BEFORE, cursor)
+
+    def get_paginated_response(self, data):
+        if self.legacy is not None:
+            return self.legacy.get_paginated_response(data)
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        ]))
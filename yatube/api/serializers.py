@@ -1,11 +1,75 @@
+from django.conf import settings
+from django.db import IntegrityError, transaction
 from rest_framework import serializers
-from rest_framework.validators import UniqueTogetherValidator
+from rest_framework.settings import api_settings
 
 from api.fields import Base64ImageField
+from posts import bulk
 from posts.models import Comment, Group, Follow, Post, CustomUser
 
+# Даты в ответах - как у DateTimeField сериализаторов.
+datetime_field = serializers.DateTimeField()
 
-class PostSerializer(serializers.ModelSerializer):
+
+class ValuesSerializerMixin:
+    """
+    Вывод списков без объектов моделей.
+
+    Строки выбираются через .values() только с нужными колонками, имя
+    автора - через join, а словарь ответа собирается без полей DRF.
+
+    Сериализатор задает values_fields - колонки для .values() - и
+    метод класса represent_row(row, context), который превращает строку
+    в словарь ответа. Результат должен совпадать с to_representation
+    до байта.
+    """
+    values_fields = ()
+
+    @classmethod
+    def values(cls, queryset):
+        # Поиск упорядочен по колонке из extra(), ее нельзя отбросить.
+        return queryset.values(
+            *cls.values_fields, *queryset.query.extra_select
+        )
+
+    @classmethod
+    def represent_values(cls, rows, context):
+        return [cls.represent_row(row, context) for row in rows]
+
+
+class BulkListSerializer(serializers.ListSerializer):
+    """Список объектов для создания пачкой, не длиннее API_BULK_MAX_ITEMS."""
+    default_error_messages = {
+        'too_many': 'Не больше {max_items} объектов за запрос.',
+    }
+
+    def to_internal_value(self, data):
+        max_items = settings.API_BULK_MAX_ITEMS
+        if isinstance(data, list) and len(data) > max_items:
+            # Как ошибка not_a_list у ListSerializer.
+            message = self.error_messages['too_many'].format(
+                max_items=max_items
+            )
+            raise serializers.ValidationError(
+                {api_settings.NON_FIELD_ERRORS_KEY: [message]},
+                code='too_many',
+            )
+        return super().to_internal_value(data)
+
+
+class PostListSerializer(BulkListSerializer):
+    def create(self, validated_data):
+        return bulk.create_posts([Post(**attrs) for attrs in validated_data])
+
+
+class CommentListSerializer(BulkListSerializer):
+    def create(self, validated_data):
+        return bulk.create_comments(
+            [Comment(**attrs) for attrs in validated_data]
+        )
+
+
+class PostSerializer(ValuesSerializerMixin, serializers.ModelSerializer):
     author = serializers.SlugRelatedField(slug_field='username',
                                           read_only=True,
                                           )
@@ -15,9 +79,31 @@ class PostSerializer(serializers.ModelSerializer):
         fields = ('id', 'author', 'text', 'created', 'image', 'group')
         model = Post
         read_only_fields = ('id', 'author', 'created')
+        list_serializer_class = PostListSerializer
 
+    values_fields = (
+        'id', 'author__username', 'text', 'created', 'image', 'group_id'
+    )
+
+    @classmethod
+    def represent_row(cls, row, context):
+        image = None
+        if row['image']:
+            image = Post._meta.get_field('image').storage.url(row['image'])
+            request = context.get('request')
+            if request is not None:
+                image = request.build_absolute_uri(image)
+        return {
+            'id': row['id'],
+            'author': row['author__username'],
+            'text': row['text'],
+            'created': datetime_field.to_representation(row['created']),
+            'image': image,
+            'group': row['group_id'],
+        }
 
-class CommentSerializer(serializers.ModelSerializer):
+
+class CommentSerializer(ValuesSerializerMixin, serializers.ModelSerializer):
     post = serializers.PrimaryKeyRelatedField(many=False, read_only=True)
     created = serializers.DateTimeField(read_only=True)
     author = serializers.SlugRelatedField(
@@ -28,6 +114,19 @@ class CommentSerializer(serializers.ModelSerializer):
         fields = ('id', 'author', 'text', 'created', 'post')
         model = Comment
         read_only_fields = ('id', 'author', 'post')
+        list_serializer_class = CommentListSerializer
+
+    values_fields = ('id', 'author__username', 'text', 'created', 'post_id')
+
+    @classmethod
+    def represent_row(cls, row, context):
+        return {
+            'id': row['id'],
+            'author': row['author__username'],
+            'text': row['text'],
+            'created': datetime_field.to_representation(row['created']),
+            'post': row['post_id'],
+        }
 
 
 class GroupSerializer(serializers.ModelSerializer):
@@ -50,15 +149,45 @@ class FollowSerializer(serializers.ModelSerializer):
     class Meta:
         fields = ('id', 'user', 'author')
         model = Follow
-        validators = [
-            UniqueTogetherValidator(
-                queryset=Follow.objects.all(),
-                fields=['user', 'author'],
-                message='Подписка была оформленна ранее'
-            )
-        ]
 
-    def validate_following(self, value):
+    def validate_author(self, value):
         if self.context.get('request').user == value:
             raise serializers.ValidationError('Самоподписка запрещена.')
         return value
+
+    def create(self, validated_data):
+        # Повтор ловит ограничение unique_follow, без отдельного запроса.
+        try:
+            with transaction.atomic():
+                return super().create(validated_data)
+        except IntegrityError:
+            raise serializers.ValidationError({
+                api_settings.NON_FIELD_ERRORS_KEY: [
+                    'Подписка была оформленна ранее'
+                ],
+            })
+
+
+class FollowBulkSerializer(serializers.Serializer):
+    """Список имен авторов для подписки или отписки одним запросом."""
+    authors = serializers.ListField(
+        child=serializers.CharField(max_length=150), allow_empty=False
+    )
+
+    def validate_authors(self, value):
+        max_items = settings.API_BULK_MAX_ITEMS
+        if len(value) > max_items:
+            raise serializers.ValidationError(
+                f'Не больше {max_items} авторов за запрос.'
+            )
+        # Повторы убираются, порядок остается.
+        return list(dict.fromkeys(value))
+
+
+class FollowBulkCreateSerializer(FollowBulkSerializer):
+    """Список имен авторов для подписки: себя в нем быть не должно."""
+
+    def validate_authors(self, value):
+        if self.context.get('request').user.username in value:
+            raise serializers.ValidationError('Самоподписка запрещена.')
+        return super().validate_authors(value)
@@ -0,0 +1,196 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import NotSupportedError, connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from posts import feed_cache
+from posts.bulk import create_posts
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+class BulkCreateTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(
+            email='author@yatube.ru', username='Author', password='pass'
+        )
+        cls.group = Group.objects.create(title='Группа', slug='group')
+        cls.post = Post.objects.create(author=cls.user, text='Пост')
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.posts_url = reverse('api:posts-bulk')
+        self.comments_url = reverse('api:comments-bulk', args=[self.post.pk])
+
+    def test_posts_created_in_order(self):
+        before = feed_cache.generations('index', f'group:{self.group.pk}')
+        items = [{'text': f'Пачка {i}', 'group': self.group.pk}
+                 for i in range(5)]
+        response = self.client.post(self.posts_url, items, format='json')
+        self.assertEqual(response.status_code, 201)
+        ids = [item['id'] for item in response.data]
+        self.assertEqual(
+            list(Post.objects.filter(pk__in=ids).order_by('pk')
+                 .values_list('text', flat=True)),
+            [item['text'] for item in items],
+        )
+        self.assertEqual(response.data[0]['author'], 'Author')
+        self.assertEqual(User.objects.get(pk=self.user.pk).post_count, 6)
+        self.assertNotEqual(
+            feed_cache.generations('index', f'group:{self.group.pk}'), before
+        )
+
+    def test_query_count_does_not_grow_with_items(self):
+        counts = []
+        for size in (2, 50):
+            items = [{'text': f'Пост {i}'} for i in range(size)]
+            with CaptureQueriesContext(connection) as queries:
+                self.client.post(self.posts_url, items, format='json')
+            counts.append(len(queries))
+        self.assertEqual(counts[0], counts[1])
+
+    def test_ids_by_last_rows_only_on_sqlite(self):
+        """Id по последним строкам таблицы подбираются только в SQLite."""
+        with mock.patch.object(connection, 'vendor', 'mysql'):
+            with self.assertRaises(NotSupportedError):
+                create_posts([Post(author=self.user, text='Пачка')])
+        self.assertFalse(Post.objects.filter(text='Пачка').exists())
+
+    def test_invalid_item_rejects_whole_batch(self):
+        items = [{'text': 'Верный'}, {'text': ''}, {'group': 999}]
+        response = self.client.post(self.posts_url, items, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(len(response.data), 3)
+        self.assertEqual(response.data[0], {})
+        self.assertIn('text', response.data[1])
+        self.assertIn('group', response.data[2])
+        self.assertFalse(Post.objects.filter(text='Верный').exists())
+
+    @override_settings(API_BULK_MAX_ITEMS=2)
+    def test_too_many_items(self):
+        items = [{'text': 'Пост'}] * 3
+        response = self.client.post(self.posts_url, items, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('non_field_errors', response.data)
+
+    def test_anonymous_rejected(self):
+        self.client.force_authenticate(None)
+        response = self.client.post(
+            self.posts_url, [{'text': 'Пост'}], format='json'
+        )
+        self.assertEqual(response.status_code, 401)
+
+    def test_comments_created(self):
+        items = [{'text': f'Комментарий {i}'} for i in range(3)]
+        response = self.client.post(self.comments_url, items, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(
+            [item['post'] for item in response.data], [self.post.pk] * 3
+        )
+        self.assertEqual(
+            Comment.objects.filter(post=self.post).count(), 3
+        )
+        self.assertEqual(Post.objects.get(pk=self.post.pk).comment_count, 3)
+
+    def test_comments_for_missing_post(self):
+        response = self.client.post(
+            reverse('api:comments-bulk', args=[0]), [{'text': 'Ок'}],
+            format='json',
+        )
+        self.assertEqual(response.status_code, 404)
+
+
+class BulkFollowTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(
+            email='reader@yatube.ru', username='Reader', password='pass'
+        )
+        cls.authors = [
+            User.objects.create_user(
+                email=f'author{i}@yatube.ru', username=f'Author{i}',
+                password='pass',
+            )
+            for i in range(3)
+        ]
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.reader)
+        self.url = reverse('api:follows-bulk')
+
+    def test_follow_many(self):
+        Follow.objects.create(user=self.reader, author=self.authors[0])
+        names = ['Author0', 'Author1', 'Author2', 'Nobody', 'Author1']
+        response = self.client.post(
+            self.url, {'authors': names}, format='json'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data, {
+            'created': ['Author1', 'Author2'],
+            'existing': ['Author0'],
+            'not_found': ['Nobody'],
+        })
+        self.assertEqual(
+            Follow.objects.filter(user=self.reader).count(), 3
+        )
+        self.assertEqual(User.objects.get(pk=self.reader.pk)
+                         .following_count, 3)
+        self.assertEqual(User.objects.get(pk=self.authors[2].pk)
+                         .follower_count, 1)
+
+    def test_follow_query_count_does_not_grow(self):
+        names = [author.username for author in self.authors]
+        with CaptureQueriesContext(connection) as one:
+            self.client.post(self.url, {'authors': names[:1]}, format='json')
+        Follow.objects.all().delete()
+        with CaptureQueriesContext(connection) as many:
+            self.client.post(self.url, {'authors': names}, format='json')
+        self.assertEqual(len(one), len(many))
+
+    def test_self_follow_rejected(self):
+        response = self.client.post(
+            self.url, {'authors': ['Author0', 'Reader']}, format='json'
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Follow.objects.exists())
+
+    def test_unfollow_many(self):
+        for author in self.authors[:2]:
+            Follow.objects.create(user=self.reader, author=author)
+        response = self.client.post(
+            reverse('api:follows-bulk-delete'),
+            {'authors': ['Author0', 'Author1', 'Author2', 'Nobody']},
+            format='json',
+        )
+        self.assertEqual(response.data, {
+            'deleted': ['Author0', 'Author1'],
+            'not_following': ['Author2'],
+            'not_found': ['Nobody'],
+        })
+        self.assertFalse(Follow.objects.exists())
+        self.assertEqual(User.objects.get(pk=self.reader.pk)
+                         .following_count, 0)
+
+    def test_unfollow_list_with_own_name(self):
+        """Свое имя в списке отписки не ошибка, а просто не подписка."""
+        Follow.objects.create(user=self.reader, author=self.authors[0])
+        response = self.client.post(
+            reverse('api:follows-bulk-delete'),
+            {'authors': ['Author0', 'Reader']}, format='json',
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['deleted'], ['Author0'])
+        self.assertEqual(response.data['not_following'], ['Reader'])
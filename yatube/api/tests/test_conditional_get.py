@@ -0,0 +1,49 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from posts.models import Post
+
+User = get_user_model()
+
+
+class ConditionalGetTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(
+            email='author@yatube.ru', username='Author', password='pass'
+        )
+        cls.post = Post.objects.create(author=cls.user, text='Пост')
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    def test_not_modified_without_queries(self):
+        for url in (reverse('api:posts-list'),
+                    reverse('api:posts-detail', args=[self.post.pk])):
+            with self.subTest(url=url):
+                etag = self.client.get(url)['ETag']
+                with self.assertNumQueries(0):
+                    response = self.client.get(
+                        url, HTTP_IF_NONE_MATCH=etag
+                    )
+                self.assertEqual(response.status_code, 304)
+
+    def test_new_post_changes_list(self):
+        url = reverse('api:posts-list')
+        etag = self.client.get(url)['ETag']
+        Post.objects.create(author=self.user, text='Новый')
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data[0]['text'], 'Новый')
+
+    def test_edit_changes_post(self):
+        url = reverse('api:posts-detail', args=[self.post.pk])
+        etag = self.client.get(url)['ETag']
+        Post.objects.filter(pk=self.post.pk).first().save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
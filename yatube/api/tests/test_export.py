@@ -0,0 +1,172 @@
+import json
+import os
+import tempfile
+from datetime import timedelta
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from api.export import export_lines
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+def parse(lines):
+    return [json.loads(line) for line in lines]
+
+
+class ExportTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.admin = User.objects.create_superuser(
+            email='admin@yatube.ru', username='Admin', password='pass'
+        )
+        cls.user = User.objects.create_user(
+            email='author@yatube.ru', username='Author', password='pass'
+        )
+        cls.group = Group.objects.create(title='Группа', slug='group')
+        cls.post = Post.objects.create(
+            author=cls.user, text='Пост', group=cls.group
+        )
+        cls.comment = Comment.objects.create(
+            author=cls.admin, post=cls.post, text='Комментарий'
+        )
+        cls.follow = Follow.objects.create(user=cls.admin, author=cls.user)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+        self.url = reverse('api:export')
+
+    def get(self, **params):
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return parse(
+            b''.join(response.streaming_content).decode().splitlines()
+        )
+
+    def test_all_types_exported(self):
+        items = self.get()
+        self.assertEqual(items[0]['type'], 'export')
+        self.assertIsNone(items[0]['since'])
+        self.assertEqual(
+            [item['type'] for item in items[1:]],
+            ['group', 'post', 'comment', 'follow'],
+        )
+        post = self.client.get(
+            reverse('api:posts-detail', args=[self.post.pk])
+        ).data
+        self.assertEqual({**items[2], 'type': 'post'}, {
+            'type': 'post', **post
+        })
+        self.assertEqual(items[4], {
+            'type': 'follow',
+            'id': self.follow.pk,
+            'user': 'Admin',
+            'author': 'Author',
+            'created': items[4]['created'],
+        })
+
+    def test_types_filter(self):
+        items = self.get(types='follows,groups')
+        self.assertEqual(
+            [item['type'] for item in items[1:]], ['follow', 'group']
+        )
+
+    def test_invalid_params(self):
+        for params in ({'types': 'users'}, {'since': 'вчера'}):
+            with self.subTest(params=params):
+                response = self.client.get(self.url, params)
+                self.assertEqual(response.status_code, 400)
+
+    def test_incremental_export(self):
+        until = self.get()[0]['until']
+        new = Post.objects.create(author=self.user, text='Новый')
+        items = self.get(since=until, types='posts,comments,follows')
+        self.assertEqual(items[0]['since'], until)
+        self.assertEqual(
+            [(item['type'], item['id']) for item in items[1:]],
+            [('post', new.pk)],
+        )
+
+    def test_only_staff(self):
+        self.client.force_authenticate(self.user)
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+        self.client.force_authenticate(None)
+        self.assertEqual(self.client.get(self.url).status_code, 401)
+
+
+class KeysetChunkTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            email='author@yatube.ru', username='Author', password='pass'
+        )
+        Post.objects.bulk_create(
+            Post(author=cls.user, text=f'Пост {i}') for i in range(25)
+        )
+        # Одинаковое время у соседей: курсор должен различать их по id.
+        moment = timezone.now() - timedelta(days=1)
+        for index, pk in enumerate(Post.objects.order_by('pk')
+                                   .values_list('pk', flat=True)):
+            Post.objects.filter(pk=pk).update(
+                created=moment + timedelta(seconds=index // 3)
+            )
+
+    def test_every_row_once_in_order(self):
+        with CaptureQueriesContext(connection) as queries:
+            items = parse(export_lines(('posts',), chunk_size=4))
+        ids = list(Post.objects.order_by('created', 'pk')
+                   .values_list('pk', flat=True))
+        self.assertEqual([item['id'] for item in items[1:]], ids)
+        # 25 строк по 4: 7 чанков, каждый - один запрос с LIMIT.
+        self.assertEqual(len(queries), 7)
+        self.assertTrue(all('LIMIT 4' in query['sql']
+                            for query in queries.captured_queries))
+
+
+class ExportCommandTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        user = User.objects.create_user(
+            email='author@yatube.ru', username='Author', password='pass'
+        )
+        Group.objects.create(title='Группа', slug='group')
+        Post.objects.create(author=user, text='Пост')
+
+    def test_writes_file(self):
+        directory = tempfile.mkdtemp()
+        path = os.path.join(directory, 'export.ndjson')
+        out = StringIO()
+        call_command('export_ndjson', output=path, chunk=1, stdout=out)
+        with open(path, encoding='utf-8') as file:
+            items = parse(file)
+        os.remove(path)
+        os.rmdir(directory)
+        self.assertEqual(
+            [item['type'] for item in items], ['export', 'group', 'post']
+        )
+        self.assertIn('Выгружено записей: 2', out.getvalue())
+
+    def test_stdout_and_since(self):
+        out = StringIO()
+        since = (timezone.now() + timedelta(minutes=1)).isoformat()
+        call_command('export_ndjson', since=since, stdout=out)
+        self.assertEqual(
+            [item['type'] for item in parse(out.getvalue().splitlines())],
+            ['export', 'group'],
+        )
+
+    def test_unknown_type(self):
+        with self.assertRaises(CommandError):
+            call_command('export_ndjson', types='users', stdout=StringIO())
@@ -0,0 +1,68 @@
+import base64
+from io import BytesIO
+from unittest import mock
+
+from django.test import SimpleTestCase, override_settings
+from PIL import Image
+from rest_framework.exceptions import ValidationError
+
+from api.fields import Base64ImageField
+
+
+def data_uri(size=(10, 10)):
+    buffer = BytesIO()
+    Image.new('RGB', size, (0, 120, 200)).save(buffer, 'PNG')
+    raw = buffer.getvalue()
+    return raw, 'data:image/png;base64,' + base64.b64encode(raw).decode()
+
+
+class Base64ImageFieldTests(SimpleTestCase):
+    def test_decodes_small_image_in_memory(self):
+        raw, data = data_uri()
+        file = Base64ImageField().to_internal_value(data)
+        self.assertEqual(file.name, 'temp.png')
+        self.assertEqual(file.size, len(raw))
+        self.assertFalse(hasattr(file, 'temporary_file_path'))
+        file.seek(0)
+        self.assertEqual(file.read(), raw)
+
+    @override_settings(FILE_UPLOAD_MAX_MEMORY_SIZE=100)
+    def test_large_image_spools_to_disk(self):
+        """Картинка больше FILE_UPLOAD_MAX_MEMORY_SIZE пишется на диск."""
+        raw, data = data_uri((300, 300))
+        file = Base64ImageField().to_internal_value(data)
+        with open(file.temporary_file_path(), 'rb') as stored:
+            self.assertEqual(stored.read(), raw)
+
+    # Части по 10 символов режут строки base64 не по четверкам.
+    @mock.patch('api.fields.CHUNK_SIZE', 10)
+    @override_settings(FILE_UPLOAD_MAX_MEMORY_SIZE=100)
+    def test_line_breaks_skipped(self):
+        """base64 с переводами строк, как в MIME, декодируется."""
+        raw, data = data_uri((300, 300))
+        header, encoded = data.split(',')
+        lines = [encoded[i:i + 76] for i in range(0, len(encoded), 76)]
+        file = Base64ImageField().to_internal_value(
+            header + ',\r\n' + '\r\n'.join(lines) + ' \n'
+        )
+        self.assertEqual(file.size, len(raw))
+        with open(file.temporary_file_path(), 'rb') as stored:
+            self.assertEqual(stored.read(), raw)
+
+    def test_too_large_rejected_before_decoding(self):
+        raw, data = data_uri()
+        field = Base64ImageField(max_size=len(raw) - 1)
+        with self.assertRaises(ValidationError) as context:
+            field.to_internal_value(data)
+        self.assertEqual(context.exception.detail[0].code, 'too_large')
+
+    def test_invalid_base64(self):
+        field = Base64ImageField()
+        for data in ('data:image/png;base64,abc',
+                     'data:image/png;base64,ab!=',
+                     'data:image/png,abcd'):
+            with self.assertRaises(ValidationError) as context:
+                field.to_internal_value(data)
+            self.assertEqual(
+                context.exception.detail[0].code, 'invalid_base64'
+            )
@@ -0,0 +1,88 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from posts.models import Comment, Post
+
+User = get_user_model()
+
+
+class KeysetPaginationTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(
+            email='author@yatube.ru', username='Author', password='pass'
+        )
+        cls.post = Post.objects.create(author=cls.user, text='Первый пост')
+        for i in range(24):
+            Post.objects.create(author=cls.user, text=f'Пост {i}')
+        for i in range(15):
+            Comment.objects.create(
+                post=cls.post, author=cls.user, text=f'Комментарий {i}'
+            )
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def walk(self, url, **params):
+        """Проходит список по ссылкам next и возвращает все id."""
+        ids = []
+        response = self.client.get(url, params)
+        while True:
+            self.assertEqual(response.status_code, 200)
+            ids.extend(item['id'] for item in response.data['results'])
+            if response.data['next'] is None:
+                return ids
+            response = self.client.get(response.data['next'])
+
+    def test_posts_walk_by_cursor(self):
+        """Список постов листается курсором без пропусков и повторов."""
+        ids = self.walk(reverse('api:posts-list'), page_size=10)
+        expected = list(Post.objects.order_by('-created', '-pk')
+                        .values_list('pk', flat=True))
+        self.assertEqual(ids, expected)
+
+    def test_comments_are_paginated(self):
+        """Комментарии отдаются страницами, а не одним ответом."""
+        url = reverse('api:comments-list', kwargs={'post_id': self.post.pk})
+        response = self.client.get(url, {'page_size': 5})
+        self.assertEqual(len(response.data['results']), 5)
+        self.assertEqual(len(self.walk(url, page_size=5)), 15)
+
+    def test_insert_does_not_shift_pages(self):
+        """Новый пост не сдвигает следующую страницу курсора."""
+        url = reverse('api:posts-list')
+        first = self.client.get(url, {'page_size': 10}).data
+        second = self.client.get(first['next']).data
+        Post.objects.create(author=self.user, text='Свежий пост')
+        again = self.client.get(first['next']).data
+        self.assertEqual(second['results'], again['results'])
+
+    def test_previous_link(self):
+        """Ссылка previous возвращает на предыдущую страницу."""
+        url = reverse('api:posts-list')
+        first = self.client.get(url, {'page_size': 10}).data
+        second = self.client.get(first['next']).data
+        back = self.client.get(second['previous']).data
+        self.assertIsNone(first['previous'])
+        self.assertEqual(back['results'], first['results'])
+
+    def test_bare_list_without_page_params(self):
+        """Без параметров страниц список отдается целиком, как раньше."""
+        response = self.client.get(reverse('api:posts-list'))
+        self.assertIsInstance(response.data, list)
+        self.assertEqual(len(response.data), 25)
+        response = self.client.get(
+            reverse('api:comments-list', kwargs={'post_id': self.post.pk})
+        )
+        self.assertEqual(len(response.data), 15)
+
+    def test_limit_offset_still_supported(self):
+        """Параметры limit/offset работают как раньше."""
+        response = self.client.get(
+            reverse('api:posts-list'), {'limit': 5, 'offset': 20}
+        )
+        self.assertEqual(response.data['count'], 25)
+        self.assertEqual(len(response.data['results']), 5)
@@ -0,0 +1,102 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+@override_settings(QUERY_BUDGET_ENABLED=True, QUERY_BUDGET_STRICT=True)
+class APIQueryCountTests(TestCase):
+    """Число запросов эндпоинтов API не зависит от числа записей."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(
+            email='author@yatube.ru', username='Author', password='pass'
+        )
+        cls.reader = User.objects.create_user(
+            email='reader@yatube.ru', username='Reader', password='pass'
+        )
+        cls.other = User.objects.create_user(
+            email='other@yatube.ru', username='Other', password='pass'
+        )
+        cls.group = Group.objects.create(title='Группа', slug='group')
+        for i in range(5):
+            cls.post = Post.objects.create(
+                author=cls.author, group=cls.group, text=f'Пост {i}'
+            )
+            cls.comment = Comment.objects.create(
+                post=cls.post, author=cls.reader, text=f'Комментарий {i}'
+            )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        Follow.objects.create(user=cls.reader, author=cls.other)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.reader)
+
+    def test_read_endpoints(self):
+        post, comment = self.post.pk, self.comment.pk
+        cases = (
+            (reverse('api:posts-list'), 1),
+            (reverse('api:posts-detail', args=[post]), 1),
+            (reverse('api:comments-list', args=[post]), 2),
+            (reverse('api:comments-detail', args=[post, comment]), 2),
+            (reverse('api:groups-list'), 1),
+            (reverse('api:groups-detail', args=[self.group.pk]), 1),
+            (reverse('api:follows-list'), 1),
+            (reverse('api:follows-list') + '?search=Auth', 1),
+        )
+        for url, count in cases:
+            with self.subTest(url=url):
+                with self.assertNumQueries(count):
+                    response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+
+    def test_comment_create_looks_up_post_once(self):
+        url = reverse('api:comments-list', args=[self.post.pk])
+        # Пост, вставка комментария и счетчик комментариев поста.
+        with self.assertNumQueries(3):
+            response = self.client.post(url, {'text': 'Новый'})
+        self.assertEqual(response.status_code, 201)
+
+    def test_follow_search_by_author_username(self):
+        response = self.client.get(
+            reverse('api:follows-list'), {'search': 'Oth'}
+        )
+        self.assertEqual(
+            [follow['author'] for follow in response.data], ['Other']
+        )
+
+    def test_follow_list_only_own(self):
+        Follow.objects.create(user=self.author, author=self.other)
+        response = self.client.get(reverse('api:follows-list'))
+        self.assertEqual(
+            {follow['user'] for follow in response.data}, {'Reader'}
+        )
+
+    def test_repeated_follow_without_extra_query(self):
+        url = reverse('api:follows-list')
+        Follow.objects.filter(user=self.reader, author=self.other).delete()
+        self.assertEqual(
+            self.client.post(url, {'author': 'Other'}).status_code, 201
+        )
+        # Автор и попытка вставки, откатанная по unique_follow.
+        with self.assertNumQueries(5):
+            response = self.client.post(url, {'author': 'Other'})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(
+            response.data['non_field_errors'],
+            ['Подписка была оформленна ранее'],
+        )
+
+    def test_self_follow_rejected(self):
+        response = self.client.post(
+            reverse('api:follows-list'), {'author': 'Reader'}
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('author', response.data)
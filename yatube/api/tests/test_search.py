@@ -0,0 +1,60 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from posts.models import Post
+
+User = get_user_model()
+
+
+class PostSearchAPITests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(
+            email='author@yatube.ru', username='Author', password='pass'
+        )
+        for i in range(12):
+            Post.objects.create(author=cls.user, text=f'Прогулка номер {i}')
+        cls.best = Post.objects.create(
+            author=cls.user, text='Прогулка, прогулка и еще прогулка'
+        )
+        Post.objects.create(author=cls.user, text='Совсем другой пост')
+
+    def setUp(self):
+        self.client = APIClient()
+        self.url = reverse('api:posts-list')
+
+    def test_search_ranked_and_paginated(self):
+        """Поиск отдает самые релевантные посты первыми, по limit/offset."""
+        response = self.client.get(
+            self.url, {'search': 'прогулки', 'limit': 10}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['count'], 13)
+        self.assertEqual(len(response.data['results']), 10)
+        self.assertEqual(response.data['results'][0]['id'], self.best.pk)
+        second = self.client.get(response.data['next']).data
+        self.assertEqual(len(second['results']), 3)
+
+    def test_blank_search_keeps_cursor_pagination(self):
+        response = self.client.get(
+            self.url, {'search': ' ', 'page_size': 10}
+        )
+        self.assertNotIn('count', response.data)
+        self.assertEqual(len(response.data['results']), 10)
+
+    def test_search_respects_page_size(self):
+        """page_size с поиском работает так же, как без него."""
+        response = self.client.get(
+            self.url, {'search': 'прогулки', 'page_size': 3}
+        )
+        self.assertEqual(len(response.data['results']), 3)
+        self.assertEqual(response.data['results'][0]['id'], self.best.pk)
+        second = self.client.get(response.data['next']).data
+        self.assertEqual(len(second['results']), 3)
+        response = self.client.get(
+            self.url, {'search': 'прогулки', 'page_size': 3, 'limit': 5}
+        )
+        self.assertEqual(len(response.data['results']), 5)
@@ -0,0 +1,88 @@
+from collections import OrderedDict
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from api.serializers import CommentSerializer, PostSerializer
+from posts.models import Comment, Group, Post
+
+User = get_user_model()
+
+
+class ValuesListTests(TestCase):
+    """Списки через .values() совпадают с выводом сериализаторов."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(
+            email='author@yatube.ru', username='Author', password='pass'
+        )
+        cls.group = Group.objects.create(title='Группа', slug='group')
+        for i in range(12):
+            Post.objects.create(
+                author=cls.user, text=f'Пост "{i}" — ok',
+                group=cls.group if i % 2 else None,
+            )
+        cls.post = Post.objects.create(author=cls.user, text='С картинкой')
+        # Файл не нужен: в ответе только адрес картинки.
+        Post.objects.filter(pk=cls.post.pk).update(image='posts/pic.webp')
+        for i in range(3):
+            Comment.objects.create(
+                post=cls.post, author=cls.user, text=f'Комментарий {i}'
+            )
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def expected(self, response, serializer, objects):
+        data = serializer(
+            objects, many=True, context={'request': response.wsgi_request}
+        ).data
+        if 'results' in response.data:
+            data = OrderedDict(
+                [(key, response.data[key]) for key in response.data
+                 if key != 'results'] + [('results', data)]
+            )
+        return JSONRenderer().render(data)
+
+    def ids(self, response):
+        items = response.data
+        if 'results' in items:
+            items = items['results']
+        return [item['id'] for item in items]
+
+    def test_posts_match_serializer(self):
+        url = reverse('api:posts-list')
+        for params in ({}, {'page_size': 10}, {'limit': 5, 'offset': 3}):
+            with self.subTest(params=params):
+                response = self.client.get(url, params)
+                ids = self.ids(response)
+                posts = sorted(Post.objects.filter(pk__in=ids),
+                               key=lambda post: ids.index(post.pk))
+                self.assertEqual(
+                    response.content,
+                    self.expected(response, PostSerializer, posts),
+                )
+        response = self.client.get(url)
+        self.assertEqual(response.data[0]['image'],
+                         'http://testserver/media/posts/pic.webp')
+
+    def test_comments_match_serializer(self):
+        response = self.client.get(
+            reverse('api:comments-list', args=[self.post.pk])
+        )
+        ids = self.ids(response)
+        comments = sorted(Comment.objects.filter(pk__in=ids),
+                          key=lambda comment: ids.index(comment.pk))
+        self.assertEqual(
+            response.content,
+            self.expected(response, CommentSerializer, comments),
+        )
+
+    def test_list_query_count(self):
+        with self.assertNumQueries(1):
+            self.client.get(reverse('api:posts-list'), {'page_size': 100})
@@ -1,7 +1,13 @@
 from django.urls import include, path
 from rest_framework import routers
 
-from api.views import CommentViewSet, FollowViewSet, GroupViewSet, PostViewSet
+from api.views import (
+    CommentViewSet,
+    ExportView,
+    FollowViewSet,
+    GroupViewSet,
+    PostViewSet
+)
 
 
 app_name = 'api'
@@ -15,6 +21,7 @@ router.register(r'posts/(?P<post_id>\d+)/comments', CommentViewSet,
                 )
 
 urlpatterns = [
+    path('v1/export/', ExportView.as_view(), name='export'),
     path('v1/', include(router.urls)),
     path('v1/', include('djoser.urls')),
     path('v1/', include('djoser.urls.jwt')),
@@ -1,15 +1,79 @@
+from django.http import StreamingHttpResponse
 from django.shortcuts import get_object_or_404
-from rest_framework import filters, mixins, permissions, viewsets
-from rest_framework.pagination import LimitOffsetPagination
-
+from django.utils.decorators import method_decorator
+from django.utils.functional import cached_property
+from django.views.decorators.http import condition
+from rest_framework import filters, mixins, permissions, status, viewsets
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from api import export
+from api.filters import PostSearchFilter
+from api.pagination import KeysetPagination
 from api.permissions import IsAuthorOrReadOnly, ReadOnly
 from api.serializers import (
     CommentSerializer,
+    FollowBulkCreateSerializer,
+    FollowBulkSerializer,
     FollowSerializer,
     GroupSerializer,
     PostSerializer
 )
-from posts.models import Group, Post
+from posts import feed_cache
+from posts.bulk import create_follows, delete_follows
+from posts.models import CustomUser, Follow, Group, Post
+
+
+# Ответ не зависит от пользователя: в ETag только поколения лент.
+def posts_etag(request):
+    return feed_cache.version('index')
+
+
+def post_etag(request, pk):
+    return feed_cache.version(f'post:{pk}')
+
+
+class ValuesListMixin:
+    """
+    list() по строкам .values() вместо объектов моделей.
+
+    Сериализатор должен уметь values() и represent_values()
+    (api.serializers.ValuesSerializerMixin).
+    """
+
+    def list(self, request, *args, **kwargs):
+        serializer_class = self.get_serializer_class()
+        queryset = serializer_class.values(
+            self.filter_queryset(self.get_queryset())
+        )
+        page = self.paginate_queryset(queryset)
+        data = serializer_class.represent_values(
+            queryset if page is None else page,
+            self.get_serializer_context(),
+        )
+        if page is None:
+            return Response(data)
+        return self.get_paginated_response(data)
+
+
+class BulkCreateMixin:
+    """
+    POST .../bulk/: создание списка объектов одним запросом.
+
+    Элементы проверяются сериализатором с many=True. Если хоть один
+    неверен, ничего не создается, а в ответе 400 - ошибки по порядку
+    элементов ({} у верных). Иначе все создаются одной транзакцией
+    (list_serializer_class сериализатора) и возвращаются по порядку.
+    """
+
+    @action(detail=False, methods=['post'])
+    def bulk(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data, many=True)
+        serializer.is_valid(raise_exception=True)
+        self.perform_create(serializer)
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
 
 
 class GroupViewSet(viewsets.ReadOnlyModelViewSet):
@@ -17,11 +81,14 @@ class GroupViewSet(viewsets.ReadOnlyModelViewSet):
     serializer_class = GroupSerializer
 
 
-class PostViewSet(viewsets.ModelViewSet):
-    queryset = Post.objects.all()
+@method_decorator(condition(etag_func=posts_etag), name='list')
+@method_decorator(condition(etag_func=post_etag), name='retrieve')
+class PostViewSet(BulkCreateMixin, ValuesListMixin, viewsets.ModelViewSet):
+    queryset = Post.objects.select_related('author')
     serializer_class = PostSerializer
     permission_classes = (IsAuthorOrReadOnly,)
-    pagination_class = LimitOffsetPagination
+    pagination_class = KeysetPagination
+    filter_backends = (PostSearchFilter,)
 
     def perform_create(self, serializer):
         serializer.save(author=self.request.user)
@@ -32,19 +99,22 @@ class PostViewSet(viewsets.ModelViewSet):
         return super().get_permissions()
 
 
-class CommentViewSet(viewsets.ModelViewSet):
+class CommentViewSet(BulkCreateMixin, ValuesListMixin,
+                     viewsets.ModelViewSet):
     serializer_class = CommentSerializer
     permission_classes = (IsAuthorOrReadOnly,)
+    pagination_class = KeysetPagination
 
-    def get_post(self):
+    @cached_property
+    def parent_post(self):
+        # Представление создается на каждый запрос: пост ищется один раз.
         return get_object_or_404(Post, id=self.kwargs['post_id'])
 
     def perform_create(self, serializer):
-        serializer.save(author=self.request.user, post=self.get_post())
+        serializer.save(author=self.request.user, post=self.parent_post)
 
     def get_queryset(self):
-        post = self.get_post()
-        return post.comments.all()
+        return self.parent_post.comments.select_related('author')
 
     def get_permissions(self):
         if self.action == 'retrieve':
@@ -57,11 +127,90 @@ class FollowViewSet(mixins.CreateModelMixin, mixins.ListModelMixin,
                     ):
     serializer_class = FollowSerializer
     filter_backends = (filters.SearchFilter,)
-    search_fields = ('following__username',)
+    # Подписки пользователя выбираются по индексу user_id, авторы - по
+    # первичному ключу (план в benchmarks/bench_indexes.py).
+    search_fields = ('author__username',)
     permission_classes = [permissions.IsAuthenticated]
 
     def get_queryset(self):
-        return self.request.user.follow.all()
+        return Follow.objects.filter(
+            user=self.request.user
+        ).select_related('user', 'author')
 
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
+
+    def get_authors(self, serializer_class=FollowBulkSerializer):
+        """
+        Авторы из списка имен запроса одним запросом к базе.
+
+        Возвращает {имя: id} в порядке запроса и ненайденные имена.
+        """
+        serializer = serializer_class(
+            data=self.request.data, context=self.get_serializer_context()
+        )
+        serializer.is_valid(raise_exception=True)
+        names = serializer.validated_data['authors']
+        ids = dict(CustomUser.objects.filter(
+            username__in=names
+        ).values_list('username', 'pk'))
+        found = {name: ids[name] for name in names if name in ids}
+        return found, [name for name in names if name not in ids]
+
+    @action(detail=False, methods=['post'])
+    def bulk(self, request):
+        """Подписка на список авторов {"authors": [имена]}."""
+        found, missing = self.get_authors(FollowBulkCreateSerializer)
+        created = {author for _, author in create_follows(
+            (request.user.pk, author) for author in found.values()
+        )}
+        return Response({
+            'created': [name for name, pk in found.items() if pk in created],
+            'existing': [
+                name for name, pk in found.items() if pk not in created
+            ],
+            'not_found': missing,
+        })
+
+    @action(detail=False, methods=['post'], url_path='bulk/delete')
+    def bulk_delete(self, request):
+        """Отписка от списка авторов {"authors": [имена]}."""
+        found, missing = self.get_authors()
+        deleted = set(delete_follows(request.user.pk, found.values()))
+        return Response({
+            'deleted': [name for name, pk in found.items() if pk in deleted],
+            'not_following': [
+                name for name, pk in found.items() if pk not in deleted
+            ],
+            'not_found': missing,
+        })
+
+
+class ExportView(APIView):
+    """
+    GET /api/v1/export/: выгрузка всех данных в NDJSON (api.export).
+
+    Параметры: types - типы через запятую, since и until - границы
+    created для выгрузки изменений с прошлого раза.
+    """
+    permission_classes = (permissions.IsAdminUser,)
+
+    def get(self, request):
+        params = request.query_params
+        try:
+            types = export.parse_types(params.get('types'))
+        except ValueError as error:
+            raise ValidationError({'types': [str(error)]})
+        bounds = {}
+        for name in ('since', 'until'):
+            if params.get(name):
+                try:
+                    bounds[name] = export.parse_moment(params[name])
+                except ValueError as error:
+                    raise ValidationError({name: [str(error)]})
+        return StreamingHttpResponse(
+            export.export_lines(
+                types, context={'request': request}, **bounds
+            ),
+            content_type='application/x-ndjson; charset=utf-8',
+        )
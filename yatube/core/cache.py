@@ -0,0 +1,270 @@
+"""
+Кеш Django в файле SQLite, общий для всех процессов на машине.
+
+LocMemCache у каждого воркера свой: кеш холодный после перезапуска,
+данные дублируются, а сброс фрагмента или счетчик поколения ленты
+(posts.feed_cache) в одном воркере не видны другим. Здесь записи
+лежат в одном файле SQLite в режиме WAL: читатели не ждут писателей,
+а запись идет одной короткой транзакцией.
+
+Размер ограничен MAX_ENTRIES: при переполнении сначала удаляются
+просроченные записи, потом давно не читанные (LRU) - до
+MAX_ENTRIES - MAX_ENTRIES / CULL_FREQUENCY. Время чтения обновляется
+не чаще раза в ACCESS_RESOLUTION секунд, чтобы чтение почти никогда
+не становилось записью.
+
+Целые числа хранятся как INTEGER SQLite, поэтому incr - один UPDATE
+без чтения и гонок между процессами. Остальные значения - pickle.
+
+    CACHES = {
+        'default': {
+            'BACKEND': 'core.cache.SQLiteCache',
+            'LOCATION': '/var/tmp/yatube_cache.sqlite3',
+            'OPTIONS': {'MAX_ENTRIES': 10000},
+        }
+    }
+"""
+import pickle
+import sqlite3
+import time
+from contextlib import contextmanager
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+from core.sqlite import LocalConnection, chunked
+
+# Не чаще чем раз в столько секунд чтение обновляет время доступа.
+ACCESS_RESOLUTION = 1
+
+SCHEMA = (
+    'CREATE TABLE IF NOT EXISTS cache ('
+    ' key TEXT PRIMARY KEY, value BLOB, expires REAL, accessed REAL)',
+    'CREATE INDEX IF NOT EXISTS cache_accessed ON cache (accessed)',
+    'CREATE INDEX IF NOT EXISTS cache_expires ON cache (expires)',
+    'CREATE TABLE IF NOT EXISTS cache_stats ('
+    ' name TEXT PRIMARY KEY, value INTEGER NOT NULL)',
+)
+
+
+def dump(value):
+    # bool - тоже int, но incr для него не нужен.
+    if type(value) is int:
+        return value
+    return pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+
+
+def load(value):
+    if isinstance(value, int):
+        return value
+    return pickle.loads(value)
+
+
+class SQLiteCache(BaseCache):
+    def __init__(self, location, params):
+        super().__init__(params)
+        self.location = location
+        self._connection = LocalConnection(self._connect)
+        self.hits = 0
+        self.misses = 0
+
+    def _connect(self):
+        connection = sqlite3.connect(
+            self.location, timeout=10, isolation_level=None
+        )
+        connection.execute('PRAGMA journal_mode=WAL')
+        connection.execute('PRAGMA synchronous=NORMAL')
+        for statement in SCHEMA:
+            connection.execute(statement)
+        return connection
+
+    @property
+    def connection(self):
+        return self._connection.get()
+
+    @contextmanager
+    def _write(self):
+        """Транзакция записи, сразу берет блокировку файла."""
+        connection = self.connection
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            yield connection
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+        connection.execute('COMMIT')
+
+    def _key(self, key, version):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return key
+
+    def _fetch(self, keys):
+        """Живые записи keys: {ключ: значение}, обновляет время чтения."""
+        now = time.time()
+        found, stale = {}, []
+        for chunk in chunked(keys):
+            rows = self.connection.execute(
+                'SELECT key, value, expires, accessed FROM cache '
+                'WHERE key IN ({})'.format(', '.join('?' * len(chunk))),
+                chunk,
+            )
+            for key, value, expires, accessed in rows:
+                if expires is not None and expires <= now:
+                    continue
+                found[key] = load(value)
+                if now - accessed > ACCESS_RESOLUTION:
+                    stale.append((now, key))
+        if stale:
+            with self._write() as connection:
+                connection.executemany(
+                    'UPDATE cache SET accessed = ? WHERE key = ?', stale
+                )
+        self.hits += len(found)
+        self.misses += len(keys) - len(found)
+        return found
+
+    def _store(self, items, timeout, only_new=False):
+        """Записывает пары (ключ, значение), возвращает число записанных."""
+        now = time.time()
+        expires = self.get_backend_timeout(timeout)
+        rows = [(key, dump(value), expires, now) for key, value in items]
+        if only_new:
+            # Просроченная запись считается отсутствующей.
+            sql = (
+                'INSERT INTO cache VALUES (?, ?, ?, ?) '
+                'ON CONFLICT (key) DO UPDATE SET value = excluded.value, '
+                'expires = excluded.expires, accessed = excluded.accessed '
+                'WHERE cache.expires <= excluded.accessed'
+            )
+        else:
+            sql = 'INSERT OR REPLACE INTO cache VALUES (?, ?, ?, ?)'
+        with self._write() as connection:
+            before = connection.total_changes
+            connection.executemany(sql, rows)
+            stored = connection.total_changes - before
+            self._cull(connection, now)
+        return stored
+
+    def _cull(self, connection, now):
+        (count,) = connection.execute('SELECT count(*) FROM cache').fetchone()
+        if count <= self._max_entries:
+            return
+        connection.execute('DELETE FROM cache WHERE expires <= ?', (now,))
+        (count,) = connection.execute('SELECT count(*) FROM cache').fetchone()
+        keep = self._max_entries
+        if self._cull_frequency:
+            keep -= self._max_entries // self._cull_frequency
+        if count <= keep:
+            return
+        connection.execute(
+            'DELETE FROM cache WHERE key IN ('
+            ' SELECT key FROM cache ORDER BY accessed LIMIT ?)',
+            (count - keep,),
+        )
+        connection.execute(
+            'INSERT INTO cache_stats VALUES (\'evictions\', ?) '
+            'ON CONFLICT (name) DO UPDATE SET value = value + excluded.value',
+            (count - keep,),
+        )
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        return bool(self._store([(key, value)], timeout, only_new=True))
+
+    def get(self, key, default=None, version=None):
+        key = self._key(key, version)
+        return self._fetch([key]).get(key, default)
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self._store([(self._key(key, version), value)], timeout)
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        updated = self.connection.execute(
+            'UPDATE cache SET expires = ? '
+            'WHERE key = ? AND (expires IS NULL OR expires > ?)',
+            (self.get_backend_timeout(timeout), key, time.time()),
+        ).rowcount
+        return bool(updated)
+
+    def delete(self, key, version=None):
+        self.delete_many([key], version=version)
+
+    def get_many(self, keys, version=None):
+        keys = {self._key(key, version): key for key in keys}
+        found = self._fetch(list(keys))
+        return {keys[key]: value for key, value in found.items()}
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        self._store(
+            [(self._key(key, version), value) for key, value in data.items()],
+            timeout,
+        )
+        return []
+
+    def delete_many(self, keys, version=None):
+        keys = [self._key(key, version) for key in keys]
+        with self._write() as connection:
+            for chunk in chunked(keys):
+                connection.execute(
+                    'DELETE FROM cache WHERE key IN ({})'.format(
+                        ', '.join('?' * len(chunk))
+                    ),
+                    chunk,
+                )
+
+    def has_key(self, key, version=None):
+        key = self._key(key, version)
+        row = self.connection.execute(
+            'SELECT 1 FROM cache WHERE key = ? '
+            'AND (expires IS NULL OR expires > ?)',
+            (key, time.time()),
+        ).fetchone()
+        return row is not None
+
+    def incr(self, key, delta=1, version=None):
+        """Атомарно прибавляет delta к целому значению."""
+        key = self._key(key, version)
+        with self._write() as connection:
+            row = connection.execute(
+                'UPDATE cache SET value = value + ? '
+                'WHERE key = ? AND typeof(value) = \'integer\' '
+                'AND (expires IS NULL OR expires > ?) RETURNING value',
+                (delta, key, time.time()),
+            ).fetchone()
+        if row is not None:
+            return row[0]
+        found = self._fetch([key])
+        if key not in found:
+            raise ValueError("Key '%s' not found" % key)
+        # Не целое значение, например float: как в BaseCache.incr.
+        value = found[key] + delta
+        self._store([(key, value)], DEFAULT_TIMEOUT)
+        return value
+
+    def clear(self):
+        self.connection.execute('DELETE FROM cache')
+
+    def close(self, **kwargs):
+        # Соединение живет все время процесса, как у LocMemCache.
+        pass
+
+    def stats(self):
+        """Попадания и промахи процесса, вытеснения и размер кеша."""
+        connection = self.connection
+        entries, size = connection.execute(
+            'SELECT count(*), coalesce(sum(length(value)), 0) FROM cache'
+        ).fetchone()
+        row = connection.execute(
+            'SELECT value FROM cache_stats WHERE name = \'evictions\''
+        ).fetchone()
+        total = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / total if total else 0.0,
+            'evictions': row[0] if row else 0,
+            'entries': entries,
+            'max_entries': self._max_entries,
+            'bytes': size,
+        }
@@ -0,0 +1,145 @@
+"""
+Хранилище метаданных sorl-thumbnail: LRU в памяти поверх SQLite.
+
+Тег {% thumbnail %} на каждый вызов читает из хранилища запись
+миниатюры. Стандартное хранилище ходит в кеш и базу, а LocMemCache у
+каждого процесса свой. Здесь записи лежат в отдельном файле SQLite
+(WAL, общий для всех процессов), а горячие ключи - в LRU процесса,
+так что повторный показ миниатюры не выходит из памяти.
+
+Отсутствующие ключи в LRU не кешируются: миниатюру мог только что
+подготовить другой процесс.
+"""
+import sqlite3
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from sorl.thumbnail import default
+from sorl.thumbnail.kvstores.base import KVStoreBase, add_prefix
+
+from core.sqlite import LocalConnection, chunked
+
+
+class KVStore(KVStoreBase):
+    def __init__(self, path=None, size=None):
+        super().__init__()
+        self.path = path
+        self.size = size
+        self.reset()
+
+    def reset(self):
+        """Забывает соединения, LRU и статистику."""
+        self._connection = LocalConnection(self._connect)
+        self._lock = threading.Lock()
+        self._lru = OrderedDict()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def _connect(self):
+        path = self.path or settings.THUMBNAIL_KVSTORE_PATH
+        connection = sqlite3.connect(path, timeout=10)
+        connection.execute('PRAGMA journal_mode=WAL')
+        connection.execute(
+            'CREATE TABLE IF NOT EXISTS kvstore '
+            '(key TEXT PRIMARY KEY, value TEXT NOT NULL)'
+        )
+        return connection
+
+    @property
+    def connection(self):
+        return self._connection.get()
+
+    def _remember(self, key, value):
+        size = self.size or settings.THUMBNAIL_KVSTORE_SIZE
+        with self._lock:
+            self._lru[key] = value
+            self._lru.move_to_end(key)
+            while len(self._lru) > size:
+                self._lru.popitem(last=False)
+
+    def _get_raw(self, key):
+        with self._lock:
+            value = self._lru.get(key)
+            if value is not None:
+                self._lru.move_to_end(key)
+                self.hits += 1
+                return value
+        row = self.connection.execute(
+            'SELECT value FROM kvstore WHERE key = ?', (key,)
+        ).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        self.disk_hits += 1
+        self._remember(key, row[0])
+        return row[0]
+
+    def _set_raw(self, key, value):
+        with self.connection:
+            self.connection.execute(
+                'INSERT OR REPLACE INTO kvstore (key, value) VALUES (?, ?)',
+                (key, value)
+            )
+        self._remember(key, value)
+
+    def _delete_raw(self, *keys):
+        with self.connection:
+            self.connection.executemany(
+                'DELETE FROM kvstore WHERE key = ?', ((key,) for key in keys)
+            )
+        with self._lock:
+            for key in keys:
+                self._lru.pop(key, None)
+
+    def _find_keys_raw(self, prefix):
+        rows = self.connection.execute(
+            'SELECT key FROM kvstore WHERE substr(key, 1, ?) = ?',
+            (len(prefix), prefix)
+        )
+        return [key for key, in rows]
+
+    def prefetch(self, image_files):
+        """
+        Загружает в LRU записи файлов одним запросом на CHUNK_SIZE
+        ключей (core.sqlite).
+
+        Вызывается перед выводом ленты, чтобы теги {% thumbnail %}
+        на странице не обращались к SQLite по одному.
+        """
+        with self._lock:
+            keys = [
+                key for key in (
+                    add_prefix(image_file.key) for image_file in image_files
+                )
+                if key not in self._lru
+            ]
+        for chunk in chunked(keys):
+            rows = self.connection.execute(
+                'SELECT key, value FROM kvstore WHERE key IN (%s)'
+                % ', '.join('?' * len(chunk)), chunk
+            ).fetchall()
+            for key, value in rows:
+                self._remember(key, value)
+
+    def stats(self):
+        """Попадания в LRU и в SQLite, промахи и доля попаданий в память."""
+        total = self.hits + self.disk_hits + self.misses
+        return {
+            'hits': self.hits,
+            'disk_hits': self.disk_hits,
+            'misses': self.misses,
+            'size': len(self._lru),
+            'hit_rate': self.hits / total if total else 0.0,
+        }
+
+
+@receiver(setting_changed)
+def reset_kvstore(setting, **kwargs):
+    """Тесты с другим файлом хранилища не должны видеть старый LRU."""
+    if (setting.startswith('THUMBNAIL_KVSTORE')
+            and isinstance(default.kvstore._wrapped, KVStore)):
+        default.kvstore.reset()
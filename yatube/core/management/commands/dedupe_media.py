@@ -0,0 +1,71 @@
+from collections import defaultdict
+
+from django.apps import apps
+from django.core.management.base import BaseCommand
+from django.db import models, transaction
+from django.db.models import Count
+from sorl.thumbnail import delete as delete_with_thumbnails
+from sorl.thumbnail.images import ImageFile
+
+from core.storage import BLOBS_DIR, DedupStorage
+
+
+def file_fields():
+    """Поля FileField всех моделей, которые пишут в хранилище по хешу."""
+    for model in apps.get_models():
+        for field in model._meta.concrete_fields:
+            if (isinstance(field, models.FileField)
+                    and isinstance(field.storage, DedupStorage)):
+                yield model, field
+
+
+def legacy_names():
+    """Старые имена файлов и где на них ссылаются: {имя: [(модель, поле)]}."""
+    names = defaultdict(list)
+    for model, field in file_fields():
+        rows = model.objects.exclude(
+            **{f'{field.name}__startswith': BLOBS_DIR + '/'}
+        ).exclude(**{field.name: ''}).exclude(
+            **{f'{field.name}__isnull': True}
+        ).values_list(field.name).annotate(count=Count('pk'))
+        for name, count in rows:
+            names[name].append((model, field, count))
+    return names
+
+
+class Command(BaseCommand):
+    help = (
+        'Переносит загруженные файлы из MEDIA_ROOT в хранилище по хешу '
+        'и обновляет ссылки на них в базе.'
+    )
+
+    def handle(self, *args, **options):
+        names = legacy_names()
+        self.stdout.write(f'Файлов со старыми именами: {len(names)}')
+        moved = missing = saved = 0
+        for name, fields in names.items():
+            storage = fields[0][1].storage
+            if not storage.exists(name):
+                missing += 1
+                continue
+            size = storage.size(name)
+            with transaction.atomic():
+                refs = sum(count for model, field, count in fields)
+                new_name = storage.adopt(name, refs)
+                if storage.refs(new_name) > refs:
+                    saved += size
+                for model, field, count in fields:
+                    model.objects.filter(**{field.name: name}).update(
+                        **{field.name: new_name}
+                    )
+                transaction.on_commit(
+                    lambda name=name, storage=storage: delete_with_thumbnails(
+                        ImageFile(name, storage), delete_file=False
+                    )
+                )
+            moved += 1
+        self.stdout.write(
+            f'Перенесено: {moved}, нет на диске: {missing}, '
+            f'освобождено: {saved / 2 ** 20:.1f} МБ'
+        )
+        self.stdout.write(self.style.SUCCESS('Файлы перенесены.'))
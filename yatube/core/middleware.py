@@ -0,0 +1,32 @@
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection
+
+from core import queries
+
+
+class QueryBudgetMiddleware:
+    """
+    Считает запросы к базе за время обработки запроса.
+
+    Статистика сохраняется по имени представления, превышение бюджета
+    из QUERY_BUDGETS пишется в лог, а в строгом режиме - падает.
+    Работает только при DEBUG или QUERY_BUDGET_ENABLED.
+    """
+
+    def __init__(self, get_response):
+        if not (settings.DEBUG or settings.QUERY_BUDGET_ENABLED):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        recorder = queries.QueryRecorder(
+            strict_lazy=settings.TEMPLATE_LAZY_LOAD_STRICT
+        )
+        with connection.execute_wrapper(recorder):
+            response = self.get_response(request)
+        match = request.resolver_match
+        if match is not None:
+            queries.record(match.view_name, recorder)
+            queries.check_budget(match.view_name, recorder)
+        return response
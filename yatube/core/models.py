@@ -10,3 +10,17 @@ class CreatedModel(models.Model):
 
     class Meta:
         abstract = True
+
+
+class Blob(models.Model):
+    """Файл хранилища по хешу и число ссылок на него."""
+    name = models.CharField('Имя файла', max_length=255, primary_key=True)
+    size = models.PositiveIntegerField('Размер, байт')
+    refs = models.PositiveIntegerField('Ссылок', default=1)
+
+    class Meta:
+        verbose_name = 'Файл'
+        verbose_name_plural = 'Файлы'
+
+    def __str__(self):
+        return self.name
@@ -0,0 +1,159 @@
+import base64
+import binascii
+
+from django.conf import settings
+from django.core.paginator import Page, Paginator
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+# Параметры запроса с курсорами для постраничного вывода по ключу.
+CURSOR_AFTER = 'after'
+CURSOR_BEFORE = 'before'
+
+
+def encode_cursor(obj):
+    """Упаковывает пару (created, id) записи в непрозрачный курсор."""
+    if isinstance(obj, dict):
+        # Строка .values().
+        raw = f'{obj["created"].isoformat()}|{obj["id"]}'
+    else:
+        raw = f'{obj.created.isoformat()}|{obj.pk}'
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Распаковывает курсор в пару (created, id) или возвращает None."""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        raw = base64.urlsafe_b64decode(padded.encode()).decode()
+        created, pk = raw.split('|')
+        created = parse_datetime(created)
+        pk = int(pk)
+    except (ValueError, binascii.Error, UnicodeDecodeError):
+        return None
+    if created is None:
+        return None
+    return created, pk
+
+
+def keyset_queryset(queryset, keys, after=None, before=None):
+    """
+    Отбирает записи после пары after или перед парой before.
+
+    Без before записи идут от новых к старым, с before - в обратном
+    порядке, начиная с ближайшей к курсору.
+    """
+    created_key, pk_key = keys
+    if after is not None:
+        created, pk = after
+        return queryset.filter(
+            Q(**{f'{created_key}__lt': created})
+            | Q(**{created_key: created, f'{pk_key}__lt': pk})
+        ).order_by(f'-{created_key}', f'-{pk_key}')
+    if before is not None:
+        created, pk = before
+        return queryset.filter(
+            Q(**{f'{created_key}__gt': created})
+            | Q(**{created_key: created, f'{pk_key}__gt': pk})
+        ).order_by(created_key, pk_key)
+    return queryset.order_by(f'-{created_key}', f'-{pk_key}')
+
+
+class KeysetPage(Page):
+    """Страница, которая знает соседей без подсчета общего числа записей."""
+    is_keyset = True
+
+    def __init__(self, object_list, paginator, has_next, has_previous):
+        super().__init__(object_list, None, paginator)
+        self._has_next = has_next
+        self._has_previous = has_previous
+
+    def __repr__(self):
+        return '<Keyset page>'
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    def has_other_pages(self):
+        return self._has_next or self._has_previous
+
+    def next_cursor(self):
+        if not self._has_next or not self.object_list:
+            return None
+        return encode_cursor(self.object_list[-1])
+
+    def previous_cursor(self):
+        if not self._has_previous or not self.object_list:
+            return None
+        return encode_cursor(self.object_list[0])
+
+
+class KeysetPaginator(Paginator):
+    """
+    Постраничный вывод по ключу (created, id) вместо LIMIT/OFFSET.
+
+    Каждая страница - один запрос по индексу с LIMIT per_page + 1,
+    поэтому N-я страница стоит столько же, сколько первая.
+    Поля ключа можно переопределить через keys, если значения
+    совпадают с created и pk объектов страницы.
+    """
+
+    def __init__(self, object_list, per_page, keys=('created', 'pk')):
+        self.keys = keys
+        created, pk = keys
+        super().__init__(
+            object_list.order_by(f'-{created}', f'-{pk}'), per_page
+        )
+
+    def fetch(self, after, before, limit):
+        """
+        Выбирает до limit записей после after или перед before.
+
+        Записи перед курсором before возвращаются в прямом порядке.
+        """
+        queryset = keyset_queryset(self.object_list, self.keys, after, before)
+        return list(queryset[:limit])
+
+    def load(self, rows):
+        """Превращает строки fetch в объекты страницы."""
+        return rows
+
+    def get_keyset_page(self, after=None, before=None):
+        """Возвращает страницу после курсора after или перед before."""
+        after = decode_cursor(after) if after else None
+        before = decode_cursor(before) if before else None
+        if after is None and before is not None:
+            rows = self.fetch(None, before, self.per_page + 1)
+            if len(rows) <= self.per_page:
+                # Дошли до начала ленты - отдаем полную первую страницу.
+                return self.get_keyset_page()
+            rows = rows[:self.per_page]
+            rows.reverse()
+            return KeysetPage(
+                self.load(rows), self, has_next=True, has_previous=True
+            )
+        rows = self.fetch(after, None, self.per_page + 1)
+        return KeysetPage(
+            self.load(rows[:self.per_page]), self,
+            has_next=len(rows) > self.per_page,
+            has_previous=after is not None,
+        )
+
+
+def paginate(request, object_list, per_page, keys=('created', 'pk')):
+    """
+    Возвращает страницу ленты.
+
+    Режим по ключу включается настройкой FEED_PAGINATION = 'keyset'
+    или наличием курсора в запросе, иначе работает обычный Paginator.
+    """
+    after = request.GET.get(CURSOR_AFTER)
+    before = request.GET.get(CURSOR_BEFORE)
+    if after or before or settings.FEED_PAGINATION == 'keyset':
+        paginator = KeysetPaginator(object_list, per_page, keys)
+        return paginator.get_keyset_page(after=after, before=before)
+    paginator = Paginator(object_list, per_page)
+    return paginator.get_page(request.GET.get('page'))
@@ -0,0 +1,168 @@
+"""
+Учет запросов к базе данных по представлениям.
+
+QueryRecorder подключается через connection.execute_wrapper, считает
+запросы, их суммарное время и повторы одинаковых SQL (отпечатки).
+Статистика копится по имени представления, например 'posts:index'.
+"""
+import logging
+import re
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.template.base import Variable
+from django.template.defaulttags import ForNode
+
+logger = logging.getLogger(__name__)
+
+_STRINGS = re.compile(r"'(?:[^']|'')*'")
+_NUMBERS = re.compile(r'\b\d+\b')
+_IN_LISTS = re.compile(r'\(\s*(?:%s|\?)(?:\s*,\s*(?:%s|\?))*\s*\)')
+
+_LOOP_CODE = ForNode.render.__code__
+_LOOKUP_CODE = Variable._resolve_lookup.__code__
+
+
+class QueryBudgetExceeded(Exception):
+    """Представление выполнило больше запросов, чем ему положено."""
+
+
+class LazyLoadError(Exception):
+    """Связанные данные подгружены лениво внутри цикла шаблона."""
+
+
+def fingerprint(sql):
+    """Приводит SQL к виду без литералов, чтобы находить повторы."""
+    sql = _STRINGS.sub('?', sql)
+    sql = _NUMBERS.sub('?', sql)
+    return _IN_LISTS.sub('(...)', sql)
+
+
+def in_template_loop():
+    """
+    Запрос выполняется из переменной шаблона внутри {% for %}.
+
+    Это обращение к связанному полю или менеджеру на каждой итерации
+    (например, post.author или post.comments.count), то есть N+1.
+    Вложенный цикл по связанным данным ловится так же.
+    """
+    loops = 0
+    lookup = False
+    frame = sys._getframe(1)
+    while frame is not None:
+        if frame.f_code is _LOOP_CODE:
+            loops += 1
+            if lookup or loops > 1:
+                return True
+        elif frame.f_code is _LOOKUP_CODE:
+            lookup = True
+        frame = frame.f_back
+    return False
+
+
+class QueryRecorder:
+    """Обертка для connection.execute_wrapper, записывающая запросы."""
+
+    def __init__(self, strict_lazy=False):
+        self.strict_lazy = strict_lazy
+        self.queries = []
+        self._duplicates = None
+
+    def __call__(self, execute, sql, params, many, context):
+        if self.strict_lazy and in_template_loop():
+            raise LazyLoadError(
+                f'Ленивая загрузка внутри цикла шаблона: {sql}'
+            )
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append((sql, time.perf_counter() - start))
+
+    @property
+    def count(self):
+        return len(self.queries)
+
+    @property
+    def duration(self):
+        return sum(duration for _, duration in self.queries)
+
+    def duplicates(self):
+        """
+        Отпечатки SQL, выполненные за запрос больше одного раза.
+
+        Разбор SQL дорогой, поэтому отпечатки считаются по требованию
+        и один раз.
+        """
+        if self._duplicates is None:
+            counts = Counter(fingerprint(sql) for sql, _ in self.queries)
+            self._duplicates = {
+                sql: count for sql, count in counts.items() if count > 1
+            }
+        return self._duplicates
+
+
+class ViewStats:
+    """
+    Накопленная статистика запросов одного представления.
+
+    Повторы собираются только с запросов сверх бюджета.
+    """
+
+    def __init__(self):
+        self.requests = 0
+        self.queries = 0
+        self.max_queries = 0
+        self.duration = 0.0
+        self.duplicates = Counter()
+
+    def add(self, recorder, over_budget=False):
+        self.requests += 1
+        self.queries += recorder.count
+        self.max_queries = max(self.max_queries, recorder.count)
+        self.duration += recorder.duration
+        if over_budget:
+            self.duplicates.update(recorder.duplicates())
+
+
+_stats = defaultdict(ViewStats)
+_lock = threading.Lock()
+
+
+def over_budget(view_name, recorder):
+    budget = settings.QUERY_BUDGETS.get(view_name)
+    return budget is not None and recorder.count > budget
+
+
+def record(view_name, recorder):
+    over = over_budget(view_name, recorder)
+    with _lock:
+        _stats[view_name].add(recorder, over)
+
+
+def get_stats():
+    """Статистика по именам представлений."""
+    with _lock:
+        return dict(_stats)
+
+
+def reset_stats():
+    with _lock:
+        _stats.clear()
+
+
+def check_budget(view_name, recorder):
+    """Сверяет число запросов с бюджетом из QUERY_BUDGETS."""
+    if not over_budget(view_name, recorder):
+        return
+    budget = settings.QUERY_BUDGETS[view_name]
+    message = (
+        f'{view_name}: {recorder.count} запросов при бюджете {budget}, '
+        f'повторы: {recorder.duplicates()}'
+    )
+    if settings.QUERY_BUDGET_STRICT:
+        raise QueryBudgetExceeded(message)
+    logger.warning(message)
@@ -0,0 +1,34 @@
+"""
+Общее для хранилищ в файлах SQLite: core.cache и core.kvstore.
+"""
+import os
+import threading
+
+# Ограничение SQLite на число параметров в одном запросе.
+CHUNK_SIZE = 500
+
+
+def chunked(items):
+    """Части items по CHUNK_SIZE для запросов с WHERE key IN (...)."""
+    for start in range(0, len(items), CHUNK_SIZE):
+        yield items[start:start + CHUNK_SIZE]
+
+
+class LocalConnection:
+    """
+    Соединение SQLite текущего потока и процесса.
+
+    connect открывает новое соединение. После fork (пул миниатюр,
+    воркеры сервера) соединение родителя использовать нельзя, поэтому
+    процесс-потомок открывает свое.
+    """
+
+    def __init__(self, connect):
+        self.connect = connect
+        self._local = threading.local()
+
+    def get(self):
+        local = self._local
+        if getattr(local, 'pid', None) != os.getpid():
+            local.connection, local.pid = self.connect(), os.getpid()
+        return local.connection
@@ -0,0 +1,163 @@
+"""
+Файловое хранилище с дедупликацией по содержимому.
+
+Каждый загруженный файл хешируется (SHA-256) прямо при записи и
+хранится один раз под именем из хеша: blobs/ab/cd/<хеш>.<расширение>.
+Одинаковые мемы в постах и повторно загруженные аватары занимают место
+на диске один раз. Число ссылок на файл лежит в core.models.Blob:
+save() прибавляет ссылку, delete() убирает, файл удаляется вместе с
+последней ссылкой.
+
+Файлы со старыми именами (без записи Blob) удаляются как обычно.
+Перенести их в хранилище по хешу можно командой dedupe_media.
+"""
+import hashlib
+import os
+import shutil
+import uuid
+
+from django.core.files.move import file_move_safe
+from django.core.files.storage import FileSystemStorage
+from django.db import transaction
+from django.db.models import F
+
+from .models import Blob
+
+# Папка файлов по хешу в MEDIA_ROOT.
+BLOBS_DIR = 'blobs'
+
+
+def blob_name(digest, extension):
+    return f'{BLOBS_DIR}/{digest[:2]}/{digest[2:4]}/{digest}{extension}'
+
+
+def is_blob(name):
+    return name.startswith(BLOBS_DIR + '/')
+
+
+def release(storage, name):
+    """Убирает ссылку на файл после коммита текущей транзакции."""
+    if name:
+        transaction.on_commit(lambda: storage.delete(name))
+
+
+def release_replaced(instance, fields):
+    """
+    Убирает ссылки на файлы, которые сохранение instance заменит.
+
+    Вызывается до сохранения: старые имена берутся из базы и
+    сравниваются с текущими значениями полей fields.
+    """
+    if instance.pk is None:
+        return
+    model = type(instance)
+    old = model.objects.filter(pk=instance.pk).values(*fields).first()
+    if old is None:
+        return
+    for field in fields:
+        file = getattr(instance, field)
+        if old[field] and old[field] != file.name:
+            release(file.storage, old[field])
+
+
+class DedupStorage(FileSystemStorage):
+    def get_available_name(self, name, max_length=None):
+        # Итоговое имя зависит только от содержимого, его выбирает _save.
+        return name
+
+    def _write_temp(self, content):
+        """Копирует content во временный файл рядом с файлами по хешу."""
+        directory = self.path(os.path.join(BLOBS_DIR, 'tmp'))
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, uuid.uuid4().hex)
+        digest = hashlib.sha256()
+        with open(os.open(path, self.OS_OPEN_FLAGS, 0o666), 'wb') as file:
+            for chunk in content.chunks():
+                digest.update(chunk)
+                file.write(chunk)
+        return digest.hexdigest(), path
+
+    def _hash(self, content):
+        digest = hashlib.sha256()
+        for chunk in content.chunks():
+            digest.update(chunk)
+        return digest.hexdigest()
+
+    def _save(self, name, content):
+        extension = os.path.splitext(name)[1].lower()
+        if hasattr(content, 'temporary_file_path'):
+            # Большая загрузка уже лежит на диске: хватит хеша и переноса.
+            digest, source = self._hash(content), None
+        else:
+            digest, source = self._write_temp(content)
+        name = blob_name(digest, extension)
+        try:
+            with transaction.atomic():
+                created = Blob.objects.select_for_update().get_or_create(
+                    name=name, defaults={'size': content.size}
+                )[1]
+                if not created:
+                    Blob.objects.filter(pk=name).update(refs=F('refs') + 1)
+                path = self.path(name)
+                if created or not os.path.exists(path):
+                    os.makedirs(os.path.dirname(path), exist_ok=True)
+                    file_move_safe(
+                        source or content.temporary_file_path(), path,
+                        allow_overwrite=True,
+                    )
+                    if self.file_permissions_mode is not None:
+                        os.chmod(path, self.file_permissions_mode)
+        finally:
+            if source is not None and os.path.exists(source):
+                os.remove(source)
+        return name
+
+    def delete(self, name):
+        assert name, 'The name argument is not allowed to be empty.'
+        with transaction.atomic():
+            blob = Blob.objects.select_for_update().filter(pk=name).first()
+            if blob is None:
+                super().delete(name)
+            elif blob.refs > 1:
+                Blob.objects.filter(pk=name).update(refs=F('refs') - 1)
+            else:
+                blob.delete()
+                super().delete(name)
+
+    def adopt(self, name, refs):
+        """
+        Переносит файл со старым именем в хранилище по хешу.
+
+        Добавляет refs ссылок и возвращает новое имя. Старый файл
+        удаляется только после коммита, чтобы при откате транзакции
+        старые имена в базе не остались без файлов.
+        """
+        with self.open(name) as file:
+            digest = self._hash(file)
+        new_name = blob_name(digest, os.path.splitext(name)[1].lower())
+        with transaction.atomic():
+            created = Blob.objects.select_for_update().get_or_create(
+                name=new_name,
+                defaults={'size': self.size(name), 'refs': refs},
+            )[1]
+            if not created:
+                Blob.objects.filter(pk=new_name).update(
+                    refs=F('refs') + refs
+                )
+            path = self.path(new_name)
+            if not os.path.exists(path):
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                try:
+                    os.link(self.path(name), path)
+                except OSError:
+                    shutil.copyfile(self.path(name), path)
+            transaction.on_commit(
+                lambda: super(DedupStorage, self).delete(name)
+            )
+        return new_name
+
+    def refs(self, name):
+        """Число ссылок на файл, 0 - файла нет в хранилище по хешу."""
+        return Blob.objects.filter(pk=name).values_list(
+            'refs', flat=True
+        ).first() or 0
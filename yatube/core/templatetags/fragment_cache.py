@@ -0,0 +1,61 @@
+"""
+Тег {% cache %} с тем же синтаксисом, что у Django, но через get_or_set.
+
+С core.tiered_cache.TieredCache фрагмент после истечения пересчитывает
+только один запрос, остальные отдают старую версию. С другими кешами
+тег работает как обычный {% cache %}.
+"""
+from django import template
+from django.core.cache import InvalidCacheBackendError, caches
+from django.core.cache.utils import make_template_fragment_key
+from django.templatetags.cache import CacheNode, do_cache
+
+register = template.Library()
+
+
+class SingleFlightCacheNode(CacheNode):
+    def get_cache(self, context):
+        if self.cache_name:
+            name = self.cache_name.resolve(context)
+            try:
+                return caches[name]
+            except InvalidCacheBackendError:
+                raise template.TemplateSyntaxError(
+                    f'Invalid cache name specified for cache tag: {name!r}'
+                )
+        try:
+            return caches['template_fragments']
+        except InvalidCacheBackendError:
+            return caches['default']
+
+    def render(self, context):
+        try:
+            expire_time = self.expire_time_var.resolve(context)
+        except template.VariableDoesNotExist:
+            raise template.TemplateSyntaxError(
+                '"cache" tag got an unknown variable: '
+                f'{self.expire_time_var.var!r}'
+            )
+        if expire_time is not None:
+            try:
+                expire_time = int(expire_time)
+            except (ValueError, TypeError):
+                raise template.TemplateSyntaxError(
+                    '"cache" tag got a non-integer timeout value: '
+                    f'{expire_time!r}'
+                )
+        vary_on = [var.resolve(context) for var in self.vary_on]
+        return self.get_cache(context).get_or_set(
+            make_template_fragment_key(self.fragment_name, vary_on),
+            lambda: self.nodelist.render(context),
+            expire_time,
+        )
+
+
+@register.tag('cache')
+def do_single_flight_cache(parser, token):
+    node = do_cache(parser, token)
+    return SingleFlightCacheNode(
+        node.nodelist, node.expire_time_var, node.fragment_name,
+        node.vary_on, node.cache_name,
+    )
@@ -0,0 +1,27 @@
+import copy
+
+from django.conf import settings
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+
+class InMemoryRunner(DiscoverRunner):
+    """
+    Запуск тестов без файлов SQLite рядом с кодом.
+
+    Общий кеш и хранилище метаданных миниатюр на время тестов
+    переезжают в память.
+    """
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        caches = copy.deepcopy(settings.CACHES)
+        caches['shared']['LOCATION'] = ':memory:'
+        self.in_memory = override_settings(
+            CACHES=caches, THUMBNAIL_KVSTORE_PATH=':memory:'
+        )
+        self.in_memory.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self.in_memory.disable()
+        super().teardown_test_environment(**kwargs)
@@ -1,7 +1,503 @@
-from django.test import TestCase
+import multiprocessing
+import os
+import shutil
+import tempfile
+import threading
+import time
+from io import BytesIO, StringIO
+from itertools import count
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import (SimpleUploadedFile,
+                                            TemporaryUploadedFile)
+from django.core.cache import caches
+from django.core.management import call_command
+from django.db import connection
+from django.template import Context, Template
+from django.test import SimpleTestCase, TestCase, override_settings
+from PIL import Image
+from sorl.thumbnail.kvstores.base import add_prefix
+
+from core import queries
+from core.cache import SQLiteCache
+from core.kvstore import KVStore
+from core.tiered_cache import Envelope
+from core.storage import DedupStorage, is_blob
+from posts.models import Post
+from posts.signals import AVATAR_FIELDS
+
+User = get_user_model()
 
 
 class ViewTestClass(TestCase):
     def test_error_page(self):
         response = self.client.get('/nonexist-page/')
         response = response
+
+
+class QueryRecorderTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(
+            email='author@yatube.ru', username='Author', password='pass'
+        )
+        for i in range(3):
+            Post.objects.create(author=cls.user, text=f'Пост {i}')
+
+    def test_fingerprint_ignores_literals(self):
+        """Отпечаток SQL не зависит от значений параметров."""
+        self.assertEqual(
+            queries.fingerprint('SELECT 1 FROM t WHERE id IN (%s, %s)'),
+            queries.fingerprint('SELECT 2 FROM t WHERE id IN (%s)'),
+        )
+
+    def test_recorder_counts_duplicates(self):
+        """Повторяющиеся запросы попадают в duplicates."""
+        recorder = queries.QueryRecorder()
+        with connection.execute_wrapper(recorder):
+            for post in Post.objects.all():
+                post.author
+        self.assertEqual(recorder.count, 4)
+        self.assertEqual(list(recorder.duplicates().values()), [3])
+
+    def test_lazy_load_in_template_loop(self):
+        """Ленивая загрузка связанного поля в цикле шаблона падает."""
+        template = Template(
+            '{% for post in posts %}{{ post.author.username }}{% endfor %}'
+        )
+        recorder = queries.QueryRecorder(strict_lazy=True)
+        with connection.execute_wrapper(recorder):
+            template.render(Context({
+                'posts': Post.objects.select_related('author')
+            }))
+            with self.assertRaises(queries.LazyLoadError):
+                template.render(Context({'posts': Post.objects.all()}))
+
+
+class KVStoreTests(SimpleTestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'kvstore.sqlite3')
+        self.store = KVStore(path=self.path, size=2)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def test_hits_and_misses(self):
+        """Повторное чтение идет из LRU, а не из SQLite."""
+        self.assertIsNone(self.store._get_raw('a'))
+        self.store._set_raw('a', '1')
+        self.assertEqual(self.store._get_raw('a'), '1')
+        stats = self.store.stats()
+        self.assertEqual((stats['hits'], stats['misses']), (1, 1))
+
+    def test_shared_between_processes(self):
+        """Запись одного процесса видна другому через файл SQLite."""
+        self.store._set_raw('a', '1')
+        other = KVStore(path=self.path, size=2)
+        self.assertEqual(other._get_raw('a'), '1')
+        self.assertEqual(other._get_raw('a'), '1')
+        self.assertEqual(other.stats()['disk_hits'], 1)
+        self.assertEqual(other.stats()['hits'], 1)
+
+    def test_new_connection_after_fork(self):
+        """Процесс пула не пишет через соединение родителя."""
+        self.store._set_raw('a', '1')
+        context = multiprocessing.get_context('fork')
+        fresh = context.Value('b', 0)
+        process = context.Process(
+            target=write_after_fork,
+            args=(self.store, self.store.connection, fresh),
+        )
+        process.start()
+        process.join()
+        self.assertEqual(process.exitcode, 0)
+        self.assertTrue(fresh.value)
+        self.assertEqual(self.store._get_raw('b'), '2')
+
+    def test_lru_eviction(self):
+        for key in 'abc':
+            self.store._set_raw(key, key)
+        self.assertEqual(list(self.store._lru), ['b', 'c'])
+        self.assertEqual(self.store._get_raw('a'), 'a')
+        self.assertEqual(self.store.stats()['disk_hits'], 1)
+
+    def test_delete_and_find_keys(self):
+        self.store._set_raw('x||image||1', '1')
+        self.store._set_raw('x||image||2', '2')
+        self.store._set_raw('x||thumbnails||1', '[]')
+        self.assertEqual(
+            sorted(self.store._find_keys_raw('x||image||')),
+            ['x||image||1', 'x||image||2']
+        )
+        self.store._delete_raw('x||image||1')
+        self.assertIsNone(self.store._get_raw('x||image||1'))
+
+    def test_prefetch(self):
+        """Предзагрузка кладет найденные записи в LRU за один запрос."""
+        class Image:
+            def __init__(self, key):
+                self.key = key
+
+        writer = KVStore(path=self.path, size=10)
+        for key in ('1', '2'):
+            writer._set_raw(add_prefix(key), key)
+        reader = KVStore(path=self.path, size=10)
+        reader.prefetch([Image('1'), Image('2'), Image('3')])
+        self.assertEqual(len(reader._lru), 2)
+        reader._get_raw(add_prefix('1'))
+        self.assertEqual(reader.stats()['hits'], 1)
+
+
+def write_after_fork(store, parent_connection, fresh):
+    fresh.value = store.connection is not parent_connection
+    store._set_raw('b', '2')
+
+
+def increment(path):
+    cache = SQLiteCache(path, {})
+    for _ in range(100):
+        cache.incr('counter')
+
+
+class SQLiteCacheTests(SimpleTestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'cache.sqlite3')
+        self.cache = self.make_cache()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def make_cache(self, **options):
+        return SQLiteCache(self.path, {'OPTIONS': options})
+
+    def test_basic_operations(self):
+        self.cache.set('a', {'x': 1})
+        self.assertEqual(self.cache.get('a'), {'x': 1})
+        self.assertFalse(self.cache.add('a', 2))
+        self.assertTrue(self.cache.add('b', 2))
+        self.assertTrue(self.cache.has_key('b'))
+        self.cache.delete('a')
+        self.assertIsNone(self.cache.get('a'))
+        self.assertEqual(self.cache.get('a', 'нет'), 'нет')
+
+    def test_expired_entry_missing(self):
+        self.cache.set('a', 1, timeout=0)
+        self.assertIsNone(self.cache.get('a'))
+        self.assertTrue(self.cache.add('a', 2))
+        self.assertEqual(self.cache.get('a'), 2)
+
+    def test_shared_between_processes(self):
+        """Запись одного процесса видна другому через файл SQLite."""
+        self.cache.set('a', 'значение')
+        self.assertEqual(self.make_cache().get('a'), 'значение')
+
+    def test_many(self):
+        self.cache.set_many({'a': 1, 'b': [2], 'c': None})
+        self.assertEqual(
+            self.cache.get_many(['a', 'b', 'c', 'd']),
+            {'a': 1, 'b': [2], 'c': None}
+        )
+        self.cache.delete_many(['a', 'b'])
+        self.assertEqual(self.cache.get_many(['a', 'b', 'c']), {'c': None})
+
+    def test_incr_atomic_across_processes(self):
+        self.cache.set('counter', 0)
+        context = multiprocessing.get_context('fork')
+        processes = [
+            context.Process(target=increment, args=(self.path,))
+            for _ in range(4)
+        ]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+        self.assertEqual(self.cache.get('counter'), 400)
+        self.assertEqual(self.cache.incr('counter', 5), 405)
+        with self.assertRaises(ValueError):
+            self.cache.incr('missing')
+
+    def test_lru_eviction_and_stats(self):
+        """Вытесняются давно не читанные записи."""
+        clock = count(1000)
+        cache = self.make_cache(MAX_ENTRIES=4, CULL_FREQUENCY=2)
+        fake_time = mock.Mock(time=lambda: next(clock))
+        with mock.patch('core.cache.time', fake_time):
+            for key in 'abcd':
+                cache.set(key, key)
+            cache.get('a')
+            cache.set('e', 'e')
+        self.assertEqual(
+            cache.get_many('abcde'), {'a': 'a', 'e': 'e'}
+        )
+        stats = cache.stats()
+        self.assertEqual(stats['evictions'], 3)
+        self.assertEqual(stats['entries'], 2)
+        self.assertEqual((stats['hits'], stats['misses']), (3, 3))
+
+
+class TieredCacheTests(SimpleTestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        override = self.settings(CACHES={
+            'default': {
+                'BACKEND': 'core.tiered_cache.TieredCache',
+                'OPTIONS': {'L2': 'shared', 'LOCK_TIMEOUT': 5},
+            },
+            'shared': {
+                'BACKEND': 'core.cache.SQLiteCache',
+                'LOCATION': os.path.join(self.directory, 'cache.sqlite3'),
+            },
+        })
+        override.enable()
+        self.addCleanup(override.disable)
+        self.cache = caches['default']
+        self.l2 = caches['shared']
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def test_reads_from_l1(self):
+        """Повторное чтение не идет в L2, пока не истек L1_TIMEOUT."""
+        self.cache.set('a', 1)
+        self.l2.delete('a')
+        self.assertEqual(self.cache.get('a'), 1)
+        self.cache.l1_timeout = 0
+        self.cache.set('b', 2)
+        self.l2.delete('b')
+        self.assertIsNone(self.cache.get('b'))
+
+    def test_get_or_set_computes_once(self):
+        calls = []
+
+        def compute():
+            calls.append(1)
+            time.sleep(0.2)
+            return 'значение'
+
+        results = []
+        threads = [
+            threading.Thread(
+                target=lambda: results.append(
+                    self.cache.get_or_set('key', compute, 60)
+                )
+            )
+            for _ in range(5)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, ['значение'] * 5)
+
+    def test_stale_value_served_while_locked(self):
+        """Пока другой запрос пересчитывает, отдается старое значение."""
+        self.l2.set('key', Envelope('старое', time.time() - 1, 0.1))
+        self.l2.add('key:lock', 1)
+        value = self.cache.get_or_set('key', lambda: 'новое', 60)
+        self.assertEqual(value, 'старое')
+        self.l2.delete('key:lock')
+        self.cache.clear()
+        self.l2.set('key', Envelope('старое', time.time() - 1, 0.1))
+        self.assertEqual(
+            self.cache.get_or_set('key', lambda: 'новое', 60), 'новое'
+        )
+        self.assertEqual(self.cache.get('key'), 'новое')
+
+    def test_early_refresh_probability(self):
+        now = time.time()
+        self.assertFalse(Envelope(1, now + 60, 0).should_refresh(now, 1))
+        self.assertTrue(Envelope(1, now, 0).should_refresh(now, 1))
+
+    def test_fragment_tag(self):
+        template = Template(
+            '{% load fragment_cache %}'
+            '{% cache 60 fragment %}{{ counter.next }}{% endcache %}'
+        )
+        counter = iter(range(10))
+        context = Context({'counter': {'next': lambda: next(counter)}})
+        self.assertEqual(template.render(context), '0')
+        self.assertEqual(template.render(context), '0')
+
+
+class DedupStorageTests(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.storage = DedupStorage(location=self.directory)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def test_same_content_stored_once(self):
+        """Одинаковые файлы получают одно имя и лежат на диске один раз."""
+        first = self.storage.save('posts/a.gif', ContentFile(b'GIF89a'))
+        second = self.storage.save('users/b.GIF', ContentFile(b'GIF89a'))
+        other = self.storage.save('posts/c.gif', ContentFile(b'GIF87a'))
+        self.assertEqual(first, second)
+        self.assertNotEqual(first, other)
+        self.assertTrue(is_blob(first) and first.endswith('.gif'))
+        self.assertEqual(self.storage.refs(first), 2)
+        self.assertEqual(os.listdir(self.storage.path('blobs/tmp')), [])
+
+    def test_file_deleted_with_last_reference(self):
+        name = self.storage.save('a.gif', ContentFile(b'GIF89a'))
+        self.storage.save('b.gif', ContentFile(b'GIF89a'))
+        self.storage.delete(name)
+        self.assertTrue(self.storage.exists(name))
+        self.storage.delete(name)
+        self.assertFalse(self.storage.exists(name))
+        self.assertEqual(self.storage.refs(name), 0)
+
+    def test_temporary_upload_moved(self):
+        """Большая загрузка из временного файла только переносится."""
+        upload = TemporaryUploadedFile('big.gif', 'image/gif', 6, None)
+        upload.write(b'GIF89a')
+        upload.seek(0)
+        name = self.storage.save('big.gif', upload)
+        with self.storage.open(name) as file:
+            self.assertEqual(file.read(), b'GIF89a')
+        upload.close()
+
+    def test_legacy_file_deleted(self):
+        """Файл со старым именем без записи о ссылках удаляется сразу."""
+        path = self.storage.path('posts/old.gif')
+        os.makedirs(os.path.dirname(path))
+        with open(path, 'wb') as file:
+            file.write(b'GIF89a')
+        self.storage.delete('posts/old.gif')
+        self.assertFalse(os.path.exists(path))
+
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+@override_settings(
+    MEDIA_ROOT=TEMP_MEDIA_ROOT, THUMBNAIL_WORKERS=0, POST_THUMBNAILS=(),
+    THUMBNAIL_KVSTORE_PATH=os.path.join(TEMP_MEDIA_ROOT, 'kvstore.sqlite3'),
+)
+class DedupMediaTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(
+            email='author@yatube.ru', username='Author', password='pass'
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def commit(self):
+        """Выполняет колбэки on_commit, которые TestCase не вызывает."""
+        hooks, connection.run_on_commit = connection.run_on_commit, []
+        for savepoint_ids, hook in hooks:
+            hook()
+
+    def test_deleting_post_releases_image(self):
+        """Картинка удаляется вместе с последним постом, где она есть."""
+        posts = [
+            Post.objects.create(
+                author=self.author, text=f'Пост {i}',
+                image=SimpleUploadedFile('meme.gif', SMALL_GIF, 'image/gif')
+            )
+            for i in range(2)
+        ]
+        name = posts[0].image.name
+        self.assertEqual(posts[1].image.name, name)
+        storage = posts[0].image.storage
+        posts[0].delete()
+        self.commit()
+        self.assertEqual(storage.refs(name), 1)
+        posts[1].delete()
+        self.commit()
+        self.assertFalse(storage.exists(name))
+
+    def test_replacing_image_releases_old_one(self):
+        post = Post.objects.create(
+            author=self.author, text='Пост',
+            image=SimpleUploadedFile('a.gif', SMALL_GIF, 'image/gif')
+        )
+        old = post.image.name
+        buffer = BytesIO()
+        Image.new('RGB', (3, 2), (200, 40, 40)).save(buffer, 'GIF')
+        post.image = SimpleUploadedFile(
+            'b.gif', buffer.getvalue(), 'image/gif'
+        )
+        post.save()
+        self.commit()
+        self.assertFalse(post.image.storage.exists(old))
+
+    def avatar(self):
+        buffer = BytesIO()
+        Image.new('RGB', (64, 48), (200, 40, 40)).save(buffer, 'PNG')
+        return SimpleUploadedFile('avatar.png', buffer.getvalue())
+
+    def avatar_names(self, user):
+        user.refresh_from_db()
+        return [getattr(user, field).name for field in AVATAR_FIELDS]
+
+    def test_same_avatar_reupload_keeps_refs(self):
+        """Повторная загрузка того же аватара не копит ссылки."""
+        user = User.objects.create_user(
+            email='avatar@yatube.ru', username='Avatar', password='pass'
+        )
+        user.avatar = self.avatar()
+        user.save()
+        self.commit()
+        names = self.avatar_names(user)
+        user.avatar = self.avatar()
+        user.save()
+        self.commit()
+        self.assertEqual(self.avatar_names(user), names)
+        storage = user.avatar.storage
+        self.assertEqual([storage.refs(name) for name in names], [1] * 4)
+        call_command('make_avatar_variants', '--all', stdout=StringIO())
+        self.commit()
+        self.assertEqual([storage.refs(name) for name in names], [1] * 4)
+        user.delete()
+        self.commit()
+        for name in names:
+            self.assertFalse(storage.exists(name), name)
+
+    def test_command_moves_legacy_files(self):
+        """Команда переносит старые файлы и объединяет одинаковые."""
+        for name in ('posts/a.gif', 'posts/b.gif'):
+            path = os.path.join(TEMP_MEDIA_ROOT, name)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'wb') as file:
+                file.write(SMALL_GIF)
+        Post.objects.bulk_create([
+            Post(author=self.author, text='Пост 1', image='posts/a.gif'),
+            Post(author=self.author, text='Пост 2', image='posts/b.gif'),
+            Post(author=self.author, text='Пост 3', image='posts/b.gif'),
+        ])
+        out = StringIO()
+        call_command('dedupe_media', stdout=out)
+        self.commit()
+        self.assertIn('Перенесено: 2', out.getvalue())
+        names = set(Post.objects.values_list('image', flat=True))
+        self.assertEqual(len(names), 1)
+        name = names.pop()
+        storage = Post._meta.get_field('image').storage
+        self.assertEqual(storage.refs(name), 3)
+        self.assertFalse(os.path.exists(
+            os.path.join(TEMP_MEDIA_ROOT, 'posts/a.gif')
+        ))
+        with storage.open(name) as file:
+            self.assertEqual(file.read(), SMALL_GIF)
@@ -0,0 +1,270 @@
+"""
+Двухуровневый кеш с защитой от лавины пересчетов.
+
+L1 - небольшой LRU в памяти процесса с коротким временем жизни
+(L1_TIMEOUT), L2 - общий кеш из CACHES (обычно core.cache.SQLiteCache).
+Чтение сначала идет в L1, промах - в L2, найденное кладется в L1.
+Запись и удаление идут в оба уровня. Другие процессы видят изменение
+не позже чем через L1_TIMEOUT.
+
+get_or_set с функцией дополнительно защищает от одновременного
+пересчета (cache stampede):
+- значение хранится в Envelope со сроком свежести и временем расчета,
+  а в L2 живет на STALE_TIMEOUT дольше срока свежести;
+- пересчитывает только тот, кто взял блокировку ключа в L2 (add
+  атомарен во всех процессах), остальные отдают старое значение;
+- незадолго до срока свежести пересчет запускается с вероятностью,
+  растущей к концу срока (XFetch, коэффициент BETA), поэтому свежее
+  значение обычно готово до того, как старое устарело;
+- если значения нет совсем, остальные ждут его до LOCK_TIMEOUT и
+  только потом считают сами.
+
+    CACHES = {
+        'default': {
+            'BACKEND': 'core.tiered_cache.TieredCache',
+            'OPTIONS': {'L2': 'shared', 'L1_TIMEOUT': 2},
+        },
+        'shared': {...},
+    }
+"""
+import math
+import random
+import threading
+import time
+from collections import OrderedDict
+
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+# Как часто ожидающий запрос проверяет, не готово ли значение.
+POLL_INTERVAL = 0.05
+
+_missing = object()
+
+
+class Envelope:
+    """Значение get_or_set: срок свежести и сколько секунд его считали."""
+
+    def __init__(self, value, fresh_until, delta):
+        self.value = value
+        self.fresh_until = fresh_until
+        self.delta = delta
+
+    def should_refresh(self, now, beta):
+        if now >= self.fresh_until:
+            return True
+        # XFetch: чем дольше расчет и ближе срок, тем вероятнее пересчет.
+        return now - self.delta * beta * math.log(
+            1 - random.random()
+        ) >= self.fresh_until
+
+
+def unwrap(value):
+    return value.value if isinstance(value, Envelope) else value
+
+
+class TieredCache(BaseCache):
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self.l2_alias = options.get('L2', 'shared')
+        self.l1_max_entries = options.get('L1_MAX_ENTRIES', 1000)
+        self.l1_timeout = options.get('L1_TIMEOUT', 2)
+        self.stale_timeout = options.get('STALE_TIMEOUT', 60)
+        self.lock_timeout = options.get('LOCK_TIMEOUT', 10)
+        self.beta = options.get('BETA', 1.0)
+        self._l1 = OrderedDict()
+        self._lock = threading.Lock()
+        self.l1_hits = 0
+        self.stale_hits = 0
+        self.recomputes = 0
+
+    @property
+    def l2(self):
+        return caches[self.l2_alias]
+
+    def _l1_key(self, key, version):
+        return self.l2.make_key(key, version=version)
+
+    def _l1_get(self, key):
+        with self._lock:
+            item = self._l1.get(key)
+            if item is None:
+                return _missing
+            expires, value = item
+            if expires <= time.monotonic():
+                del self._l1[key]
+                return _missing
+            self._l1.move_to_end(key)
+            self.l1_hits += 1
+            return value
+
+    def _l1_set(self, key, value):
+        with self._lock:
+            self._l1[key] = (time.monotonic() + self.l1_timeout, value)
+            self._l1.move_to_end(key)
+            while len(self._l1) > self.l1_max_entries:
+                self._l1.popitem(last=False)
+
+    def _l1_delete(self, key):
+        with self._lock:
+            self._l1.pop(key, None)
+
+    def _get_raw(self, key, version):
+        l1_key = self._l1_key(key, version)
+        value = self._l1_get(l1_key)
+        if value is _missing:
+            value = self.l2.get(key, _missing, version=version)
+            if value is not _missing:
+                self._l1_set(l1_key, value)
+        return value
+
+    def _set_raw(self, key, value, timeout, version):
+        self.l2.set(key, value, timeout, version=version)
+        self._l1_set(self._l1_key(key, version), value)
+
+    def get(self, key, default=None, version=None):
+        value = self._get_raw(key, version)
+        return default if value is _missing else unwrap(value)
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self._set_raw(key, value, timeout, version)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        added = self.l2.add(key, value, timeout, version=version)
+        if added:
+            self._l1_set(self._l1_key(key, version), value)
+        else:
+            self._l1_delete(self._l1_key(key, version))
+        return added
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        return self.l2.touch(key, timeout, version=version)
+
+    def delete(self, key, version=None):
+        self.l2.delete(key, version=version)
+        self._l1_delete(self._l1_key(key, version))
+
+    def get_many(self, keys, version=None):
+        found, rest = {}, []
+        for key in keys:
+            value = self._l1_get(self._l1_key(key, version))
+            if value is _missing:
+                rest.append(key)
+            else:
+                found[key] = value
+        if rest:
+            fetched = self.l2.get_many(rest, version=version)
+            for key, value in fetched.items():
+                self._l1_set(self._l1_key(key, version), value)
+            found.update(fetched)
+        return {key: unwrap(value) for key, value in found.items()}
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        failed = self.l2.set_many(data, timeout, version=version)
+        for key, value in data.items():
+            if key not in failed:
+                self._l1_set(self._l1_key(key, version), value)
+        return failed
+
+    def delete_many(self, keys, version=None):
+        self.l2.delete_many(keys, version=version)
+        for key in keys:
+            self._l1_delete(self._l1_key(key, version))
+
+    def has_key(self, key, version=None):
+        return self._get_raw(key, version) is not _missing
+
+    def incr(self, key, delta=1, version=None):
+        value = self.l2.incr(key, delta, version=version)
+        self._l1_set(self._l1_key(key, version), value)
+        return value
+
+    def clear(self):
+        self.l2.clear()
+        with self._lock:
+            self._l1.clear()
+
+    def get_or_set(self, key, default, timeout=DEFAULT_TIMEOUT, version=None):
+        """
+        Значение key или результат default(), посчитанный один раз.
+
+        Пока один запрос пересчитывает устаревшее значение, остальные
+        получают старое.
+        """
+        if not callable(default):
+            return super().get_or_set(key, default, timeout, version)
+        envelope = self._get_raw(key, version)
+        if envelope is not _missing and not isinstance(envelope, Envelope):
+            return envelope
+        if envelope is not _missing:
+            if not envelope.should_refresh(time.time(), self.beta):
+                return envelope.value
+            if not self._acquire(key, version):
+                self.stale_hits += 1
+                return envelope.value
+        elif self._acquire(key, version):
+            # Другой запрос мог успеть посчитать и снять блокировку.
+            envelope = self.l2.get(key, _missing, version=version)
+            if envelope is not _missing:
+                self._release(key, version)
+                return unwrap(envelope)
+        else:
+            envelope = self._wait(key, version)
+            if envelope is not _missing:
+                return unwrap(envelope)
+            return self._recompute(key, default, timeout, version)
+        try:
+            return self._recompute(key, default, timeout, version)
+        finally:
+            self._release(key, version)
+
+    def _lock_key(self, key):
+        return f'{key}:lock'
+
+    def _acquire(self, key, version):
+        return self.l2.add(
+            self._lock_key(key), 1, self.lock_timeout, version=version
+        )
+
+    def _release(self, key, version):
+        self.l2.delete(self._lock_key(key), version=version)
+
+    def _wait(self, key, version):
+        """Ждет значение, которое считает другой запрос."""
+        deadline = time.monotonic() + self.lock_timeout
+        while time.monotonic() < deadline:
+            time.sleep(POLL_INTERVAL)
+            value = self.l2.get(key, _missing, version=version)
+            if value is not _missing:
+                return value
+            if not self.l2.has_key(self._lock_key(key), version=version):
+                break
+        return _missing
+
+    def _recompute(self, key, default, timeout, version):
+        start = time.time()
+        value = default()
+        now = time.time()
+        self.recomputes += 1
+        if timeout is DEFAULT_TIMEOUT:
+            timeout = self.default_timeout
+        if timeout is None:
+            self._set_raw(key, Envelope(value, math.inf, 0), None, version)
+        elif timeout > 0:
+            self._set_raw(
+                key, Envelope(value, now + timeout, now - start),
+                timeout + self.stale_timeout, version,
+            )
+        return value
+
+    def stats(self):
+        """Счетчики L1 и пересчетов процесса и статистика L2."""
+        l2_stats = getattr(self.l2, 'stats', None)
+        return {
+            'l1_hits': self.l1_hits,
+            'l1_entries': len(self._l1),
+            'stale_hits': self.stale_hits,
+            'recomputes': self.recomputes,
+            'l2': l2_stats() if l2_stats else None,
+        }
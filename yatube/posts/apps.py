@@ -1,5 +1,16 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
+
+
+def install_search(sender, **kwargs):
+    from . import search
+    search.install()
 
 
 class PostsConfig(AppConfig):
     name = 'posts'
+
+    def ready(self):
+        from . import signals  # noqa: F401
+        # Пересборка posts_post в миграциях удаляет триггеры поиска.
+        post_migrate.connect(install_search, sender=self)
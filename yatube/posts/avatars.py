@@ -0,0 +1,85 @@
+"""
+Уменьшенные копии аватаров.
+
+Шаблоны показывают аватар в кружке 30 px, в шапке профиля - 300 px,
+поэтому при загрузке аватара сразу готовятся квадратные копии SIZES
+(avatar_30, avatar_60, avatar_300). Страница ленты больше не тянет
+оригиналы по несколько мегабайт ради картинки 30 на 30.
+"""
+import logging
+import os
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+# Размеры копий, для каждого у CustomUser есть поле avatar_<size>.
+SIZES = (30, 60, 300)
+
+QUALITY = 85
+
+
+def render(file, size):
+    """Квадратная копия картинки size на size в JPEG."""
+    file.seek(0)
+    with Image.open(file) as image:
+        image = ImageOps.exif_transpose(image).convert('RGB')
+        image = ImageOps.fit(image, (size, size), Image.LANCZOS)
+    buffer = BytesIO()
+    image.save(buffer, 'JPEG', quality=QUALITY, optimize=True)
+    return ContentFile(buffer.getvalue())
+
+
+def make_variants(user, force=False):
+    """
+    Готовит копии аватара пользователя перед сохранением.
+
+    Копии пересоздаются только для нового файла аватара (еще не
+    сохраненного в хранилище) или при force. Без аватара поля копий
+    очищаются.
+
+    Новая копия сразу добавляет ссылку в хранилище, даже если по
+    содержимому совпала с прежней, поэтому прежние имена копий
+    запоминаются в user._replaced_variants: их ссылки отпустит
+    сигнал release_replaced_avatars.
+    """
+    avatar = user.avatar
+    if not avatar:
+        for size in SIZES:
+            setattr(user, f'avatar_{size}', None)
+        return
+    if avatar._committed and not force:
+        return
+    stem = os.path.splitext(os.path.basename(avatar.name))[0]
+    replaced = user._replaced_variants = getattr(
+        user, '_replaced_variants', []
+    )
+    try:
+        for size in SIZES:
+            variant = getattr(user, f'avatar_{size}')
+            previous = variant.name
+            variant.save(
+                f'{stem}_{size}.jpg', render(avatar, size), save=False
+            )
+            if previous:
+                replaced.append((variant.storage, previous))
+    except OSError:
+        logger.exception('Не удалось уменьшить аватар %s', avatar.name)
+
+
+def url_for(user, size):
+    """
+    Адрес наименьшей копии аватара не меньше size.
+
+    Если копий еще нет, отдается оригинал.
+    """
+    if not user.avatar:
+        return ''
+    for variant in SIZES:
+        if variant >= size:
+            field = getattr(user, f'avatar_{variant}')
+            if field:
+                return field.url
+    return user.avatar.url
@@ -0,0 +1,146 @@
+"""
+Создание постов, комментариев и подписок пачкой.
+
+bulk_create не отправляет сигналы, поэтому здесь делается то же, что
+сигналы posts.signals делают для одной записи, но по разу на пачку:
+счетчики сдвигаются одним UPDATE на автора или пост, поколения лент
+увеличиваются по одному разу, картинки уходят в обработку.
+Все - в одной транзакции.
+"""
+from collections import Counter, defaultdict
+
+from django.db import NotSupportedError, connection, transaction
+from django.db.models import F
+
+from . import counters, feed_cache, images, timeline
+from .models import Comment, CustomUser, Follow, Post
+
+BATCH_SIZE = 500
+
+
+def _insert(model, objects):
+    model.objects.bulk_create(objects, batch_size=BATCH_SIZE)
+    if not objects or connection.features.can_return_ids_from_bulk_insert:
+        return
+    if connection.vendor != 'sqlite':
+        raise NotSupportedError(
+            f'{connection.vendor} не возвращает id из bulk_create.'
+        )
+    # SQLite не возвращает id из bulk_create. Но вставка держит
+    # блокировку записи всей базы до коммита, поэтому последние строки
+    # таблицы - наши и идут в порядке вставки. На других базах
+    # параллельные транзакции могут вставлять строки вперемешку.
+    ids = model.objects.order_by('-pk').values_list(
+        'pk', flat=True
+    )[:len(objects)]
+    for obj, pk in zip(objects, reversed(list(ids))):
+        obj.pk = pk
+
+
+def create_posts(posts):
+    """Сохраняет несохраненные посты posts, возвращает их же с id."""
+    with transaction.atomic():
+        _insert(Post, posts)
+        authors = Counter(post.author_id for post in posts)
+        for author_id, count in authors.items():
+            counters.shift(CustomUser, author_id, 'post_count', count)
+        if timeline.is_enabled():
+            for post in posts:
+                timeline.push_post(post)
+        feeds = set()
+        for post in posts:
+            feeds.update(feed_cache.post_feeds(post))
+            # Страницу нового поста еще никто не видел.
+            feeds.discard(f'post:{post.pk}')
+        feed_cache.bump(*sorted(feeds))
+        for post in posts:
+            if post.image:
+                images.schedule(post)
+    return posts
+
+
+def create_comments(comments):
+    """Сохраняет несохраненные комментарии, возвращает их же с id."""
+    with transaction.atomic():
+        _insert(Comment, comments)
+        posts = {comment.post_id: comment.post for comment in comments}
+        totals = Counter(comment.post_id for comment in comments)
+        for post_id, count in totals.items():
+            counters.shift(Post, post_id, 'comment_count', count)
+        feeds = set()
+        for post in posts.values():
+            feeds.update(feed_cache.post_feeds(post))
+        feed_cache.bump(*sorted(feeds))
+    return comments
+
+
+def shift_many(field, deltas):
+    """Сдвигает счетчик field пользователей: {id: delta}."""
+    by_delta = defaultdict(list)
+    for pk, delta in deltas.items():
+        by_delta[delta].append(pk)
+    for delta, ids in by_delta.items():
+        for start in range(0, len(ids), BATCH_SIZE):
+            CustomUser.objects.filter(
+                pk__in=ids[start:start + BATCH_SIZE]
+            ).update(**{field: F(field) + delta})
+
+
+def existing_follows(pairs):
+    """Какие из пар (user_id, author_id) уже есть в Follow."""
+    users = sorted({user for user, _ in pairs})
+    authors = sorted({author for _, author in pairs})
+    found = set()
+    # Выборка по произведению чанков шире нужной, лишнее отсекает &.
+    for user_start in range(0, len(users), BATCH_SIZE):
+        for author_start in range(0, len(authors), BATCH_SIZE):
+            found.update(Follow.objects.filter(
+                user_id__in=users[user_start:user_start + BATCH_SIZE],
+                author_id__in=authors[author_start:author_start + BATCH_SIZE],
+            ).values_list('user_id', 'author_id'))
+    return found & set(pairs)
+
+
+def create_follows(pairs):
+    """
+    Создает подписки по парам (user_id, author_id), возвращает новые.
+
+    Подписки на себя пропускаются, уже существующие - тоже.
+    ignore_conflicts страхует от подписки, созданной параллельно между
+    проверкой и вставкой; счетчики тогда поправит reconcile_counters.
+    """
+    pairs = {(user, author) for user, author in pairs if user != author}
+    with transaction.atomic():
+        new = sorted(pairs - existing_follows(pairs))
+        Follow.objects.bulk_create(
+            (Follow(user_id=user, author_id=author) for user, author in new),
+            batch_size=BATCH_SIZE, ignore_conflicts=True,
+        )
+        followers = Counter(author for _, author in new)
+        shift_many('follower_count', followers)
+        shift_many('following_count', Counter(user for user, _ in new))
+        if timeline.is_enabled():
+            timeline.sync_authors(followers)
+            for user, author in new:
+                timeline.backfill(user, author)
+        feed_cache.bump(
+            *sorted({f'follow:{user}' for user, _ in new}),
+            *sorted({f'profile:{author}' for _, author in new}),
+        )
+    return new
+
+
+def delete_follows(user_id, author_ids):
+    """
+    Удаляет подписки user_id на author_ids, возвращает id отписанных.
+
+    Удаление идет через QuerySet.delete() с сигналами: счетчики и ленты
+    правятся так же, как при отписке по одному.
+    """
+    with transaction.atomic():
+        follows = Follow.objects.filter(
+            user_id=user_id, author_id__in=author_ids
+        )
+        deleted = sorted(follows.values_list('author_id', flat=True))
+        follows.delete()
+    return deleted
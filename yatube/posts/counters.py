@@ -0,0 +1,71 @@
+"""
+Денормализованные счетчики постов, комментариев и подписок.
+
+Счетчики меняются атомарно выражениями F() при создании и удалении
+записей, а reconcile() чинит расхождения, набежавшие мимо сигналов
+(bulk_create, правки в базе руками).
+"""
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from .models import Comment, CustomUser, Follow, Post
+
+# Модель со счетчиком, поле счетчика, считаемая модель и ее внешний ключ.
+COUNTERS = (
+    (Post, 'comment_count', Comment, 'post'),
+    (CustomUser, 'post_count', Post, 'author'),
+    (CustomUser, 'follower_count', Follow, 'author'),
+    (CustomUser, 'following_count', Follow, 'user'),
+)
+
+
+def shift(model, pk, field, delta):
+    """Сдвигает счетчик field у записи pk на delta одним UPDATE."""
+    rows = model.objects.filter(pk=pk)
+    if delta < 0:
+        # Разошедшийся счетчик не должен уходить ниже нуля.
+        rows = rows.filter(**{f'{field}__gte': -delta})
+    rows.update(**{field: F(field) + delta})
+
+
+def count_of(model, field):
+    """Подзапрос с числом записей model, ссылающихся на внешнюю строку."""
+    return Coalesce(Subquery(
+        model.objects.filter(**{field: OuterRef('pk')}).order_by()
+        .values(field).annotate(total=Count('pk')).values('total')
+    ), 0)
+
+
+def reconcile(chunk_size=1000):
+    """
+    Пересчитывает счетчики по диапазонам pk размером chunk_size.
+
+    Каждый диапазон обрабатывается в своей транзакции, поэтому таблица
+    не блокируется целиком. Возвращает словарь {поле: исправлено строк}.
+    """
+    fixed = {}
+    for model, field, related, fk in COUNTERS:
+        actual = count_of(related, fk)
+        fixed[field] = 0
+        last_pk = 0
+        while True:
+            pks = list(
+                model.objects.filter(pk__gt=last_pk).order_by('pk')
+                .values_list('pk', flat=True)[:chunk_size]
+            )
+            if not pks:
+                break
+            last_pk = pks[-1]
+            with transaction.atomic():
+                drifted = list(
+                    model.objects.filter(pk__in=pks)
+                    .annotate(actual=actual)
+                    .exclude(**{field: F('actual')})
+                    .values_list('pk', flat=True)
+                )
+                if drifted:
+                    fixed[field] += model.objects.filter(
+                        pk__in=drifted
+                    ).update(**{field: actual})
+    return fixed
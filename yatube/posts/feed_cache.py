@@ -0,0 +1,167 @@
+"""
+Версии кешированных фрагментов лент.
+
+Фрагменты {% cache %} лент живут FEED_CACHE_TIMEOUT, а в ключ
+фрагмента входят поколения ленты и страница. Сигналы Post, Comment и
+Follow увеличивают поколения затронутых лент, следующий запрос
+собирает фрагмент заново, поэтому новый пост виден сразу.
+
+Ленты:
+- index - главная, меняется с любым постом и комментарием;
+- group:<id> - посты группы;
+- follow:<id> - подписки пользователя. Фрагмент ленты подписок зависит
+  еще и от index: в него может попасть пост любого автора;
+- profile:<id> - посты автора, их комментарии и подписчики;
+- post:<id> - страница поста;
+- site - имена и аватары пользователей, названия и ссылки групп,
+  входит в каждую версию.
+
+Те же поколения служат валидаторами условного GET (etag): страница
+не менялась, пока не менялись ее ленты, и ответ 304 отдается без
+запросов к базе и рендера шаблона. Для вошедшего пользователя в
+валидатор входит еще cookie CSRF: токен из нее есть в формах страниц.
+
+Поколения и запомненные lookup id читаются из общего кеша
+FEED_GENERATION_CACHE напрямую, мимо L1 процесса (core.tiered_cache):
+иначе другой воркер до L1_TIMEOUT видел бы старое поколение и отдавал
+304 на измененную страницу. Пропавший счетчик начинается с текущего
+времени в миллисекундах, а не с нуля, чтобы не подхватить фрагменты,
+собранные до его вытеснения.
+"""
+import hashlib
+import time
+
+from django.conf import settings
+from django.contrib.auth import SESSION_KEY
+from django.core.cache import caches
+from django.middleware.csrf import get_token
+
+from core.paginator import CURSOR_AFTER, CURSOR_BEFORE
+
+KEY_PREFIX = 'feed_generation'
+LOOKUP_PREFIX = 'feed_lookup'
+
+# Поколение, общее для всех страниц.
+SITE = 'site'
+
+
+def shared_cache():
+    return caches[settings.FEED_GENERATION_CACHE]
+
+
+def generation_key(feed):
+    return f'{KEY_PREFIX}:{feed}'
+
+
+def initial_generation():
+    return time.time_ns() // 1000000
+
+
+def post_feeds(post):
+    """Ленты, в которых показан пост."""
+    feeds = ['index', f'profile:{post.author_id}', f'post:{post.pk}']
+    if post.group_id is not None:
+        feeds.append(f'group:{post.group_id}')
+    return feeds
+
+
+def bump(*feeds):
+    """Начинает новое поколение лент feeds."""
+    cache = shared_cache()
+    for feed in feeds:
+        key = generation_key(feed)
+        cache.add(key, initial_generation(), None)
+        try:
+            cache.incr(key)
+        except ValueError:
+            # Счетчик вытеснен сразу после add, новый начнется со времени.
+            pass
+
+
+def generations(*feeds):
+    """Текущие поколения лент feeds одним обращением к кешу."""
+    cache = shared_cache()
+    keys = [generation_key(feed) for feed in feeds]
+    found = cache.get_many(keys)
+    for key in keys:
+        if key not in found:
+            cache.add(key, initial_generation(), None)
+            found[key] = cache.get(key)
+    return [found[key] for key in keys]
+
+
+def version(*feeds, page=None):
+    """Строка для vary_on тега {% cache %}: поколения лент и страница."""
+    value = '.'.join(
+        str(generation) for generation in generations(SITE, *feeds)
+    )
+    if page is not None:
+        value = f'{value}:{page}'
+    return value
+
+
+def page_key(request, page_obj):
+    """Номер страницы или курсоры, по которым она выбрана."""
+    if getattr(page_obj, 'is_keyset', False):
+        return '{}|{}'.format(
+            request.GET.get(CURSOR_AFTER, ''),
+            request.GET.get(CURSOR_BEFORE, ''),
+        )
+    return page_obj.number
+
+
+def context(request, page_obj, *feeds):
+    """Переменные шаблона для кеширования страницы ленты."""
+    return {
+        'feed_timeout': settings.FEED_CACHE_TIMEOUT,
+        'feed_version': version(*feeds, page=page_key(request, page_obj)),
+    }
+
+
+def lookup_key(model, field, value):
+    return f'{LOOKUP_PREFIX}:{model._meta.label_lower}:{field}:{value}'
+
+
+def lookup(model, field, value, target='pk'):
+    """
+    Поле target объекта model с field=value, запомненное в кеше.
+
+    Отсутствующий объект не запоминается: его могут создать позже.
+    """
+    cache = shared_cache()
+    key = lookup_key(model, field, value)
+    found = cache.get(key)
+    if found is None:
+        found = model.objects.filter(**{field: value}).values_list(
+            target, flat=True
+        ).first()
+        if found is not None:
+            cache.set(key, found, settings.FEED_CACHE_TIMEOUT)
+    return found
+
+
+def forget(model, field, *values):
+    """Забывает запомненные lookup объекты model с field из values."""
+    shared_cache().delete_many(
+        [lookup_key(model, field, value) for value in values]
+    )
+
+
+def viewer(request):
+    """id пользователя из сессии без запроса к таблице пользователей."""
+    session = getattr(request, 'session', None)
+    return session.get(SESSION_KEY, '') if session is not None else ''
+
+
+def etag(request, *feeds):
+    """ETag страницы лент feeds: их поколения, зритель и его токен CSRF."""
+    user_id = viewer(request)
+    if not user_id:
+        return f'{version(*feeds)}:'
+    # В формах страниц пользователя есть токен CSRF: после смены cookie
+    # страница из кеша браузера отправила бы устаревший токен.
+    # get_token ставит cookie уже первому ответу, а в ETag идет хеш,
+    # чтобы не светить сам токен.
+    get_token(request)
+    token = hashlib.md5(request.META['CSRF_COOKIE'].encode()).hexdigest()
+    return f'{version(*feeds)}:{user_id}:{token[:12]}'
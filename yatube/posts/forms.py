@@ -44,3 +44,14 @@ class CommentForm(forms.ModelForm):
         help_texts = {
             'text': ('Текст комментария к посту'),
         }
+
+
+class SearchForm(forms.Form):
+    q = forms.CharField(
+        label='Поиск', max_length=200, required=False,
+        widget=forms.TextInput(attrs={
+            'type': 'search',
+            'class': 'form-control',
+            'placeholder': 'Поиск по постам',
+        })
+    )
@@ -0,0 +1,176 @@
+"""
+Обработка загруженных картинок постов.
+
+Картинка из формы или API сохраняется как есть, а затем в пуле
+процессов из posts.thumbnails приводится к единому виду: уменьшается
+до IMAGE_MAX_SIDE по большей стороне, теряет EXIF и прочие метаданные
+и пересохраняется в IMAGE_FORMAT с качеством по IMAGE_QUALITY. Размеры
+записываются в Post.image_width и Post.image_height, оригинал и его
+миниатюры удаляются, для новой картинки готовятся миниатюры.
+
+Пока картинка не обработана, image_width пустое, по нему же команда
+normalize_images находит старые картинки.
+"""
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from PIL import Image, ImageOps, features
+from sorl.thumbnail import delete as delete_with_thumbnails
+
+from . import feed_cache, thumbnails
+from .models import Post
+
+logger = logging.getLogger(__name__)
+
+EXTENSIONS = {'WEBP': 'webp', 'JPEG': 'jpg', 'PNG': 'png'}
+
+# Метаданные, которые не переносятся в обработанную картинку.
+METADATA = ('exif', 'xmp', 'XML:com.adobe.xmp', 'comment')
+
+
+def has_alpha(image):
+    return (
+        image.mode in ('RGBA', 'LA', 'PA')
+        or 'transparency' in image.info
+    )
+
+
+def output_format(image):
+    """IMAGE_FORMAT, если его поддерживает Pillow и он подходит картинке."""
+    format = settings.IMAGE_FORMAT
+    if format == 'WEBP' and not features.check('webp'):
+        format = 'JPEG'
+    if format == 'JPEG' and has_alpha(image):
+        format = 'PNG'
+    return format
+
+
+def quality_for(width, height):
+    """Качество сжатия по числу точек: большим картинкам - ниже."""
+    pixels = width * height
+    for limit, quality in settings.IMAGE_QUALITY:
+        if limit is None or pixels <= limit:
+            return quality
+
+
+def is_normal(image, format):
+    return (
+        image.format == format
+        and max(image.size) <= settings.IMAGE_MAX_SIDE
+        and not any(key in image.info for key in METADATA)
+    )
+
+
+def encode(image, format):
+    """Пересохраняет картинку в format без метаданных."""
+    image = ImageOps.exif_transpose(image)
+    image.thumbnail(
+        (settings.IMAGE_MAX_SIDE, settings.IMAGE_MAX_SIDE), Image.LANCZOS
+    )
+    mode = 'RGBA' if has_alpha(image) else 'RGB'
+    if format == 'PNG':
+        options = {'optimize': True}
+    else:
+        options = {'quality': quality_for(*image.size)}
+        if format == 'JPEG':
+            mode = 'RGB'
+            options.update(optimize=True, progressive=True)
+        else:
+            options['method'] = 4
+    image = image.convert(mode)
+    buffer = BytesIO()
+    image.save(buffer, format, **options)
+    return image.size, ContentFile(buffer.getvalue())
+
+
+def normalize(name):
+    """
+    Приводит картинку name к единому виду.
+
+    Возвращает имя итогового файла и его размеры. Анимацию и картинки,
+    которые уже в нужном виде, оставляет как есть.
+    """
+    with default_storage.open(name) as file, Image.open(file) as image:
+        format = output_format(image)
+        if getattr(image, 'is_animated', False) or is_normal(image, format):
+            return (name, *image.size)
+        size, content = encode(image, format)
+    stem = os.path.splitext(name)[0]
+    new_name = default_storage.save(f'{stem}.{EXTENSIONS[format]}', content)
+    return (new_name, *size)
+
+
+def process(pk, name):
+    """
+    Обрабатывает картинку поста pk и готовит для нее миниатюры.
+
+    Пост обновляется, только если картинку не сменили за время
+    обработки. Возвращает итоговые (имя, ширина, высота) или None.
+    """
+    try:
+        new_name, width, height = normalize(name)
+    except Exception:
+        logger.exception('Не удалось обработать картинку %s', name)
+        return None
+    updated = Post.objects.filter(pk=pk, image=name).update(
+        image=new_name, image_width=width, image_height=height
+    )
+    if new_name != name:
+        if updated:
+            default_storage.delete(name)
+            # Тот же файл может остаться у другого поста.
+            if not default_storage.exists(name):
+                delete_with_thumbnails(
+                    thumbnails.source(name), delete_file=False
+                )
+        else:
+            default_storage.delete(new_name)
+    if not updated:
+        return None
+    # В лентах картинка сменилась, собранные фрагменты устарели.
+    post = Post.objects.only('author_id', 'group_id').filter(pk=pk).first()
+    if post is not None:
+        feed_cache.bump(*feed_cache.post_feeds(post))
+    thumbnails.generate(new_name)
+    return new_name, width, height
+
+
+def schedule(post):
+    """
+    Ставит обработку картинки поста в очередь пула после коммита.
+
+    Без пула (THUMBNAIL_WORKERS = 0) обрабатывает сразу и обновляет
+    сам объект, чтобы ответ API содержал итоговую картинку.
+    """
+    name = post.image.name
+    if not settings.THUMBNAIL_WORKERS:
+        result = process(post.pk, name)
+        if result is not None:
+            post.image.name, post.image_width, post.image_height = result
+        return
+    transaction.on_commit(
+        lambda: thumbnails.get_executor().submit(process, post.pk, name)
+    )
+
+
+def _process(item):
+    return process(*item) is not None
+
+
+def backfill(items, workers):
+    """Обрабатывает пары (pk, имя), возвращает (готово, ошибок)."""
+    if workers:
+        with ProcessPoolExecutor(
+            workers, initializer=thumbnails.init_worker
+        ) as pool:
+            results = list(pool.map(_process, items, chunksize=16))
+    else:
+        results = [_process(item) for item in items]
+    done = sum(results)
+    return done, len(results) - done
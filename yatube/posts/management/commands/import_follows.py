@@ -0,0 +1,94 @@
+import csv
+import json
+import os
+from itertools import islice
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.bulk import BATCH_SIZE, create_follows
+from posts.models import CustomUser
+
+FORMATS = ('csv', 'jsonl')
+
+
+def read_csv(file):
+    for row in csv.DictReader(file):
+        yield row.get('user'), row.get('author')
+
+
+def read_jsonl(file):
+    for line in file:
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            yield None, None
+            continue
+        if isinstance(row, dict):
+            yield row.get('user'), row.get('author')
+        else:
+            yield None, None
+
+
+def resolve(names):
+    """{имя: id} пользователей с именами names, запрос на BATCH_SIZE имен."""
+    names = sorted(names)
+    ids = {}
+    for start in range(0, len(names), BATCH_SIZE):
+        ids.update(CustomUser.objects.filter(
+            username__in=names[start:start + BATCH_SIZE]
+        ).values_list('username', 'pk'))
+    return ids
+
+
+class Command(BaseCommand):
+    help = (
+        'Загружает граф подписок из CSV (колонки user, author) или JSONL '
+        '({"user": ..., "author": ...}) с именами пользователей.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Файл с подписками.')
+        parser.add_argument(
+            '--format', choices=FORMATS,
+            help='Формат файла, по умолчанию - по расширению.'
+        )
+        parser.add_argument(
+            '--batch', type=int, default=5000,
+            help='Сколько строк загружать одной транзакцией.'
+        )
+
+    def handle(self, *args, **options):
+        path = options['path']
+        file_format = options['format'] or os.path.splitext(
+            path
+        )[1].lstrip('.').lower()
+        if file_format not in FORMATS:
+            raise CommandError(
+                f'Неизвестный формат файла, укажите --format {FORMATS}.'
+            )
+        reader = read_csv if file_format == 'csv' else read_jsonl
+        total = created = skipped = 0
+        with open(path, newline='', encoding='utf-8') as file:
+            rows = reader(file)
+            while True:
+                batch = list(islice(rows, options['batch']))
+                if not batch:
+                    break
+                ids = resolve(
+                    {name for row in batch for name in row if name}
+                )
+                pairs = [
+                    (ids[user], ids[author]) for user, author in batch
+                    if user in ids and author in ids and user != author
+                ]
+                total += len(batch)
+                skipped += len(batch) - len(pairs)
+                created += len(create_follows(pairs))
+                self.stdout.write(f'Строк: {total}, новых подписок: {created}')
+        self.stdout.write(
+            f'Готово: новых {created}, уже были или повторы '
+            f'{total - skipped - created}, пропущено {skipped}'
+        )
+        self.stdout.write(self.style.SUCCESS('Подписки загружены.'))
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+
+from posts import avatars
+from posts.models import CustomUser
+
+FIELDS = [f'avatar_{size}' for size in avatars.SIZES]
+
+
+class Command(BaseCommand):
+    help = 'Готовит уменьшенные копии аватаров, загруженных раньше.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all', action='store_true',
+            help='Пересоздать копии и у тех, у кого они уже есть.'
+        )
+
+    def handle(self, *args, **options):
+        users = CustomUser.objects.exclude(avatar='').exclude(avatar=None)
+        if not options['all']:
+            users = users.filter(avatar_30='')
+        count = 0
+        for user in users.iterator():
+            avatars.make_variants(user, force=True)
+            user.save(update_fields=FIELDS)
+            count += 1
+        self.stdout.write(self.style.SUCCESS(f'Аватаров обработано: {count}'))
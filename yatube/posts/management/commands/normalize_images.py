@@ -0,0 +1,26 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from posts import images
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = 'Обрабатывает картинки постов, загруженные до обработки.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, default=settings.THUMBNAIL_WORKERS,
+            help='Число процессов, 0 - без пула.'
+        )
+
+    def handle(self, *args, **options):
+        items = list(
+            Post.objects.exclude(image='').filter(
+                image_width__isnull=True
+            ).values_list('pk', 'image')
+        )
+        self.stdout.write(f'Картинок: {len(items)}')
+        done, failed = images.backfill(items, options['workers'])
+        self.stdout.write(f'Готово: {done}, ошибок: {failed}')
+        self.stdout.write(self.style.SUCCESS('Картинки обработаны.'))
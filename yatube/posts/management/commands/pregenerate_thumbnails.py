@@ -0,0 +1,21 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from posts import thumbnails
+
+
+class Command(BaseCommand):
+    help = 'Готовит миниатюры для всех картинок постов.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, default=settings.THUMBNAIL_WORKERS,
+            help='Число процессов, 0 - без пула.'
+        )
+
+    def handle(self, *args, **options):
+        names = list(thumbnails.post_images())
+        self.stdout.write(f'Картинок: {len(names)}')
+        done, failed = thumbnails.backfill(names, options['workers'])
+        self.stdout.write(f'Готово: {done}, ошибок: {failed}')
+        self.stdout.write(self.style.SUCCESS('Миниатюры подготовлены.'))
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from posts import counters
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает денормализованные счетчики постов и подписок.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size', type=int, default=1000,
+            help='Сколько строк проверять в одной транзакции.'
+        )
+
+    def handle(self, *args, **options):
+        fixed = counters.reconcile(options['chunk_size'])
+        for field, count in fixed.items():
+            self.stdout.write(f'{field}: исправлено {count}')
+        self.stdout.write(self.style.SUCCESS('Счетчики сверены.'))
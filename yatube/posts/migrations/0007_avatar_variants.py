@@ -0,0 +1,28 @@
+# Generated by Django 2.2.16 on 2026-10-18 18:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0006_post_fts'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customuser',
+            name='avatar_30',
+            field=models.ImageField(blank=True, editable=False, upload_to='users/variants/', verbose_name='Аватар 30 px'),
+        ),
+        migrations.AddField(
+            model_name='customuser',
+            name='avatar_300',
+            field=models.ImageField(blank=True, editable=False, upload_to='users/variants/', verbose_name='Аватар 300 px'),
+        ),
+        migrations.AddField(
+            model_name='customuser',
+            name='avatar_60',
+            field=models.ImageField(blank=True, editable=False, upload_to='users/variants/', verbose_name='Аватар 60 px'),
+        ),
+    ]
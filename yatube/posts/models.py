@@ -70,6 +70,19 @@ class CustomUser(AbstractBaseUser, PermissionsMixin):
         upload_to='users/',
         blank=True, default=None
     )
+    # Уменьшенные копии аватара, готовятся в posts.avatars.
+    avatar_30 = models.ImageField(
+        'Аватар 30 px', upload_to='users/variants/',
+        blank=True, editable=False
+    )
+    avatar_60 = models.ImageField(
+        'Аватар 60 px', upload_to='users/variants/',
+        blank=True, editable=False
+    )
+    avatar_300 = models.ImageField(
+        'Аватар 300 px', upload_to='users/variants/',
+        blank=True, editable=False
+    )
     is_staff = models.BooleanField(
         _('staff status'),
         default=False,
@@ -85,6 +98,11 @@ class CustomUser(AbstractBaseUser, PermissionsMixin):
         ),
     )
     date_joined = models.DateTimeField(_('date joined'), default=timezone.now)
+    post_count = models.PositiveIntegerField('Число постов', default=0)
+    follower_count = models.PositiveIntegerField(
+        'Число подписчиков', default=0
+    )
+    following_count = models.PositiveIntegerField('Число подписок', default=0)
 
     objects = CustomAccountManager()
 
@@ -138,6 +156,29 @@ class Group(models.Model):
         return self.title
 
 
+class PostQuerySet(models.QuerySet):
+    def feed(self):
+        """
+        Посты для лент с авторами, группами и последним комментарием.
+
+        Последние комментарии всех постов страницы вместе с их авторами
+        выбираются одним запросом, поэтому число запросов не зависит
+        от размера страницы. Число комментариев хранится в comment_count.
+        """
+        latest = Comment.objects.filter(
+            post=models.OuterRef('post')
+        ).order_by('-created', '-pk').values('pk')[:1]
+        return self.select_related('author', 'group').prefetch_related(
+            models.Prefetch(
+                'comments',
+                queryset=Comment.objects.filter(
+                    pk=models.Subquery(latest)
+                ).select_related('author'),
+                to_attr='latest_comments',
+            )
+        )
+
+
 class Post(CreatedModel):
     text = models.TextField(
         verbose_name='Текст поста',
@@ -163,13 +204,41 @@ class Post(CreatedModel):
         upload_to='posts/',
         blank=True
     )
+    # Заполняются после обработки картинки в posts.images.
+    image_width = models.PositiveIntegerField(
+        'Ширина картинки', null=True, blank=True, editable=False
+    )
+    image_height = models.PositiveIntegerField(
+        'Высота картинки', null=True, blank=True, editable=False
+    )
+    comment_count = models.PositiveIntegerField(
+        'Число комментариев', default=0
+    )
+
+    objects = PostQuerySet.as_manager()
 
     class Meta:
         ordering = ['-created']
+        # Индексы по возрастанию: SQLite читает их с конца и получает
+        # порядок (-created, -id) без сортировки, id хранится в индексе.
+        indexes = [
+            models.Index(fields=['created'], name='post_created_idx'),
+            models.Index(fields=['author', 'created'],
+                         name='post_author_created_idx'),
+            models.Index(fields=['group', 'created'],
+                         name='post_group_created_idx'),
+        ]
 
     def __str__(self):
         return self.text[:15]
 
+    @property
+    def last_comment(self):
+        """Последний комментарий, выбранный заранее через feed()."""
+        if hasattr(self, 'latest_comments'):
+            return self.latest_comments[0] if self.latest_comments else None
+        return self.comments.select_related('author').first()
+
 
 class Comment(CreatedModel):
     post = models.ForeignKey(
@@ -194,6 +263,12 @@ class Comment(CreatedModel):
 
     class Meta:
         ordering = ['-created']
+        indexes = [
+            models.Index(fields=['post', 'created'],
+                         name='comment_post_created_idx'),
+            # Выгрузка с since идет по (created, id).
+            models.Index(fields=['created'], name='comment_created_idx'),
+        ]
 
     def __str__(self):
         return self.text[:15]
@@ -219,3 +294,45 @@ class Follow (CreatedModel):
             models.UniqueConstraint(fields=['user', 'author'],
                                     name='unique_follow')
         ]
+        # Пара (user, author) уже проиндексирована ограничением unique_follow.
+        indexes = [
+            models.Index(fields=['author', 'user'],
+                         name='follow_author_user_idx'),
+            models.Index(fields=['created'], name='follow_created_idx'),
+        ]
+
+
+class TimelineEntry(models.Model):
+    """Запись материализованной ленты подписок пользователя."""
+    user = models.ForeignKey(
+        CustomUser,
+        on_delete=models.CASCADE,
+        related_name='timeline',
+        verbose_name='Читатель'
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='timeline_entries',
+        verbose_name='Пост'
+    )
+    author = models.ForeignKey(
+        CustomUser,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Автор'
+    )
+    created = models.DateTimeField('Дата создания поста')
+
+    class Meta:
+        ordering = ['-created']
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'post'],
+                                    name='unique_timeline_entry')
+        ]
+        indexes = [
+            models.Index(fields=['user', '-created', '-post'],
+                         name='timeline_user_created_idx'),
+            models.Index(fields=['user', 'author'],
+                         name='timeline_user_author_idx'),
+        ]
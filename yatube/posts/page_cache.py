@@ -0,0 +1,84 @@
+"""
+Кеш страниц целиком для анонимных посетителей.
+
+Большинство запросов к лентам и постам - от гостей без сессии, и
+страница для них одна и та же. Ответ сохраняется сжатым gzip и
+отдается без ORM, пагинации и шаблонов. Браузеру, который принимает
+gzip, байты отдаются как есть, остальным - распакованными.
+
+Ключ - путь с параметрами и ETag страницы (feed_cache.etag), поэтому
+сигналы, сбрасывающие поколения лент, сбрасывают и сохраненные
+страницы. Запросы с cookie сессии и ответы, ставящие cookie, мимо
+кеша: у них страница может зависеть от пользователя.
+"""
+import gzip
+import hashlib
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.middleware.gzip import re_accepts_gzip
+from django.utils.cache import patch_vary_headers
+
+KEY_PREFIX = 'page'
+
+
+def is_cacheable(request):
+    return (
+        request.method in ('GET', 'HEAD')
+        and settings.SESSION_COOKIE_NAME not in request.COOKIES
+    )
+
+
+def page_key(request, etag):
+    path = hashlib.md5(request.get_full_path().encode()).hexdigest()
+    return f'{KEY_PREFIX}:{path}:{etag}'
+
+
+def store(key, response):
+    if (not settings.PAGE_CACHE_TIMEOUT or response.status_code != 200
+            or response.streaming or response.cookies):
+        return
+    cache.set(
+        key,
+        (response['Content-Type'], gzip.compress(response.content)),
+        settings.PAGE_CACHE_TIMEOUT,
+    )
+
+
+def cached_response(request, content_type, content):
+    if re_accepts_gzip.search(request.META.get('HTTP_ACCEPT_ENCODING', '')):
+        response = HttpResponse(content, content_type=content_type)
+        response['Content-Encoding'] = 'gzip'
+    else:
+        response = HttpResponse(
+            gzip.decompress(content), content_type=content_type
+        )
+    patch_vary_headers(response, ('Accept-Encoding', 'Cookie'))
+    return response
+
+
+def anonymous(etag_func):
+    """
+    Декоратор представления: кеш страницы для гостей.
+
+    etag_func - та же функция, что у condition(), None - не кешировать.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if not is_cacheable(request):
+                return view(request, *args, **kwargs)
+            etag = etag_func(request, *args, **kwargs)
+            if etag is None:
+                return view(request, *args, **kwargs)
+            key = page_key(request, etag)
+            cached = cache.get(key)
+            if cached is not None:
+                return cached_response(request, *cached)
+            response = view(request, *args, **kwargs)
+            store(key, response)
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,138 @@
+"""
+Полнотекстовый поиск по постам на SQLite FTS5.
+
+Индекс posts_post_fts хранит только токены, текст берется из posts_post
+(external content). Синхронизацию делают триггеры на posts_post, поэтому
+индекс не отстает и при bulk_create, и при queryset.update(). Пересборка
+таблицы в миграциях SQLite удаляет триггеры, их заново ставит install()
+после каждого migrate.
+
+Стеммера для русского языка в FTS5 нет, поэтому слова запроса
+обрезаются до основы и ищутся по префиксу: «котами» находит «кот»,
+«кота» и «котик». Результаты упорядочены по BM25.
+"""
+import re
+
+from django.db import connection
+
+from .models import Post
+
+TABLE = 'posts_post_fts'
+
+# Больше слов в запросе не учитывается, чтобы ограничить стоимость поиска.
+MAX_TERMS = 10
+
+# Короче основа не обрезается: иначе префикс совпадет с чем угодно.
+MIN_STEM = 3
+
+_WORDS = re.compile(r'\w+')
+_CYRILLIC = re.compile('[а-яё]')
+
+# Окончания и суффиксы, самые длинные первыми.
+_ENDINGS = sorted((
+    'иями', 'ями', 'ами', 'иях', 'ях', 'ах', 'ией', 'ость', 'ости',
+    'ого', 'его', 'ому', 'ему', 'ыми', 'ими', 'ешь', 'ишь',
+    'ете', 'ите', 'ем', 'им', 'ом', 'ой', 'ей', 'ий', 'ый', 'ая', 'яя',
+    'ое', 'ее', 'ые', 'ие', 'ую', 'юю', 'ов', 'ев', 'ам', 'ям', 'ию',
+    'ия', 'ть', 'ла', 'ло', 'ли', 'ет', 'ит', 'ут', 'ют', 'ат', 'ят',
+    'а', 'я', 'о', 'е', 'ы', 'и', 'у', 'ю', 'ь', 'й',
+), key=len, reverse=True)
+
+INSTALL_SQL = (
+    f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {TABLE} USING fts5(
+        text, content='posts_post', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {TABLE}_insert
+    AFTER INSERT ON posts_post BEGIN
+        INSERT INTO {TABLE}(rowid, text) VALUES (new.id, new.text);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {TABLE}_delete
+    AFTER DELETE ON posts_post BEGIN
+        INSERT INTO {TABLE}({TABLE}, rowid, text)
+        VALUES ('delete', old.id, old.text);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {TABLE}_update
+    AFTER UPDATE OF text ON posts_post BEGIN
+        INSERT INTO {TABLE}({TABLE}, rowid, text)
+        VALUES ('delete', old.id, old.text);
+        INSERT INTO {TABLE}(rowid, text) VALUES (new.id, new.text);
+    END
+    """,
+)
+
+
+def is_available():
+    return connection.vendor == 'sqlite'
+
+
+def install():
+    """Создает таблицу индекса и триггеры, если их нет."""
+    if not is_available():
+        return
+    with connection.cursor() as cursor:
+        for sql in INSTALL_SQL:
+            cursor.execute(sql)
+
+
+def rebuild():
+    """Перестраивает индекс по текущему содержимому posts_post."""
+    if not is_available():
+        return
+    install()
+    with connection.cursor() as cursor:
+        cursor.execute(f"INSERT INTO {TABLE}({TABLE}) VALUES ('rebuild')")
+        cursor.execute(f"INSERT INTO {TABLE}({TABLE}) VALUES ('optimize')")
+
+
+def stem(word):
+    """Отрезает от русского слова окончание, оставляя основу."""
+    if not _CYRILLIC.search(word):
+        return word
+    for ending in _ENDINGS:
+        if word.endswith(ending) and len(word) - len(ending) >= MIN_STEM:
+            return word[:-len(ending)]
+    return word
+
+
+def terms(query):
+    """Основы слов запроса в нижнем регистре."""
+    words = _WORDS.findall(query.lower())
+    return [stem(word) for word in words[:MAX_TERMS]]
+
+
+def match_expression(query):
+    """
+    Строит выражение MATCH: все слова запроса по префиксу основы.
+
+    Слова берутся в кавычки, поэтому операторы FTS5 во вводе
+    пользователя (NEAR, OR, *, ^) не ломают запрос.
+    """
+    return ' '.join(f'"{term}"*' for term in terms(query))
+
+
+def search_posts(query, queryset=None):
+    """Посты, подходящие под запрос, от самых релевантных."""
+    if queryset is None:
+        queryset = Post.objects.all()
+    expression = match_expression(query)
+    if not expression:
+        return queryset.none()
+    if not is_available():
+        for term in terms(query):
+            queryset = queryset.filter(text__icontains=term)
+        return queryset
+    return queryset.extra(
+        tables=[TABLE],
+        where=[f'{TABLE}.rowid = posts_post.id', f'{TABLE} MATCH %s'],
+        params=[expression],
+        select={'search_rank': f'bm25({TABLE})'},
+        order_by=['search_rank', '-created'],
+    )
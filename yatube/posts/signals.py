@@ -0,0 +1,203 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from core import storage
+
+from . import avatars, counters, feed_cache, images, timeline
+from .models import Comment, CustomUser, Follow, Group, Post
+
+AVATAR_FIELDS = ('avatar', *(f'avatar_{size}' for size in avatars.SIZES))
+
+
+# Счетчики обновляются раньше лент: timeline смотрит на follower_count.
+@receiver(post_save, sender=Post)
+def count_new_post(sender, instance, created, **kwargs):
+    if created:
+        counters.shift(CustomUser, instance.author_id, 'post_count', 1)
+
+
+@receiver(post_delete, sender=Post)
+def count_deleted_post(sender, instance, **kwargs):
+    counters.shift(CustomUser, instance.author_id, 'post_count', -1)
+
+
+@receiver(post_save, sender=Comment)
+def count_new_comment(sender, instance, created, **kwargs):
+    if created:
+        counters.shift(Post, instance.post_id, 'comment_count', 1)
+
+
+@receiver(post_delete, sender=Comment)
+def count_deleted_comment(sender, instance, **kwargs):
+    counters.shift(Post, instance.post_id, 'comment_count', -1)
+
+
+@receiver(post_save, sender=Follow)
+def count_new_follow(sender, instance, created, **kwargs):
+    if created:
+        counters.shift(CustomUser, instance.author_id, 'follower_count', 1)
+        counters.shift(CustomUser, instance.user_id, 'following_count', 1)
+
+
+@receiver(post_delete, sender=Follow)
+def count_deleted_follow(sender, instance, **kwargs):
+    counters.shift(CustomUser, instance.author_id, 'follower_count', -1)
+    counters.shift(CustomUser, instance.user_id, 'following_count', -1)
+
+
+@receiver(post_save, sender=Post)
+def push_post_to_timelines(sender, instance, created, **kwargs):
+    if created and timeline.is_enabled():
+        timeline.push_post(instance)
+
+
+@receiver(post_save, sender=Follow)
+def backfill_timeline(sender, instance, created, **kwargs):
+    if created and timeline.is_enabled():
+        timeline.sync_authors({instance.author_id: 1})
+        timeline.backfill(instance.user_id, instance.author_id)
+
+
+@receiver(post_delete, sender=Follow)
+def prune_timeline(sender, instance, **kwargs):
+    if timeline.is_enabled():
+        timeline.prune(instance.user_id, instance.author_id)
+        timeline.sync_authors({instance.author_id: -1})
+
+
+@receiver(pre_save, sender=Post)
+def reset_image_size(sender, instance, **kwargs):
+    # Новая картинка еще не в хранилище, ее размеры узнает обработка.
+    if instance.image and not instance.image._committed:
+        instance.image_width = instance.image_height = None
+
+
+@receiver(post_save, sender=Post)
+def process_image(sender, instance, **kwargs):
+    if instance.image and instance.image_width is None:
+        images.schedule(instance)
+
+
+@receiver(pre_save, sender=CustomUser)
+def make_avatar_variants(sender, instance, **kwargs):
+    avatars.make_variants(instance)
+
+
+@receiver(pre_save, sender=Post)
+def release_replaced_image(sender, instance, **kwargs):
+    if not instance.image or not instance.image._committed:
+        storage.release_replaced(instance, ('image',))
+
+
+@receiver(post_delete, sender=Post)
+def release_image(sender, instance, **kwargs):
+    storage.release(instance.image.storage, instance.image.name)
+
+
+# После make_avatar_variants: новые копии уже в полях и в хранилище.
+@receiver(pre_save, sender=CustomUser)
+def release_replaced_avatars(sender, instance, update_fields=None, **kwargs):
+    if update_fields and not set(update_fields) & set(AVATAR_FIELDS):
+        return
+    # Пересозданные копии отпускаются по именам до пересоздания: имя
+    # могло не измениться, а ссылка прибавилась.
+    for file_storage, name in getattr(instance, '_replaced_variants', ()):
+        storage.release(file_storage, name)
+    instance._replaced_variants = []
+    if not instance.avatar:
+        storage.release_replaced(instance, AVATAR_FIELDS)
+    elif not instance.avatar._committed:
+        storage.release_replaced(instance, ('avatar',))
+
+
+@receiver(post_delete, sender=CustomUser)
+def release_avatars(sender, instance, **kwargs):
+    for field in AVATAR_FIELDS:
+        file = getattr(instance, field)
+        storage.release(file.storage, file.name)
+
+
+@receiver(pre_save, sender=Post)
+def remember_group(sender, instance, **kwargs):
+    # Пост могут перенести в другую группу, ее лента тоже меняется.
+    if not instance._state.adding:
+        instance._previous_group_id = Post.objects.filter(
+            pk=instance.pk
+        ).values_list('group_id', flat=True).first()
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def bump_post_feeds(sender, instance, **kwargs):
+    feeds = feed_cache.post_feeds(instance)
+    previous = getattr(instance, '_previous_group_id', None)
+    if previous is not None and previous != instance.group_id:
+        feeds.append(f'group:{previous}')
+    feed_cache.bump(*feeds)
+
+
+@receiver(post_delete, sender=Post)
+def forget_post_author(sender, instance, **kwargs):
+    # SQLite отдает id удаленной последней строки следующей вставке.
+    feed_cache.forget(Post, 'pk', instance.pk)
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def bump_comment_feeds(sender, instance, **kwargs):
+    feed_cache.bump(*feed_cache.post_feeds(instance.post))
+
+
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def bump_follow_feed(sender, instance, **kwargs):
+    feed_cache.bump(
+        f'follow:{instance.user_id}', f'profile:{instance.author_id}'
+    )
+
+
+@receiver(pre_save, sender=Group)
+def remember_slug(sender, instance, **kwargs):
+    if not instance._state.adding:
+        instance._previous_slug = Group.objects.filter(
+            pk=instance.pk
+        ).values_list('slug', flat=True).first()
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def bump_group_feed(sender, instance, **kwargs):
+    # Название и ссылка группы видны в каждой ленте и на странице поста,
+    # а при удалении SET_NULL обнуляет group у постов без их сигналов.
+    slugs = {instance.slug, getattr(instance, '_previous_slug', None)}
+    feed_cache.forget(Group, 'slug', *(slug for slug in slugs if slug))
+    feed_cache.bump(f'group:{instance.pk}', feed_cache.SITE)
+
+
+@receiver(pre_save, sender=CustomUser)
+def remember_username(sender, instance, update_fields=None, **kwargs):
+    # Старое имя может занять другой пользователь, а id по имени
+    # запомнен в кеше (feed_cache.lookup).
+    if instance._state.adding or (
+            update_fields is not None and 'username' not in update_fields):
+        return
+    instance._previous_username = CustomUser.objects.filter(
+        pk=instance.pk
+    ).values_list('username', flat=True).first()
+
+
+@receiver(post_save, sender=CustomUser)
+def bump_site(sender, instance, created, update_fields=None, **kwargs):
+    # Имя и аватар видны на всех страницах. Вход меняет только
+    # last_login, а нового пользователя еще нигде не показывали.
+    if created or update_fields == {'last_login'}:
+        return
+    previous = getattr(instance, '_previous_username', None)
+    if previous and previous != instance.username:
+        feed_cache.forget(CustomUser, 'username', previous)
+    feed_cache.bump(feed_cache.SITE)
+
+
+@receiver(post_delete, sender=CustomUser)
+def forget_username(sender, instance, **kwargs):
+    feed_cache.forget(CustomUser, 'username', instance.username)
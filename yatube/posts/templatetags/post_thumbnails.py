@@ -0,0 +1,12 @@
+from django import template
+
+from posts import thumbnails
+
+register = template.Library()
+
+
+@register.simple_tag
+def prefetch_thumbnails(posts):
+    """Заранее читает записи миниатюр всех постов страницы."""
+    thumbnails.prefetch(posts)
+    return ''
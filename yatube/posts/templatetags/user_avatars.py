@@ -0,0 +1,11 @@
+from django import template
+
+from posts import avatars
+
+register = template.Library()
+
+
+@register.filter
+def avatar(user, size):
+    """Адрес копии аватара под размер картинки: {{ user|avatar:30 }}."""
+    return avatars.url_for(user, int(size))
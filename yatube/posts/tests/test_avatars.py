@@ -0,0 +1,100 @@
+import shutil
+import tempfile
+from io import BytesIO, StringIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from posts import avatars
+from posts.models import Post
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+User = get_user_model()
+
+
+def photo(name='avatar.png', size=(800, 600)):
+    buffer = BytesIO()
+    Image.new('RGB', size, (200, 40, 40)).save(buffer, 'PNG')
+    return SimpleUploadedFile(name, buffer.getvalue(), 'image/png')
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, THUMBNAIL_WORKERS=0)
+class AvatarVariantsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(
+            email='author@yatube.ru', username='Author', password='pass'
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def upload(self, file):
+        return self.client.post(reverse('users:account_update'), {
+            'username': self.user.username,
+            'email': self.user.email,
+            'avatar': file,
+        })
+
+    def test_variants_made_on_update(self):
+        """Загрузка аватара в профиле готовит квадратные копии."""
+        self.upload(photo())
+        self.user.refresh_from_db()
+        for size in avatars.SIZES:
+            variant = getattr(self.user, f'avatar_{size}')
+            with Image.open(variant.path) as image:
+                self.assertEqual(image.size, (size, size))
+
+    def test_variants_kept_without_new_upload(self):
+        """Сохранение без нового файла не пересоздает копии."""
+        self.upload(photo())
+        self.user.refresh_from_db()
+        name = self.user.avatar_30.name
+        self.user.first_name = 'Имя'
+        self.user.save()
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.avatar_30.name, name)
+
+    def test_url_for_picks_nearest_variant(self):
+        self.upload(photo())
+        self.user.refresh_from_db()
+        self.assertEqual(
+            avatars.url_for(self.user, 30), self.user.avatar_30.url
+        )
+        self.assertEqual(
+            avatars.url_for(self.user, 40), self.user.avatar_60.url
+        )
+        self.assertEqual(
+            avatars.url_for(self.user, 1000), self.user.avatar.url
+        )
+
+    def test_feed_uses_small_variant(self):
+        self.upload(photo())
+        self.user.refresh_from_db()
+        Post.objects.create(author=self.user, text='Пост')
+        response = self.client.get(reverse('posts:index'))
+        self.assertContains(response, self.user.avatar_30.url)
+        self.assertNotContains(
+            response, f'src="{self.user.avatar.url}"'
+        )
+
+    def test_command_fills_old_avatars(self):
+        """Команда готовит копии для аватаров без них."""
+        self.upload(photo())
+        User.objects.filter(pk=self.user.pk).update(
+            avatar_30='', avatar_60='', avatar_300=''
+        )
+        call_command('make_avatar_variants', stdout=StringIO())
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.avatar_300)
@@ -0,0 +1,150 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+@override_settings(FEED_PAGINATION='page')
+class ConditionalGetTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(
+            email='author@yatube.ru', username='Author', password='pass'
+        )
+        cls.reader = User.objects.create_user(
+            email='reader@yatube.ru', username='Reader', password='pass'
+        )
+        cls.group = Group.objects.create(title='Группа', slug='group')
+        cls.post = Post.objects.create(
+            author=cls.author, text='Пост', group=cls.group
+        )
+        cls.urls = (
+            reverse('posts:index'),
+            reverse('posts:group_list', args=[cls.group.slug]),
+            reverse('posts:profile', args=[cls.author.username]),
+            reverse('posts:post_detail', args=[cls.post.pk]),
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def revalidate(self, url):
+        """Повторный запрос url с ETag первого ответа."""
+        etag = self.client.get(url)['ETag']
+        return self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+    def test_anonymous_not_modified_without_queries(self):
+        for url in self.urls:
+            with self.subTest(url=url):
+                etag = self.client.get(url)['ETag']
+                with self.assertNumQueries(0):
+                    response = self.client.get(
+                        url, HTTP_IF_NONE_MATCH=etag
+                    )
+                self.assertEqual(response.status_code, 304)
+
+    def test_logged_in_not_modified_reads_only_session(self):
+        self.client.force_login(self.reader)
+        for url in self.urls:
+            with self.subTest(url=url):
+                etag = self.client.get(url)['ETag']
+                with self.assertNumQueries(1):
+                    response = self.client.get(
+                        url, HTTP_IF_NONE_MATCH=etag
+                    )
+                self.assertEqual(response.status_code, 304)
+
+    def test_etag_differs_per_viewer(self):
+        url = reverse('posts:post_detail', args=[self.post.pk])
+        etag = self.client.get(url)['ETag']
+        self.client.force_login(self.reader)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_new_csrf_cookie_changes_pages(self):
+        """Страница с формой из кеша браузера не отправит старый токен."""
+        self.client.force_login(self.reader)
+        url = reverse('posts:post_detail', args=[self.post.pk])
+        etag = self.client.get(url)['ETag']
+        # logout() клиента забывает и cookie CSRF, как браузер после
+        # выхода и нового входа получает новую.
+        self.client.logout()
+        self.client.force_login(self.reader)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        token = self.client.cookies[settings.CSRF_COOKIE_NAME].value
+        self.assertNotIn(token, response['ETag'])
+
+    def test_new_post_changes_pages(self):
+        etags = {url: self.client.get(url)['ETag'] for url in self.urls}
+        Post.objects.create(author=self.author, text='Новый', group=self.group)
+        for url, etag in etags.items():
+            with self.subTest(url=url):
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 200)
+
+    def test_comment_changes_post_page(self):
+        url = reverse('posts:post_detail', args=[self.post.pk])
+        etag = self.client.get(url)['ETag']
+        Comment.objects.create(post=self.post, author=self.reader, text='Ок')
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertContains(response, 'Ок')
+
+    def test_follow_changes_profile(self):
+        self.client.force_login(self.reader)
+        url = reverse('posts:profile', args=[self.author.username])
+        etag = self.client.get(url)['ETag']
+        Follow.objects.create(user=self.reader, author=self.author)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_user_rename_changes_pages(self):
+        url = reverse('posts:index')
+        etag = self.client.get(url)['ETag']
+        self.author.first_name = 'Лев'
+        self.author.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_old_username_taken_by_new_user(self):
+        """Имя, освободившееся после переименования, ведет на нового."""
+        user = User.objects.create_user(
+            email='alice@yatube.ru', username='alice', password='pass'
+        )
+        url = reverse('posts:profile', args=['alice'])
+        self.client.get(url)
+        user.username = 'alice2'
+        user.save()
+        newcomer = User.objects.create_user(
+            email='alice-new@yatube.ru', username='alice', password='pass'
+        )
+        etag = self.client.get(url)['ETag']
+        Post.objects.create(author=newcomer, text='Пост новой Алисы')
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertContains(response, 'Пост новой Алисы')
+
+    def test_reused_post_id_gets_new_author(self):
+        """Id удаленного поста может достаться посту другого автора."""
+        post = Post.objects.create(author=self.author, text='Удаляемый')
+        post_id = post.pk
+        url = reverse('posts:post_detail', args=[post_id])
+        self.client.get(url)
+        post.delete()
+        Post.objects.create(pk=post_id, author=self.reader, text='Новый')
+        etag = self.client.get(url)['ETag']
+        Post.objects.create(author=self.reader, text='Еще один')
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_missing_objects_still_404(self):
+        for url in (reverse('posts:group_list', args=['missing']),
+                    reverse('posts:profile', args=['missing']),
+                    reverse('posts:post_detail', args=[0])):
+            with self.subTest(url=url):
+                self.assertEqual(self.client.get(url).status_code, 404)
@@ -0,0 +1,108 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Post
+
+User = get_user_model()
+
+
+class CountersTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(
+            email='author@yatube.ru', username='Author', password='pass'
+        )
+        cls.reader = User.objects.create_user(
+            email='reader@yatube.ru', username='Reader', password='pass'
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def refresh(self, *objects):
+        for obj in objects:
+            obj.refresh_from_db()
+
+    def test_post_count(self):
+        """post_count растет при создании и падает при удалении поста."""
+        post = Post.objects.create(author=self.author, text='Пост')
+        Post.objects.create(author=self.author, text='Еще пост')
+        post.delete()
+        self.refresh(self.author)
+        self.assertEqual(self.author.post_count, 1)
+
+    def test_comment_count(self):
+        """comment_count следует за комментариями поста."""
+        post = Post.objects.create(author=self.author, text='Пост')
+        for i in range(3):
+            Comment.objects.create(
+                post=post, author=self.reader, text=f'Комментарий {i}'
+            )
+        post.comments.first().delete()
+        self.refresh(post)
+        self.assertEqual(post.comment_count, 2)
+
+    def test_follow_counts(self):
+        """Подписка и отписка меняют счетчики обоих пользователей."""
+        client = Client()
+        client.force_login(self.reader)
+        client.get(reverse('posts:profile_follow',
+                           kwargs={'username': self.author.username}))
+        self.refresh(self.author, self.reader)
+        self.assertEqual(self.author.follower_count, 1)
+        self.assertEqual(self.reader.following_count, 1)
+        client.get(reverse('posts:profile_unfollow',
+                           kwargs={'username': self.author.username}))
+        self.refresh(self.author, self.reader)
+        self.assertEqual(self.author.follower_count, 0)
+        self.assertEqual(self.reader.following_count, 0)
+
+    def test_counter_does_not_go_below_zero(self):
+        """Удаление при разошедшемся счетчике не уводит его в минус."""
+        post = Post.objects.create(author=self.author, text='Пост')
+        User.objects.filter(pk=self.author.pk).update(post_count=0)
+        post.delete()
+        self.refresh(self.author)
+        self.assertEqual(self.author.post_count, 0)
+
+    def test_reconcile_repairs_drift(self):
+        """reconcile_counters чинит счетчики, обойденные bulk_create."""
+        posts = Post.objects.bulk_create(
+            Post(author=self.author, text=f'Пост {i}') for i in range(5)
+        )
+        Follow.objects.bulk_create([
+            Follow(user=self.reader, author=self.author)
+        ])
+        post = Post.objects.create(author=self.author, text='Пост')
+        Comment.objects.bulk_create(
+            Comment(post=post, author=self.reader, text='Комментарий')
+            for _ in range(2)
+        )
+        call_command('reconcile_counters', chunk_size=1, stdout=StringIO())
+        self.refresh(self.author, self.reader, post)
+        self.assertEqual(self.author.post_count, len(posts) + 1)
+        self.assertEqual(self.author.follower_count, 1)
+        self.assertEqual(self.reader.following_count, 1)
+        self.assertEqual(post.comment_count, 2)
+
+    def test_pages_do_not_count_rows(self):
+        """Профиль берет число постов и комментариев из счетчиков."""
+        post = Post.objects.create(author=self.author, text='Пост')
+        Comment.objects.create(post=post, author=self.reader, text='Текст')
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(
+                reverse('posts:profile', kwargs={'username': 'Author'})
+            )
+        self.assertContains(response, 'Всего постов: 1')
+        self.assertContains(response, 'Комментариев: <a')
+        for query in queries.captured_queries:
+            self.assertNotIn('COUNT(*) AS "__count" FROM "posts_comment"',
+                             query['sql'])
@@ -0,0 +1,127 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache, caches
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from posts import feed_cache
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+@override_settings(FEED_PAGINATION='page', FEED_CACHE_TIMEOUT=3600)
+class FeedCacheTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(
+            email='author@yatube.ru', username='Author', password='pass'
+        )
+        cls.reader = User.objects.create_user(
+            email='reader@yatube.ru', username='Reader', password='pass'
+        )
+        cls.group = Group.objects.create(title='Группа', slug='group')
+        cls.other_group = Group.objects.create(title='Другая', slug='other')
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.reader)
+
+    def test_pages_cached_separately(self):
+        """Вторая страница главной не отдает фрагмент первой."""
+        for i in range(15):
+            Post.objects.create(author=self.author, text=f'Пост номер {i}')
+        self.client.get(reverse('posts:index'))
+        response = self.client.get(reverse('posts:index') + '?page=2')
+        self.assertContains(response, 'Пост номер 0')
+        self.assertNotContains(response, 'Пост номер 14')
+
+    def test_new_post_shown_immediately(self):
+        index = reverse('posts:index')
+        group_list = reverse('posts:group_list', args=[self.group.slug])
+        self.client.get(index)
+        self.client.get(group_list)
+        Post.objects.create(
+            author=self.author, text='Свежий пост', group=self.group
+        )
+        self.assertContains(self.client.get(index), 'Свежий пост')
+        self.assertContains(self.client.get(group_list), 'Свежий пост')
+
+    def test_comment_updates_feed(self):
+        post = Post.objects.create(author=self.author, text='Пост')
+        self.client.get(reverse('posts:index'))
+        Comment.objects.create(post=post, author=self.reader, text='Ок')
+        response = self.client.get(reverse('posts:index'))
+        self.assertContains(response, 'Последний комментарий')
+
+    def test_follow_shows_author_posts(self):
+        Post.objects.create(author=self.author, text='Пост автора')
+        self.client.get(reverse('posts:follow_index'))
+        Follow.objects.create(user=self.reader, author=self.author)
+        response = self.client.get(reverse('posts:follow_index'))
+        self.assertContains(response, 'Пост автора')
+
+    def test_other_group_keeps_generation(self):
+        """Пост в одной группе не сбрасывает ленту другой."""
+        before = feed_cache.generations(f'group:{self.other_group.pk}')
+        Post.objects.create(author=self.author, text='Пост', group=self.group)
+        self.assertEqual(
+            feed_cache.generations(f'group:{self.other_group.pk}'), before
+        )
+
+    def test_moving_post_bumps_previous_group(self):
+        post = Post.objects.create(
+            author=self.author, text='Пост', group=self.group
+        )
+        before = feed_cache.generations(f'group:{self.group.pk}')
+        post.group = self.other_group
+        post.save()
+        self.assertNotEqual(
+            feed_cache.generations(f'group:{self.group.pk}'), before
+        )
+
+    def test_group_rename_and_delete_shown_everywhere(self):
+        """Группа видна в чужих лентах: правка сбрасывает и их."""
+        group = Group.objects.create(title='Старая группа', slug='old')
+        post = Post.objects.create(
+            author=self.author, text='Пост', group=group
+        )
+        pages = (
+            reverse('posts:index'),
+            reverse('posts:profile', args=[self.author.username]),
+            reverse('posts:post_detail', args=[post.pk]),
+        )
+        # Гость получает страницу из кеша страниц, пользователь - из
+        # фрагментов.
+        clients = (self.client_class(), self.client)
+        for client in clients:
+            for page in pages:
+                self.assertContains(client.get(page), 'Старая группа')
+        group.title = 'Новая группа'
+        group.save()
+        for client in clients:
+            for page in pages:
+                with self.subTest(page=page):
+                    response = client.get(page)
+                    self.assertNotContains(response, 'Старая группа')
+                    self.assertContains(response, 'Новая группа')
+        group.delete()
+        for client in clients:
+            for page in pages:
+                with self.subTest(page=page):
+                    self.assertNotContains(client.get(page), '/group/old/')
+            response = client.get(reverse('posts:group_list', args=['old']))
+            self.assertEqual(response.status_code, 404)
+
+    def test_generation_bumped_by_other_process(self):
+        """Поколение, увеличенное другим воркером, видно сразу."""
+        before = feed_cache.generations('index')[0]
+        # Другой процесс меняет только общий L2, L1 этого процесса цел.
+        caches['shared'].incr(feed_cache.generation_key('index'))
+        self.assertEqual(feed_cache.generations('index')[0], before + 1)
+
+    def test_missing_generation_not_zero(self):
+        """Вытесненный счетчик не возвращается к старым значениям."""
+        feed_cache.bump('index')
+        cache.delete(feed_cache.generation_key('index'))
+        self.assertGreater(feed_cache.generations('index')[0], 1000)
@@ -0,0 +1,72 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+class FeedQueriesTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(
+            email='author@yatube.ru', username='Author', password='pass'
+        )
+        cls.reader = User.objects.create_user(
+            email='reader@yatube.ru', username='Reader', password='pass'
+        )
+        cls.group = Group.objects.create(title='Группа', slug='group')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+        self.reader_client = Client()
+        self.reader_client.force_login(FeedQueriesTests.reader)
+        self.urls = (
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': self.group.slug}),
+            reverse('posts:profile',
+                    kwargs={'username': self.author.username}),
+            reverse('posts:follow_index'),
+        )
+
+    def add_posts(self, count):
+        for i in range(count):
+            post = Post.objects.create(
+                author=self.author, group=self.group, text=f'Пост {i}'
+            )
+            for j in range(2):
+                Comment.objects.create(
+                    post=post, author=self.reader, text=f'Комментарий {j}'
+                )
+
+    def count_queries(self, url):
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            self.reader_client.get(url)
+        return len(queries)
+
+    def test_queries_do_not_depend_on_page_size(self):
+        """Число запросов ленты не зависит от числа постов на странице."""
+        self.add_posts(1)
+        small = {url: self.count_queries(url) for url in self.urls}
+        self.add_posts(9)
+        for url in self.urls:
+            with self.subTest(url=url):
+                self.assertEqual(self.count_queries(url), small[url])
+
+    def test_last_comment_is_prefetched(self):
+        """Последний комментарий с автором приходит без ленивых запросов."""
+        self.add_posts(3)
+        expected = [post.comments.first() for post in Post.objects.all()]
+        posts = list(Post.objects.feed())
+        with self.assertNumQueries(0):
+            for post, last in zip(posts, expected):
+                self.assertEqual(post.last_comment, last)
+                self.assertEqual(post.last_comment.author, self.reader)
+                self.assertEqual(post.group, self.group)
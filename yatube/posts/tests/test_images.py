@@ -0,0 +1,129 @@
+import base64
+import shutil
+import tempfile
+from io import BytesIO, StringIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+from rest_framework.test import APIClient
+
+from core.models import Blob
+from posts import images
+from posts.models import Post
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+User = get_user_model()
+
+
+def upload(name, size, format, **options):
+    buffer = BytesIO()
+    Image.new('RGB', size, (30, 90, 150)).save(buffer, format, **options)
+    return SimpleUploadedFile(name, buffer.getvalue(), f'image/{format}')
+
+
+def photo_with_exif(size=(4000, 3000)):
+    exif = Image.Exif()
+    exif[0x010F] = 'Camera maker'
+    return upload('photo.jpg', size, 'JPEG', exif=exif.tobytes())
+
+
+@override_settings(
+    MEDIA_ROOT=TEMP_MEDIA_ROOT, THUMBNAIL_WORKERS=0, IMAGE_FORMAT='WEBP',
+    IMAGE_MAX_SIDE=1920, POST_THUMBNAILS=(),
+)
+class ImageProcessingTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(
+            email='author@yatube.ru', username='Author', password='pass'
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.client.force_login(self.author)
+
+    def test_form_upload_is_normalized(self):
+        """Большое фото уменьшается, теряет EXIF и становится WebP."""
+        self.client.post(reverse('posts:post_create'), {
+            'text': 'Пост с фото', 'image': photo_with_exif(),
+        })
+        post = Post.objects.get()
+        self.assertTrue(post.image.name.endswith('.webp'))
+        self.assertEqual((post.image_width, post.image_height), (1920, 1440))
+        with default_storage.open(post.image.name) as file:
+            with Image.open(file) as image:
+                self.assertEqual(image.format, 'WEBP')
+                self.assertEqual(image.size, (1920, 1440))
+                self.assertNotIn('exif', image.info)
+        # Оригинал удален, в хранилище осталась только новая картинка.
+        self.assertQuerysetEqual(
+            Blob.objects.all(), [post.image.name], transform=str
+        )
+
+    def test_api_upload_keeps_transparency(self):
+        """Картинка из API обрабатывается, прозрачность сохраняется."""
+        buffer = BytesIO()
+        Image.new('RGBA', (100, 50), (30, 90, 150, 0)).save(buffer, 'PNG')
+        client = APIClient()
+        client.force_authenticate(self.author)
+        response = client.post(reverse('api:posts-list'), {
+            'text': 'Пост из API',
+            'image': 'data:image/png;base64,'
+                     + base64.b64encode(buffer.getvalue()).decode(),
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertTrue(response.data['image'].endswith('.webp'))
+        post = Post.objects.get()
+        self.assertEqual((post.image_width, post.image_height), (100, 50))
+        with default_storage.open(post.image.name) as stored:
+            with Image.open(stored) as image:
+                self.assertEqual(image.mode, 'RGBA')
+
+    def test_normal_image_kept(self):
+        """Картинка, которая уже в нужном виде, не пересохраняется."""
+        file = upload('small.webp', (300, 200), 'WEBP')
+        post = Post.objects.create(author=self.author, text='Пост', image=file)
+        file.seek(0)
+        with default_storage.open(post.image.name) as stored:
+            self.assertEqual(stored.read(), file.read())
+        self.assertEqual((post.image_width, post.image_height), (300, 200))
+
+    def test_edit_without_new_image_skips_processing(self):
+        post = Post.objects.create(
+            author=self.author, text='Пост',
+            image=upload('a.png', (50, 50), 'PNG')
+        )
+        name = post.image.name
+        with self.settings(IMAGE_FORMAT='JPEG'):
+            post.text = 'Новый текст'
+            post.save()
+        post.refresh_from_db()
+        self.assertEqual(post.image.name, name)
+
+    def test_quality_tiers(self):
+        self.assertEqual(images.quality_for(640, 480), 85)
+        self.assertEqual(images.quality_for(1280, 1024), 80)
+        self.assertEqual(images.quality_for(4000, 3000), 75)
+
+    def test_command_processes_old_images(self):
+        name = default_storage.save(
+            'posts/old.jpg', photo_with_exif((2500, 1000))
+        )
+        Post.objects.bulk_create([
+            Post(author=self.author, text='Старый пост', image=name)
+        ])
+        call_command('normalize_images', workers=0, stdout=StringIO())
+        post = Post.objects.get()
+        self.assertTrue(post.image.name.endswith('.webp'))
+        self.assertEqual((post.image_width, post.image_height), (1920, 768))
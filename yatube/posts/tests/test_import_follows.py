@@ -0,0 +1,84 @@
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+
+from posts.models import Follow
+
+User = get_user_model()
+
+
+class ImportFollowsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.users = [
+            User.objects.create_user(
+                email=f'user{i}@yatube.ru', username=f'user{i}',
+                password='pass',
+            )
+            for i in range(4)
+        ]
+        cls.directory = tempfile.mkdtemp()
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.directory, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        cache.clear()
+
+    def write(self, name, content):
+        path = os.path.join(self.directory, name)
+        with open(path, 'w', encoding='utf-8') as file:
+            file.write(content)
+        return path
+
+    def pairs(self):
+        return set(Follow.objects.values_list(
+            'user__username', 'author__username'
+        ))
+
+    def test_csv_in_batches(self):
+        Follow.objects.create(user=self.users[0], author=self.users[1])
+        path = self.write('graph.csv', (
+            'user,author\n'
+            'user0,user1\n'
+            'user0,user2\n'
+            'user1,user0\n'
+            'user2,nobody\n'
+            'user3,user3\n'
+            'user1,user0\n'
+        ))
+        out = StringIO()
+        call_command('import_follows', path, '--batch', '2', stdout=out)
+        self.assertEqual(self.pairs(), {
+            ('user0', 'user1'), ('user0', 'user2'), ('user1', 'user0'),
+        })
+        self.assertIn('новых 2, уже были или повторы 2, пропущено 2',
+                      out.getvalue())
+        self.users[0].refresh_from_db()
+        self.assertEqual(self.users[0].following_count, 2)
+        self.assertEqual(self.users[0].follower_count, 1)
+
+    def test_jsonl(self):
+        path = self.write('graph.jsonl', (
+            '{"user": "user2", "author": "user3"}\n'
+            '\n'
+            'не json\n'
+            '{"user": "user3", "author": "user2"}\n'
+        ))
+        call_command('import_follows', path, stdout=StringIO())
+        self.assertEqual(self.pairs(), {('user2', 'user3'),
+                                        ('user3', 'user2')})
+
+    def test_unknown_format(self):
+        path = self.write('graph.txt', '')
+        with self.assertRaises(CommandError):
+            call_command('import_follows', path, stdout=StringIO())
@@ -0,0 +1,86 @@
+import gzip
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Comment, Group, Post
+
+User = get_user_model()
+
+
+@override_settings(FEED_PAGINATION='page', PAGE_CACHE_TIMEOUT=3600)
+class AnonymousPageCacheTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(
+            email='author@yatube.ru', username='Author', password='pass'
+        )
+        cls.group = Group.objects.create(title='Группа', slug='group')
+        cls.post = Post.objects.create(
+            author=cls.author, text='Пост', group=cls.group
+        )
+        cls.urls = (
+            reverse('posts:index'),
+            reverse('posts:group_list', args=[cls.group.slug]),
+            reverse('posts:profile', args=[cls.author.username]),
+            reverse('posts:post_detail', args=[cls.post.pk]),
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_repeated_page_served_without_queries(self):
+        for url in self.urls:
+            with self.subTest(url=url):
+                first = self.client.get(url)
+                with self.assertNumQueries(0):
+                    second = self.client.get(url)
+                self.assertIsNone(second.context)
+                self.assertEqual(second.content, first.content)
+
+    def test_gzip_bytes_for_clients_accepting_gzip(self):
+        url = reverse('posts:index')
+        first = self.client.get(url)
+        response = self.client.get(url, HTTP_ACCEPT_ENCODING='gzip, br')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response['Vary'])
+        self.assertEqual(gzip.decompress(response.content), first.content)
+
+    def test_query_string_cached_separately(self):
+        for i in range(12):
+            Post.objects.create(author=self.author, text=f'Пост номер {i}')
+        url = reverse('posts:index')
+        self.client.get(url)
+        response = self.client.get(url + '?page=2')
+        self.assertNotContains(response, 'Пост номер 11')
+
+    def test_model_events_invalidate_pages(self):
+        for url in self.urls:
+            self.client.get(url)
+        Comment.objects.create(post=self.post, author=self.author, text='Ок')
+        Post.objects.create(
+            author=self.author, text='Свежий пост', group=self.group
+        )
+        for url in self.urls[:3]:
+            with self.subTest(url=url):
+                self.assertContains(self.client.get(url), 'Свежий пост')
+        self.assertContains(self.client.get(self.urls[3]), 'Ок')
+
+    def test_logged_in_and_session_requests_not_cached(self):
+        url = reverse('posts:index')
+        self.client.get(url)
+        self.client.cookies[settings.SESSION_COOKIE_NAME] = 'unknown'
+        self.assertIsNotNone(self.client.get(url).context)
+        self.client.force_login(self.author)
+        self.client.get(url)
+        self.assertIsNotNone(self.client.get(url).context)
+
+    @override_settings(PAGE_CACHE_TIMEOUT=0)
+    def test_disabled(self):
+        url = reverse('posts:index')
+        self.client.get(url)
+        self.assertIsNotNone(self.client.get(url).context)
@@ -0,0 +1,117 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from core.paginator import KeysetPage, decode_cursor, encode_cursor
+from posts.models import Follow, Group, Post
+
+User = get_user_model()
+
+
+class KeysetPaginatorTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(
+            email='author@yatube.ru', username='Author', password='pass'
+        )
+        cls.reader = User.objects.create_user(
+            email='reader@yatube.ru', username='Reader', password='pass'
+        )
+        cls.group = Group.objects.create(
+            title='title_value',
+            slug='1',
+        )
+        Follow.objects.create(user=cls.reader, author=cls.user)
+        for i in range(25):
+            Post.objects.create(
+                author=cls.user,
+                text=f'Тестовый текст {i}',
+                group=cls.group,
+            )
+        cls.urls = (
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': cls.group.slug}),
+            reverse('posts:profile', kwargs={'username': cls.user.username}),
+            reverse('posts:follow_index'),
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.reader_client = Client()
+        self.reader_client.force_login(KeysetPaginatorTests.reader)
+
+    def walk(self, url):
+        """Проходит ленту по курсорам after и возвращает все записи."""
+        posts = []
+        response = self.reader_client.get(url, {'after': ''})
+        page_obj = response.context['page_obj']
+        posts.extend(page_obj)
+        while page_obj.has_next():
+            response = self.reader_client.get(
+                url, {'after': page_obj.next_cursor()}
+            )
+            page_obj = response.context['page_obj']
+            posts.extend(page_obj)
+        return posts
+
+    def test_cursor_round_trip(self):
+        """Курсор однозначно восстанавливает пару (created, id)."""
+        post = Post.objects.first()
+        self.assertEqual(
+            decode_cursor(encode_cursor(post)), (post.created, post.pk)
+        )
+        self.assertIsNone(decode_cursor('не курсор'))
+
+    def test_walk_returns_every_post_once(self):
+        """Лента по курсорам отдает все записи ровно один раз по порядку."""
+        expected = list(Post.objects.order_by('-created', '-pk'))
+        with self.settings(FEED_PAGINATION='keyset'):
+            for url in self.urls:
+                with self.subTest(url=url):
+                    self.assertEqual(self.walk(url), expected)
+
+    def test_previous_page_restores_order(self):
+        """Курсор before возвращает предыдущую страницу."""
+        url = reverse('posts:index')
+        with self.settings(FEED_PAGINATION='keyset'):
+            first = self.reader_client.get(url).context['page_obj']
+            second = self.reader_client.get(
+                url, {'after': first.next_cursor()}
+            ).context['page_obj']
+            back = self.reader_client.get(
+                url, {'before': second.previous_cursor()}
+            ).context['page_obj']
+        self.assertIsInstance(second, KeysetPage)
+        self.assertEqual(list(back), list(first))
+        self.assertFalse(first.has_previous())
+        self.assertTrue(second.has_previous())
+
+    def test_deep_page_costs_as_first(self):
+        """Дальняя страница выбирается тем же запросом, что и первая."""
+        url = reverse('posts:group_list', kwargs={'slug': self.group.slug})
+        with self.settings(FEED_PAGINATION='keyset'):
+            with CaptureQueriesContext(connection) as first:
+                page_obj = self.reader_client.get(url).context['page_obj']
+            page_obj = self.reader_client.get(
+                url, {'after': page_obj.next_cursor()}
+            ).context['page_obj']
+            with CaptureQueriesContext(connection) as deep:
+                self.reader_client.get(url, {'after': page_obj.next_cursor()})
+        first = [query['sql'] for query in first.captured_queries
+                 if 'FROM "posts_post"' in query['sql']]
+        deep = [query['sql'] for query in deep.captured_queries
+                if 'FROM "posts_post"' in query['sql']]
+        self.assertEqual(len(first), len(deep))
+        for sql in deep:
+            self.assertNotIn('COUNT(', sql)
+            self.assertNotIn('OFFSET', sql)
+
+    def test_page_mode_is_default(self):
+        """Без курсора и настройки работает обычный номер страницы."""
+        response = self.reader_client.get(reverse('posts:index'), {'page': 3})
+        self.assertEqual(len(response.context['page_obj']), 5)
+        self.assertEqual(response.context['page_obj'].number, 3)
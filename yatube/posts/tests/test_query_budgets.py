@@ -0,0 +1,91 @@
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from core import queries
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+@override_settings(QUERY_BUDGET_ENABLED=True, QUERY_BUDGET_STRICT=True,
+                   TEMPLATE_LAZY_LOAD_STRICT=True)
+class QueryBudgetTests(TestCase):
+    """Страницы укладываются в бюджеты запросов из QUERY_BUDGETS."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(
+            email='author@yatube.ru', username='Author', password='pass'
+        )
+        cls.reader = User.objects.create_user(
+            email='reader@yatube.ru', username='Reader', password='pass'
+        )
+        cls.group = Group.objects.create(title='Группа', slug='group')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        Follow.objects.create(user=cls.author, author=cls.reader)
+        for i in range(15):
+            cls.post = Post.objects.create(
+                author=cls.author, group=cls.group, text=f'Пост {i}'
+            )
+            Comment.objects.create(
+                post=cls.post, author=cls.reader, text=f'Комментарий {i}'
+            )
+
+    def setUp(self):
+        cache.clear()
+        queries.reset_stats()
+        self.author_client = Client()
+        self.author_client.force_login(QueryBudgetTests.author)
+
+    def test_pages_fit_budgets(self):
+        """Страницы не превышают бюджет и не грузят данные в циклах."""
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': self.group.slug}),
+            reverse('posts:profile',
+                    kwargs={'username': self.author.username}),
+            reverse('posts:post_detail', kwargs={'post_id': self.post.pk}),
+            reverse('posts:follow_index'),
+            reverse('posts:post_create'),
+            reverse('posts:post_edit', kwargs={'post_id': self.post.pk}),
+            reverse('users:account'),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                recorder = queries.QueryRecorder()
+                with connection.execute_wrapper(recorder):
+                    response = self.author_client.get(url)
+                self.assertEqual(response.status_code, 200)
+                self.assertFalse(recorder.duplicates())
+        for view_name in queries.get_stats():
+            with self.subTest(view_name=view_name):
+                self.assertIn(view_name, settings.QUERY_BUDGETS)
+
+    def test_fingerprints_only_over_budget(self):
+        """В пределах бюджета SQL не разбирается на отпечатки."""
+        with mock.patch('core.queries.fingerprint',
+                        side_effect=AssertionError):
+            self.author_client.get(reverse('posts:index'))
+        stats = queries.get_stats()['posts:index']
+        self.assertEqual(stats.requests, 1)
+        self.assertFalse(stats.duplicates)
+
+    def test_disabled_without_setting(self):
+        """Без DEBUG и QUERY_BUDGET_ENABLED запросы не учитываются."""
+        with self.settings(QUERY_BUDGET_ENABLED=False):
+            Client().get(reverse('posts:index'))
+        self.assertEqual(queries.get_stats(), {})
+
+    def test_over_budget_raises(self):
+        """Превышение бюджета в строгом режиме роняет запрос."""
+        budgets = {**settings.QUERY_BUDGETS, 'posts:index': 1}
+        with self.settings(QUERY_BUDGETS=budgets):
+            with self.assertRaises(queries.QueryBudgetExceeded):
+                self.author_client.get(reverse('posts:index'))
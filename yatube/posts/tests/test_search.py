@@ -0,0 +1,106 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts import search
+from posts.models import Post
+
+User = get_user_model()
+
+
+class SearchTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(
+            email='author@yatube.ru', username='Author', password='pass'
+        )
+
+    def create(self, text):
+        return Post.objects.create(author=self.author, text=text)
+
+    def found(self, query):
+        return list(search.search_posts(query))
+
+    def test_stem(self):
+        """Окончания русских слов отрезаются, короткие слова не трогаются."""
+        self.assertEqual(search.stem('котами'), 'кот')
+        self.assertEqual(search.stem('новости'), 'нов')
+        self.assertEqual(search.stem('кот'), 'кот')
+        self.assertEqual(search.stem('django'), 'django')
+
+    def test_match_expression_quotes_terms(self):
+        """Операторы FTS5 во вводе не попадают в выражение MATCH."""
+        self.assertEqual(
+            search.match_expression('Кошки OR "собаки*"'),
+            '"кошк"* "or"* "собак"*'
+        )
+        self.assertEqual(search.match_expression(' ,.! '), '')
+
+    def test_word_forms(self):
+        """Запрос находит другие формы слова."""
+        post = self.create('Мы гуляли с котами во дворе')
+        self.create('Собака на даче')
+        self.assertEqual(self.found('кот'), [post])
+        self.assertEqual(self.found('Котов'), [post])
+
+    def test_all_words_required(self):
+        both = self.create('Рыжий кот спит')
+        self.create('Рыжая собака')
+        self.assertEqual(self.found('рыжий кот'), [both])
+
+    def test_bm25_ranking(self):
+        """Пост, где слово встречается чаще, идет выше."""
+        rare = self.create('Про погоду и немного про чай')
+        often = self.create('Чай, чай и снова чай')
+        self.assertEqual(self.found('чай'), [often, rare])
+
+    def test_index_follows_updates(self):
+        """Триггеры обновляют индекс при изменении и удалении."""
+        post = self.create('Старый текст')
+        Post.objects.filter(pk=post.pk).update(text='Новый текст')
+        self.assertEqual(self.found('старый'), [])
+        self.assertEqual(self.found('новый'), [post])
+        post.delete()
+        self.assertEqual(self.found('новый'), [])
+
+    def test_bulk_create_is_indexed(self):
+        Post.objects.bulk_create(
+            Post(author=self.author, text=f'Пакетный пост {i}')
+            for i in range(3)
+        )
+        self.assertEqual(len(self.found('пакетный')), 3)
+
+    def test_rebuild_command(self):
+        """Команда восстанавливает индекс, потерянный без триггеров."""
+        post = self.create('Потерянный пост')
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"INSERT INTO {search.TABLE}({search.TABLE}) "
+                "VALUES ('delete-all')"
+            )
+        self.assertEqual(self.found('потерянный'), [])
+        out = StringIO()
+        call_command('rebuild_search_index', stdout=out)
+        self.assertEqual(self.found('потерянный'), [post])
+
+    def test_search_page(self):
+        post = self.create('Пост про шахматы')
+        self.create('Пост про футбол')
+        response = Client().get(
+            reverse('posts:post_search'), {'q': 'шахматы'}
+        )
+        self.assertEqual(list(response.context['page_obj']), [post])
+
+    def test_search_page_keeps_query_in_pages(self):
+        for i in range(11):
+            self.create(f'Шахматная задача {i}')
+        response = Client().get(
+            reverse('posts:post_search'), {'q': 'шахматы'}
+        )
+        self.assertEqual(response.context['page_obj'].paginator.count, 11)
+        self.assertContains(response, '?q=')
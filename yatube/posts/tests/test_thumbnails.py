@@ -0,0 +1,104 @@
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from sorl.thumbnail import default, get_thumbnail
+from sorl.thumbnail.images import ImageFile
+
+from posts import thumbnails
+from posts.models import Post
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+User = get_user_model()
+
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+@override_settings(
+    MEDIA_ROOT=TEMP_MEDIA_ROOT,
+    THUMBNAIL_WORKERS=0,
+    THUMBNAIL_KVSTORE_PATH=os.path.join(TEMP_MEDIA_ROOT, 'kvstore.sqlite3'),
+)
+class ThumbnailsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(
+            email='author@yatube.ru', username='Author', password='pass'
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+
+    def thumbnails_of(self, image):
+        key = ImageFile(image).key
+        return default.kvstore._get(key, identity='thumbnails') or []
+
+    def test_thumbnails_ready_after_save(self):
+        """Все размеры из POST_THUMBNAILS готовы сразу после сохранения."""
+        post = Post.objects.create(
+            author=self.author, text='Пост с картинкой',
+            image=SimpleUploadedFile('small.gif', SMALL_GIF, 'image/gif')
+        )
+        self.assertEqual(
+            len(self.thumbnails_of(post.image)),
+            len(settings.POST_THUMBNAILS)
+        )
+
+    def test_backfill_command(self):
+        """Команда готовит миниатюры для картинок, уже лежащих на диске."""
+        with self.settings(POST_THUMBNAILS=()):
+            post = Post.objects.create(
+                author=self.author, text='Старый пост',
+                image=SimpleUploadedFile('old.gif', SMALL_GIF, 'image/gif')
+            )
+        self.assertEqual(self.thumbnails_of(post.image), [])
+        out = StringIO()
+        call_command('pregenerate_thumbnails', workers=0, stdout=out)
+        self.assertIn('ошибок: 0', out.getvalue())
+        self.assertEqual(len(self.thumbnails_of(post.image)), 1)
+
+    def test_feed_reads_thumbnails_from_memory(self):
+        """Миниатюры ленты берутся из LRU после одной предзагрузки."""
+        for i in range(3):
+            Post.objects.create(
+                author=self.author, text=f'Пост {i}',
+                image=SimpleUploadedFile(f'{i}.gif', SMALL_GIF, 'image/gif')
+            )
+        default.kvstore.reset()
+        self.client.get(reverse('posts:index'))
+        stats = default.kvstore.stats()
+        self.assertEqual(stats['misses'], 0)
+        self.assertEqual(stats['disk_hits'], 0)
+        self.assertEqual(stats['hits'], 3)
+
+    def test_thumbnail_name_matches_backend(self):
+        post = Post.objects.create(
+            author=self.author, text='Пост',
+            image=SimpleUploadedFile('name.gif', SMALL_GIF, 'image/gif')
+        )
+        for geometry, options in settings.POST_THUMBNAILS:
+            self.assertEqual(
+                thumbnails.thumbnail_name(post.image, geometry, options),
+                get_thumbnail(post.image, geometry, **options).name
+            )
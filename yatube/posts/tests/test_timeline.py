@@ -0,0 +1,209 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts import timeline
+from posts.bulk import create_follows
+from posts.models import Follow, Post, TimelineEntry
+
+User = get_user_model()
+
+
+@override_settings(FOLLOW_TIMELINE=True)
+class TimelineTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(
+            email='author@yatube.ru', username='Author', password='pass'
+        )
+        cls.other = User.objects.create_user(
+            email='other@yatube.ru', username='Other', password='pass'
+        )
+        cls.reader = User.objects.create_user(
+            email='reader@yatube.ru', username='Reader', password='pass'
+        )
+        for i in range(3):
+            Post.objects.create(author=cls.author, text=f'Пост {i}')
+        Post.objects.create(author=cls.other, text='Чужой пост')
+
+    def setUp(self):
+        cache.clear()
+        self.reader_client = Client()
+        self.reader_client.force_login(TimelineTests.reader)
+
+    def follow(self, author):
+        self.reader_client.get(
+            reverse('posts:profile_follow', kwargs={'username': author})
+        )
+
+    def test_follow_backfills_timeline(self):
+        """Подписка переносит в ленту уже опубликованные посты автора."""
+        self.follow(self.author.username)
+        self.assertEqual(
+            TimelineEntry.objects.filter(user=self.reader).count(), 3
+        )
+
+    def test_new_post_is_pushed_to_followers(self):
+        """Новый пост попадает в ленты подписчиков."""
+        self.follow(self.author.username)
+        post = Post.objects.create(author=self.author, text='Новый пост')
+        self.assertTrue(
+            TimelineEntry.objects.filter(user=self.reader, post=post).exists()
+        )
+        self.assertFalse(
+            TimelineEntry.objects.filter(user=self.other, post=post).exists()
+        )
+
+    def test_unfollow_prunes_timeline(self):
+        """Отписка убирает посты автора из ленты."""
+        self.follow(self.author.username)
+        self.follow(self.other.username)
+        self.reader_client.get(reverse(
+            'posts:profile_unfollow',
+            kwargs={'username': self.author.username}
+        ))
+        self.assertEqual(
+            list(TimelineEntry.objects.filter(user=self.reader)
+                 .values_list('author', flat=True)),
+            [self.other.pk]
+        )
+
+    def test_follow_index_reads_timeline(self):
+        """Лента подписок совпадает с выборкой через соединение."""
+        self.follow(self.author.username)
+        self.follow(self.other.username)
+        expected = list(
+            Post.objects.filter(author__following__user=self.reader)
+            .order_by('-created', '-pk')
+        )
+        with CaptureQueriesContext(connection) as queries:
+            response = self.reader_client.get(reverse('posts:follow_index'))
+        self.assertEqual(list(response.context['page_obj']), expected)
+        feed = [query['sql'] for query in queries.captured_queries
+                if 'FROM "posts_post"' in query['sql']
+                and 'LIMIT' in query['sql']]
+        self.assertIn('posts_timelineentry', feed[0])
+        self.assertNotIn('posts_follow', feed[0])
+
+    def test_follow_index_keyset_mode(self):
+        """Лента подписок листается курсором по записям ленты."""
+        self.follow(self.author.username)
+        url = reverse('posts:follow_index')
+        with self.settings(FEED_PAGINATION='keyset'):
+            response = self.reader_client.get(url)
+        self.assertEqual(len(response.context['page_obj']), 3)
+
+    def test_rebuild_command(self):
+        """Команда rebuild_timeline восстанавливает ленты по подпискам."""
+        with self.settings(FOLLOW_TIMELINE=False):
+            Follow.objects.create(user=self.reader, author=self.author)
+        self.assertFalse(TimelineEntry.objects.exists())
+        call_command('rebuild_timeline', stdout=StringIO())
+        self.assertEqual(TimelineEntry.objects.count(), 3)
+
+
+@override_settings(FOLLOW_TIMELINE=True, FOLLOW_TIMELINE_PUSH_LIMIT=1)
+class HybridTimelineTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.star = User.objects.create_user(
+            email='star@yatube.ru', username='Star', password='pass'
+        )
+        cls.author = User.objects.create_user(
+            email='author@yatube.ru', username='Author', password='pass'
+        )
+        cls.reader = User.objects.create_user(
+            email='reader@yatube.ru', username='Reader', password='pass'
+        )
+        cls.fan = User.objects.create_user(
+            email='fan@yatube.ru', username='Fan', password='pass'
+        )
+        Follow.objects.create(user=cls.fan, author=cls.star)
+        Follow.objects.create(user=cls.reader, author=cls.star)
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        for i in range(12):
+            Post.objects.create(author=cls.star, text=f'Звезда {i}')
+            Post.objects.create(author=cls.author, text=f'Автор {i}')
+
+    def setUp(self):
+        cache.clear()
+        self.reader_client = Client()
+        self.reader_client.force_login(HybridTimelineTests.reader)
+
+    def test_popular_author_is_not_pushed(self):
+        """Посты автора выше порога не рассылаются по лентам."""
+        self.assertFalse(
+            TimelineEntry.objects.filter(author=self.star).exists()
+        )
+        self.assertEqual(
+            TimelineEntry.objects.filter(author=self.author).count(), 12
+        )
+
+    def test_hybrid_feed_merges_sources(self):
+        """Гибридная лента совпадает с выборкой через соединение."""
+        expected = list(
+            Post.objects.filter(author__following__user=self.reader)
+            .order_by('-created', '-pk')
+        )
+        url = reverse('posts:follow_index')
+        posts = []
+        page_obj = self.reader_client.get(url).context['page_obj']
+        posts.extend(page_obj)
+        while page_obj.has_next():
+            page_obj = self.reader_client.get(
+                url, {'after': page_obj.next_cursor()}
+            ).context['page_obj']
+            posts.extend(page_obj)
+        self.assertEqual(posts, expected)
+        back = self.reader_client.get(
+            url, {'before': page_obj.previous_cursor()}
+        ).context['page_obj']
+        self.assertEqual(list(back), expected[10:20])
+
+    def test_hybrid_page_loads_posts_once(self):
+        """Источники сливаются по ключам, посты страницы - одним запросом."""
+        with CaptureQueriesContext(connection) as queries:
+            self.follow_page()
+        loads = [query for query in queries.captured_queries
+                 if '"posts_post"."text"' in query['sql']]
+        self.assertEqual(len(loads), 1)
+
+    def test_push_checks_limit_in_followers_query(self):
+        """Порог проверяется в том же запросе, что выбирает подписчиков."""
+        post = Post.objects.filter(author=self.author).first()
+        TimelineEntry.objects.filter(post=post).delete()
+        with CaptureQueriesContext(connection) as queries:
+            timeline.push_post(post)
+        # Подписчики и вставка записей.
+        self.assertEqual(len(queries), 2)
+        self.assertTrue(
+            TimelineEntry.objects.filter(post=post, user=self.reader).exists()
+        )
+
+    def follow_page(self):
+        response = self.reader_client.get(reverse('posts:follow_index'))
+        return list(response.context['page_obj'])
+
+    def test_author_crossing_limit_keeps_posts_in_feeds(self):
+        """Отписка и подписка у порога не теряют старые посты автора."""
+        expected = self.follow_page()
+        Follow.objects.filter(user=self.fan, author=self.star).delete()
+        self.assertEqual(
+            TimelineEntry.objects.filter(author=self.star).count(), 12
+        )
+        cache.clear()
+        self.assertEqual(self.follow_page(), expected)
+        create_follows([(self.fan.pk, self.star.pk)])
+        self.assertFalse(
+            TimelineEntry.objects.filter(author=self.star).exists()
+        )
+        cache.clear()
+        self.assertEqual(self.follow_page(), expected)
@@ -108,8 +108,9 @@ class PostsPagesTests(TestCase):
         first_object = (response.context['page_obj'][0])
         self.assertEqual(first_object.text, posts_text)
         post_cashed.delete()
+        # Удаление поста сбрасывает фрагмент ленты, не дожидаясь TTL.
         response_two = self.author_client.get(reverse('posts:index'))
-        self.assertContains(response_two, posts_text)
+        self.assertNotContains(response_two, posts_text)
         cache.clear()
         response_three = self.author_client.get(reverse('posts:index'))
         object_after_clear_cash = (response_three.context['page_obj'][0]
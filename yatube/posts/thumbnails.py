@@ -0,0 +1,130 @@
+"""
+Фоновая подготовка миниатюр картинок постов.
+
+Шаблоны вызывают {% thumbnail %} с размерами из POST_THUMBNAILS. Если
+миниатюра уже есть в хранилище sorl-thumbnail, тег только читает ее
+адрес, поэтому все размеры готовятся заранее: в пуле процессов сразу
+после обработки загруженной картинки (posts.images), а для старых
+картинок - командой pregenerate_thumbnails. Изменять размер картинки
+в потоке запроса больше не нужно.
+
+THUMBNAIL_WORKERS = 0 отключает пул, картинки обрабатываются на месте
+(для тестов и команд в однопроцессном окружении).
+"""
+import logging
+from concurrent.futures import ProcessPoolExecutor
+
+from django import db
+from django.conf import settings
+from django.core.files.storage import default_storage
+from sorl.thumbnail import default, get_thumbnail
+from sorl.thumbnail.conf import defaults as default_settings
+from sorl.thumbnail.conf import settings as thumbnail_settings
+from sorl.thumbnail.images import ImageFile
+
+from .models import Post
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+
+
+def init_worker():
+    # Соединения с базой унаследованы от родителя при fork,
+    # дочерний процесс открывает свои.
+    db.connections.close_all()
+
+
+def get_executor(workers=None):
+    """Общий пул процессов, создается при первой задаче."""
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(
+            max_workers=workers or settings.THUMBNAIL_WORKERS,
+            initializer=init_worker,
+        )
+    return _executor
+
+
+def source(name):
+    """
+    Картинка name в хранилище загрузок.
+
+    sorl-thumbnail по умолчанию ищет строки в THUMBNAIL_STORAGE, а от
+    хранилища зависит ключ миниатюры. Тег в шаблоне получает поле
+    модели, поэтому и здесь нужно хранилище полей.
+    """
+    return ImageFile(name, default_storage)
+
+
+def generate(name):
+    """
+    Готовит все миниатюры из POST_THUMBNAILS для картинки name.
+
+    Выполняется в рабочем процессе, ошибки пишутся в лог: битая
+    картинка не должна останавливать остальные.
+    """
+    try:
+        for geometry, options in settings.POST_THUMBNAILS:
+            get_thumbnail(source(name), geometry, **options)
+    except Exception:
+        logger.exception('Не удалось подготовить миниатюры %s', name)
+        return False
+    return True
+
+
+def thumbnail_name(file_, geometry, options):
+    """
+    Имя файла миниатюры, которое даст ThumbnailBackend.get_thumbnail.
+
+    Повторяет подстановку настроек по умолчанию из sorl-thumbnail,
+    чтобы найти запись миниатюры, не создавая ее.
+    """
+    backend = default.backend
+    source = ImageFile(file_)
+    options = dict(options)
+    if thumbnail_settings.THUMBNAIL_PRESERVE_FORMAT:
+        options.setdefault('format', backend._get_format(source))
+    for key, value in backend.default_options.items():
+        options.setdefault(key, value)
+    for key, attr in backend.extra_options:
+        value = getattr(thumbnail_settings, attr)
+        if value != getattr(default_settings, attr):
+            options.setdefault(key, value)
+    return backend._get_thumbnail_filename(source, geometry, options)
+
+
+def prefetch(posts):
+    """Загружает записи миниатюр картинок постов одним обращением."""
+    kvstore_prefetch = getattr(default.kvstore, 'prefetch', None)
+    if kvstore_prefetch is None:
+        return
+    kvstore_prefetch(
+        ImageFile(thumbnail_name(post.image, geometry, options),
+                  default.storage)
+        for post in posts if post.image
+        for geometry, options in settings.POST_THUMBNAILS
+    )
+
+
+def post_images():
+    """
+    Имена всех картинок постов.
+
+    Берутся из базы, а не из папки posts/: файлы в хранилище по хешу
+    лежат в общей папке вместе с аватарами.
+    """
+    return Post.objects.exclude(image='').values_list(
+        'image', flat=True
+    ).distinct()
+
+
+def backfill(names, workers):
+    """Готовит миниатюры для картинок names, возвращает (готово, ошибок)."""
+    if workers:
+        with ProcessPoolExecutor(workers, initializer=init_worker) as pool:
+            results = list(pool.map(generate, names, chunksize=16))
+    else:
+        results = [generate(name) for name in names]
+    done = sum(results)
+    return done, len(results) - done
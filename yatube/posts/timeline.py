@@ -0,0 +1,215 @@
+"""
+Материализованная лента подписок (fan-out on write).
+
+Новый пост сразу раскладывается по лентам подписчиков, поэтому
+страница подписок читается одним диапазоном по индексу (user, created)
+вместо соединения Post, CustomUser и Follow на каждый запрос.
+Включается настройкой FOLLOW_TIMELINE.
+
+Посты авторов, у которых подписчиков больше FOLLOW_TIMELINE_PUSH_LIMIT,
+не раскладываются по лентам: такая рассылка слишком дорога на запись.
+Они подмешиваются при чтении слиянием последних постов каждого автора
+(гибридная лента). Автор, перешедший порог после подписки или отписки,
+переводится между способами сразу (sync_authors). При смене самого
+порога или после reconcile_counters ленты пересобирает rebuild_timeline.
+"""
+import heapq
+
+from django.conf import settings
+from django.db.models import F
+
+from core.paginator import (CURSOR_AFTER, CURSOR_BEFORE, KeysetPaginator,
+                            keyset_queryset, paginate)
+
+from .models import CustomUser, Follow, Post, TimelineEntry
+
+# Сколько записей ленты вставлять за один запрос.
+BATCH_SIZE = 500
+
+# Поля ключа для постраничного вывода ленты по курсору. Оба берутся из
+# записи ленты, чтобы сортировку обслуживал индекс (user, created, post).
+KEYS = ('feed_created', 'feed_post')
+
+
+def is_enabled():
+    return settings.FOLLOW_TIMELINE
+
+
+def _pushed(author):
+    """
+    Условие на автора по пути author, что его посты рассылаются.
+
+    Порог проверяется соединением в том же запросе, что выбирает
+    подписчиков или посты автора: отдельный запрос на каждый пост
+    и подписку не нужен.
+    """
+    limit = settings.FOLLOW_TIMELINE_PUSH_LIMIT
+    if limit is None:
+        return {}
+    return {f'{author}__follower_count__lte': limit}
+
+
+def pulled_authors(user):
+    """Авторы из подписок пользователя, которые читаются при запросе."""
+    limit = settings.FOLLOW_TIMELINE_PUSH_LIMIT
+    if limit is None:
+        return []
+    return list(
+        CustomUser.objects.filter(
+            following__user=user, follower_count__gt=limit
+        ).values_list('pk', flat=True)
+    )
+
+
+def _bulk_insert(entries):
+    TimelineEntry.objects.bulk_create(
+        entries, batch_size=BATCH_SIZE, ignore_conflicts=True
+    )
+
+
+def push_post(post):
+    """Добавляет пост в ленты всех подписчиков автора."""
+    followers = Follow.objects.filter(
+        author_id=post.author_id, **_pushed('author')
+    ).values_list('user_id', flat=True)
+    _bulk_insert(
+        TimelineEntry(
+            user_id=user_id,
+            post_id=post.pk,
+            author_id=post.author_id,
+            created=post.created,
+        )
+        for user_id in followers.iterator()
+    )
+
+
+def backfill(user_id, author_id):
+    """Заполняет ленту читателя постами автора, на которого он подписался."""
+    posts = Post.objects.filter(
+        author_id=author_id, **_pushed('author')
+    ).values_list('pk', 'created')
+    _bulk_insert(
+        TimelineEntry(
+            user_id=user_id,
+            post_id=post_id,
+            author_id=author_id,
+            created=created,
+        )
+        for post_id, created in posts.iterator()
+    )
+
+
+def prune(user_id, author_id):
+    """Убирает из ленты читателя посты автора, от которого он отписался."""
+    TimelineEntry.objects.filter(
+        user_id=user_id, author_id=author_id
+    ).delete()
+
+
+def sync_authors(deltas):
+    """
+    Переводит авторов, перешедших порог, между рассылкой и чтением.
+
+    deltas - {id автора: изменение follower_count}, счетчики уже
+    сдвинуты. Ставший популярным автор убирается из материализованных
+    лент: его посты теперь подмешиваются при чтении. Автор, опустившийся
+    до порога, раскладывается по лентам оставшихся подписчиков целиком,
+    иначе его старые посты пропали бы из лент.
+    """
+    limit = settings.FOLLOW_TIMELINE_PUSH_LIMIT
+    if limit is None or not deltas:
+        return
+    authors = sorted(deltas)
+    for start in range(0, len(authors), BATCH_SIZE):
+        counts = CustomUser.objects.filter(
+            pk__in=authors[start:start + BATCH_SIZE]
+        ).values_list('pk', 'follower_count')
+        for author_id, count in counts:
+            pulled = count > limit
+            if pulled == (count - deltas[author_id] > limit):
+                continue
+            if pulled:
+                TimelineEntry.objects.filter(author_id=author_id).delete()
+                continue
+            followers = Follow.objects.filter(
+                author_id=author_id
+            ).values_list('user_id', flat=True)
+            for user_id in followers.iterator():
+                backfill(user_id, author_id)
+
+
+def rebuild(user_id=None):
+    """Пересобирает ленты по текущим подпискам."""
+    entries = TimelineEntry.objects.all()
+    follows = Follow.objects.all()
+    if user_id is not None:
+        entries = entries.filter(user_id=user_id)
+        follows = follows.filter(user_id=user_id)
+    entries.delete()
+    for user_id, author_id in follows.values_list('user_id', 'author_id'):
+        backfill(user_id, author_id)
+
+
+def get_posts(user):
+    """Посты ленты подписок пользователя в порядке публикации."""
+    return Post.objects.feed().filter(
+        timeline_entries__user=user
+    ).annotate(
+        feed_created=F('timeline_entries__created'),
+        feed_post=F('timeline_entries__post'),
+    ).order_by('-feed_created', '-feed_post')
+
+
+class HybridPaginator(KeysetPaginator):
+    """
+    Гибридная лента подписок.
+
+    Записи материализованной ленты сливаются со списками последних постов
+    популярных авторов через heapq.merge. Каждый источник - один запрос
+    пар (created, id) по индексу с тем же курсором, сами посты страницы
+    загружаются потом одним запросом.
+    """
+
+    def __init__(self, user, per_page):
+        super().__init__(get_posts(user), per_page, KEYS)
+        self.user = user
+        self.pulled = pulled_authors(user)
+
+    def fetch(self, after, before, limit):
+        entries = keyset_queryset(
+            TimelineEntry.objects.filter(user=self.user),
+            ('created', 'post_id'), after, before
+        ).values_list('created', 'post_id')
+        sources = [list(entries[:limit])]
+        for author_id in self.pulled:
+            posts = keyset_queryset(
+                Post.objects.filter(author_id=author_id),
+                ('created', 'pk'), after, before
+            ).values_list('created', 'pk')
+            sources.append(list(posts[:limit]))
+        rows = []
+        seen = set()
+        for row in heapq.merge(*sources, reverse=before is None):
+            if row[1] in seen:
+                continue
+            seen.add(row[1])
+            rows.append(row)
+            if len(rows) == limit:
+                break
+        return rows
+
+    def load(self, rows):
+        posts = Post.objects.feed().in_bulk([pk for _, pk in rows])
+        # Пост мог быть удален между запросами.
+        return [posts[pk] for _, pk in rows if pk in posts]
+
+
+def get_page(request, per_page):
+    """Страница ленты подписок текущего пользователя."""
+    if settings.FOLLOW_TIMELINE_PUSH_LIMIT is None:
+        return paginate(request, get_posts(request.user), per_page, KEYS)
+    paginator = HybridPaginator(request.user, per_page)
+    return paginator.get_keyset_page(
+        after=request.GET.get(CURSOR_AFTER),
+        before=request.GET.get(CURSOR_BEFORE),
+    )
@@ -1,50 +1,92 @@
 from django.contrib.auth.decorators import login_required
 from django.core.paginator import Paginator
 from django.shortcuts import get_object_or_404, redirect, render
+from django.utils.http import urlencode
+from django.views.decorators.http import condition
 
-from .forms import CommentForm, PostForm
+from core.paginator import paginate
+
+from . import feed_cache, page_cache, search, timeline
+from .forms import CommentForm, PostForm, SearchForm
 from .models import Follow, Group, Post, CustomUser
 
 # Количество постов на странице
 POSTS_ON_PAGE = 10
 
 
+# ETag страниц считается по поколениям лент (feed_cache) до выборки
+# постов, поэтому ответ 304 обходится без запросов и рендера.
+def index_etag(request):
+    return feed_cache.etag(request, 'index')
+
+
+def group_etag(request, slug):
+    group_id = feed_cache.lookup(Group, 'slug', slug)
+    if group_id is not None:
+        return feed_cache.etag(request, f'group:{group_id}')
+    return None
+
+
+def profile_etag(request, username):
+    author_id = feed_cache.lookup(CustomUser, 'username', username)
+    if author_id is None:
+        return None
+    feeds = [f'profile:{author_id}']
+    user_id = feed_cache.viewer(request)
+    # Кнопка подписки зависит от подписок зрителя.
+    if user_id:
+        feeds.append(f'follow:{user_id}')
+    return feed_cache.etag(request, *feeds)
+
+
+def post_etag(request, post_id):
+    # Число постов автора на странице меняется с его новыми постами.
+    author_id = feed_cache.lookup(Post, 'pk', post_id, 'author_id')
+    if author_id is not None:
+        return feed_cache.etag(
+            request, f'post:{post_id}', f'profile:{author_id}'
+        )
+    return None
+
+
+@condition(etag_func=index_etag)
+@page_cache.anonymous(index_etag)
 def index(request):
     template = 'posts/index.html'
-    posts = Post.objects.all()
-    paginator = Paginator(posts, POSTS_ON_PAGE)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    posts = Post.objects.feed()
+    page_obj = paginate(request, posts, POSTS_ON_PAGE)
     context = {
         'page_obj': page_obj,
+        **feed_cache.context(request, page_obj, 'index'),
     }
     return render(request, template, context)
 
 
+@condition(etag_func=group_etag)
+@page_cache.anonymous(group_etag)
 def group_posts(request, slug):
     group = get_object_or_404(Group, slug=slug)
     template = 'posts/group_list.html'
-    posts = group.posts.all()
-    paginator = Paginator(posts, POSTS_ON_PAGE)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    posts = group.posts.feed()
+    page_obj = paginate(request, posts, POSTS_ON_PAGE)
     context = {
         'group': group,
         'page_obj': page_obj,
+        **feed_cache.context(request, page_obj, f'group:{group.pk}'),
     }
     return render(request, template, context)
 
 
+@condition(etag_func=profile_etag)
+@page_cache.anonymous(profile_etag)
 def profile(request, username):
     author = get_object_or_404(CustomUser, username=username)
     template = 'posts/profile.html'
-    posts = author.posts.all()
+    posts = author.posts.feed()
     following = (request.user.is_authenticated
                  and (author.following.filter(user=request.user)).exists()
                  )
-    paginator = Paginator(posts, POSTS_ON_PAGE)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    page_obj = paginate(request, posts, POSTS_ON_PAGE)
     context = {
         'following': following,
         'author': author,
@@ -53,9 +95,30 @@ def profile(request, username):
     return render(request, template, context)
 
 
+def post_search(request):
+    form = SearchForm(request.GET or None)
+    query = form.cleaned_data['q'] if form.is_valid() else ''
+    # Результаты идут по релевантности, поэтому страницы по номерам.
+    posts = search.search_posts(query, Post.objects.feed())
+    page_obj = Paginator(posts, POSTS_ON_PAGE).get_page(
+        request.GET.get('page')
+    )
+    context = {
+        'form': form,
+        'query': query,
+        'page_obj': page_obj,
+        'page_query': urlencode({'q': query}) + '&' if query else '',
+    }
+    return render(request, 'posts/search.html', context)
+
+
+@condition(etag_func=post_etag)
+@page_cache.anonymous(post_etag)
 def post_detail(request, post_id):
-    post = get_object_or_404(Post, pk=post_id)
-    comments = post.comments.all()
+    post = get_object_or_404(
+        Post.objects.select_related('author', 'group'), pk=post_id
+    )
+    comments = post.comments.select_related('author')
     template = 'posts/post_detail.html'
     context = {
         'post': post,
@@ -82,7 +145,9 @@ def post_create(request):
 
 @login_required
 def post_edit(request, post_id):
-    post = get_object_or_404(Post, pk=post_id)
+    post = get_object_or_404(
+        Post.objects.select_related('author'), pk=post_id
+    )
     if request.user != post.author:
         return redirect('posts:post_detail', post.pk)
     form = PostForm(
@@ -113,14 +178,20 @@ def add_comment(request, post_id):
 
 @login_required
 def follow_index(request):
-    posts = Post.objects.filter(author__following__user=request.user)
     authors = CustomUser.objects.filter(following__user=request.user)
-    paginator = Paginator(posts, POSTS_ON_PAGE)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    if timeline.is_enabled():
+        page_obj = timeline.get_page(request, POSTS_ON_PAGE)
+    else:
+        posts = Post.objects.feed().filter(
+            author__following__user=request.user
+        )
+        page_obj = paginate(request, posts, POSTS_ON_PAGE)
+    following = f'follow:{request.user.pk}'
     context = {
         'page_obj': page_obj,
         'authors': authors,
+        'following_version': feed_cache.version(following),
+        **feed_cache.context(request, page_obj, 'index', following),
     }
     return render(request, 'posts/follow.html', context)
 
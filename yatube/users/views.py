@@ -34,8 +34,8 @@ class SignUp(FormView):
 
 @login_required
 def account(request):
-    user = get_object_or_404(CustomUser, id=request.user.id)
-    subscribers = user.following.all()
+    user = request.user
+    subscribers = user.following.select_related('user')
 
     account_verified = False
     email = EmailAddress.objects.filter(email=user.email)
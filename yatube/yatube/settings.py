@@ -47,6 +47,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'core.middleware.QueryBudgetMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -140,12 +141,119 @@ CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Загрузки хранятся по хешу содержимого, одинаковые файлы - один раз.
+DEFAULT_FILE_STORAGE = 'core.storage.DedupStorage'
+
+# Размеры миниатюр картинок постов, как в тегах {% thumbnail %} шаблонов.
+# Они готовятся заранее после сохранения поста.
+POST_THUMBNAILS = (
+    ('960x339', {'crop': 'center', 'upscale': True}),
+)
+# Процессов для обработки картинок и миниатюр, 0 - обрабатывать на месте.
+THUMBNAIL_WORKERS = 2
+
+# Загруженные картинки постов: наибольшая сторона, формат и качество
+# сжатия по числу точек (последний порог None - для всех остальных).
+IMAGE_MAX_SIDE = 1920
+IMAGE_FORMAT = 'WEBP'
+IMAGE_QUALITY = (
+    (640 * 480, 85),
+    (1280 * 1024, 80),
+    (None, 75),
+)
+# Миниатюры в том же формате, что и картинки. Их имена sorl-thumbnail
+# выбирает сам, поэтому они лежат в обычном хранилище, не по хешу.
+THUMBNAIL_FORMAT = IMAGE_FORMAT
+THUMBNAIL_STORAGE = 'django.core.files.storage.FileSystemStorage'
+
+# Метаданные миниатюр: LRU процесса поверх общего файла SQLite.
+THUMBNAIL_KVSTORE = 'core.kvstore.KVStore'
+THUMBNAIL_KVSTORE_PATH = os.path.join(BASE_DIR, 'thumbnail_kvstore.sqlite3')
+THUMBNAIL_KVSTORE_SIZE = 10000
+
+# Общий кеш всех воркеров на машине - файл SQLite в режиме WAL (L2), над
+# ним LRU процесса на пару секунд (L1) и защита от лавины пересчетов.
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-    }
+        'BACKEND': 'core.tiered_cache.TieredCache',
+        'OPTIONS': {
+            'L2': 'shared',
+            'L1_MAX_ENTRIES': 1000,
+            'L1_TIMEOUT': 2,
+            'STALE_TIMEOUT': 60,
+        },
+    },
+    'shared': {
+        'BACKEND': 'core.cache.SQLiteCache',
+        'LOCATION': os.path.join(BASE_DIR, 'cache.sqlite3'),
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    },
 }
 
+# Кеш поколений лент и условного GET (posts.feed_cache) - общий L2 без
+# L1 процесса, чтобы изменения сразу видели все воркеры.
+FEED_GENERATION_CACHE = 'shared'
+
+# Тесты держат кеш и метаданные миниатюр в памяти (core.test_runner).
+TEST_RUNNER = 'core.test_runner.InMemoryRunner'
+
+# Время жизни фрагментов лент в кеше. Новые посты, комментарии и
+# подписки сбрасывают фрагменты сразу (posts.feed_cache).
+FEED_CACHE_TIMEOUT = 60 * 60
+
+# Время жизни страниц, сохраненных для гостей (posts.page_cache).
+# Их тоже сбрасывают поколения лент, 0 - не сохранять.
+PAGE_CACHE_TIMEOUT = 60 * 60
+
+# Режим постраничного вывода лент: 'page' - по номеру страницы,
+# 'keyset' - по курсору (created, id) без COUNT и OFFSET.
+FEED_PAGINATION = 'page'
+
+# Материализованная лента подписок: новые посты раскладываются
+# по лентам подписчиков при сохранении (см. posts.timeline).
+FOLLOW_TIMELINE = False
+
+# Порог подписчиков, выше которого посты автора не рассылаются по лентам,
+# а подмешиваются при чтении (гибридная лента). None - рассылать всем.
+# Каждый подмешиваемый автор - отдельная выборка при чтении, порог
+# стоит ставить так, чтобы таких авторов в подписках было единицы
+# (benchmarks/bench_feed.py).
+FOLLOW_TIMELINE_PUSH_LIMIT = None
+
+# Бюджеты запросов к базе по именам представлений (core.middleware).
+# Учет работает при DEBUG или QUERY_BUDGET_ENABLED, в бою его нет.
+# Превышение пишется в лог, при QUERY_BUDGET_STRICT - исключение.
+# У group_list, profile и post_detail один запрос уходит на ETag, пока
+# id по slug, имени или посту не запомнен в кеше (feed_cache.lookup).
+QUERY_BUDGETS = {
+    'posts:index': 5,
+    'posts:group_list': 7,
+    'posts:profile': 8,
+    'posts:post_detail': 5,
+    'posts:follow_index': 6,
+    'posts:post_search': 5,
+    'posts:post_create': 3,
+    'posts:post_edit': 4,
+    'users:account': 5,
+    'api:posts-list': 3,
+    'api:posts-detail': 3,
+    'api:comments-list': 4,
+    'api:comments-detail': 3,
+    # Пачка до API_BULK_MAX_ITEMS объектов одного автора.
+    'api:posts-bulk': 6,
+    'api:comments-bulk': 7,
+    'api:follows-bulk': 8,
+    # Создание подписки обновляет два счетчика в сигналах.
+    'api:follows-list': 7,
+    'api:groups-list': 2,
+    'api:groups-detail': 2,
+}
+QUERY_BUDGET_ENABLED = False
+QUERY_BUDGET_STRICT = False
+
+# Падать, если шаблон лениво подгружает связанные данные внутри цикла.
+TEMPLATE_LAZY_LOAD_STRICT = False
+
 INTERNAL_IPS = [
     '127.0.0.1',
 ]
@@ -162,6 +270,15 @@ REST_FRAMEWORK = {
     ]
 }
 
+# Размер страницы API при постраничном выводе по курсору.
+API_PAGE_SIZE = 10
+
+# Наибольшее число объектов в одном запросе .../bulk/ API.
+API_BULK_MAX_ITEMS = 500
+
+# Наибольший размер картинки в base64 в запросах API, в байтах.
+API_IMAGE_MAX_SIZE = 10 * 1024 * 1024
+
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(days=15),
     'REFRESH_TOKEN_LIFETIME': timedelta(days=15),